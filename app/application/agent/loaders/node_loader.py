@@ -59,5 +59,6 @@ class NodeLoader:
         return {
             "loaded": self._loaded,
             "active_nodes": len(node_registry.get_nodes()),
-            "nodes_detail": node_registry.list_nodes()
+            "nodes_detail": node_registry.list_nodes(),
+            "nodes_stats": node_registry.get_stats(),
         }
\ No newline at end of file
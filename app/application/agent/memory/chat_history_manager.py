@@ -0,0 +1,107 @@
+# app/application/agent/memory/chat_history_manager.py
+import logging
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from pydantic import BaseModel, Field
+
+from app.infrastructure.config.config import settings
+from app.infrastructure.interfaces.illm_service import ILLMService
+from app.utils.token_counter import estimate_messages_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class HistoricoPreparado(BaseModel):
+    """Histórico pronto para o prompt e o novo estado do resumo"""
+    mensagens: List[BaseMessage] = Field(default_factory=list)
+    resumo: Optional[str] = Field(None, description="Resumo acumulado das mensagens antigas")
+    mensagens_resumidas: int = Field(0, description="Quantas mensagens do início já estão no resumo")
+    tokens_completo: int = Field(0, description="Tokens estimados do histórico sem janela")
+    tokens_enviados: int = Field(0, description="Tokens estimados do histórico enviado")
+
+
+class ChatHistoryManager:
+    """
+    Mantém o histórico enviado ao LLM dentro de um orçamento de tokens.
+
+    As mensagens mais recentes vão na íntegra enquanto couberem em
+    `max_tokens` (no mínimo `min_recentes`). As anteriores são incorporadas a
+    um resumo acumulado, guardado no estado. O resumo é incremental: só é
+    refeito quando há pelo menos `lote_resumo` mensagens novas fora da janela,
+    e cada atualização envia apenas o resumo anterior e essas mensagens.
+    Até lá, as mensagens pendentes continuam no prompt na íntegra.
+    """
+
+    def __init__(self, max_tokens: int = 1500, min_recentes: int = 4, lote_resumo: int = 6):
+        self.max_tokens = max_tokens
+        self.min_recentes = min_recentes
+        self.lote_resumo = lote_resumo
+
+    def _inicio_janela(self, mensagens: List[BaseMessage], max_tokens: int) -> int:
+        """Índice da primeira mensagem que cabe no orçamento, a partir do fim."""
+        inicio = len(mensagens)
+        tokens = 0
+        while inicio > 0:
+            custo = estimate_messages_tokens([mensagens[inicio - 1]])
+            recentes = len(mensagens) - inicio
+            if recentes >= self.min_recentes and tokens + custo > max_tokens:
+                break
+            tokens += custo
+            inicio -= 1
+        return inicio
+
+    async def preparar(
+        self,
+        historico: List[BaseMessage],
+        resumo: Optional[str],
+        mensagens_resumidas: int,
+        llm_service: ILLMService,
+        max_tokens: Optional[int] = None,
+    ) -> HistoricoPreparado:
+        """
+        Monta o histórico do prompt, atualizando o resumo quando necessário.
+
+        Args:
+            historico: Mensagens anteriores à mensagem atual.
+            resumo: Resumo acumulado do estado (ou None).
+            mensagens_resumidas: Quantas mensagens do início o resumo já cobre.
+            llm_service: Serviço usado para resumir.
+            max_tokens: Orçamento deste turno, no lugar do padrão (janela reduzida).
+        """
+        mensagens_resumidas = min(mensagens_resumidas or 0, len(historico))
+        nao_resumidas = historico[mensagens_resumidas:]
+        inicio = self._inicio_janela(nao_resumidas, max_tokens or self.max_tokens)
+        pendentes = nao_resumidas[:inicio]
+
+        if len(pendentes) >= self.lote_resumo:
+            try:
+                resumo = await llm_service.summarize_history(resumo, pendentes)
+                mensagens_resumidas += len(pendentes)
+                nao_resumidas = nao_resumidas[inicio:]
+                logger.info(
+                    f"Resumo do histórico atualizado com {len(pendentes)} mensagens "
+                    f"({mensagens_resumidas} resumidas no total)"
+                )
+            except Exception as e:
+                # Sem resumo novo, as pendentes seguem na íntegra neste turno
+                logger.error(f"Erro ao resumir o histórico: {e}")
+
+        mensagens = list(nao_resumidas)
+        if resumo:
+            mensagens.insert(0, SystemMessage(content=f"Resumo da conversa até aqui: {resumo}"))
+
+        return HistoricoPreparado(
+            mensagens=mensagens,
+            resumo=resumo,
+            mensagens_resumidas=mensagens_resumidas,
+            tokens_completo=estimate_messages_tokens(historico),
+            tokens_enviados=estimate_messages_tokens(mensagens),
+        )
+
+
+chat_history_manager = ChatHistoryManager(
+    max_tokens=settings.HISTORY_MAX_TOKENS,
+    min_recentes=settings.HISTORY_MIN_RECENT_MESSAGES,
+    lote_resumo=settings.HISTORY_SUMMARY_BATCH_MESSAGES,
+)
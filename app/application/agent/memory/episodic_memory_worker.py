@@ -0,0 +1,312 @@
+# app/application/agent/memory/episodic_memory_worker.py
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.domain.memory_models import EpisodicMemory, User
+from app.infrastructure.config.config import settings
+from app.infrastructure.database.database_session import AsyncSessionFactory, Base, engine
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.vector.episode_index import episode_index
+
+logger = logging.getLogger(__name__)
+
+episodes_total = metrics_registry.counter(
+    "episodic_memory_episodes_total",
+    "Episódios de memória por resultado (written, failed, dropped, skipped)",
+    labelnames=("result",),
+)
+
+
+class EpisodicMemoryWorker:
+    """
+    Gera a memória episódica das conversas em segundo plano.
+
+    Quando uma thread chega ao transbordo humano ou fica ociosa, ela entra
+    numa fila. Até `max_concorrencia` tarefas leem a conversa do checkpoint,
+    resumem as mensagens novas desde o último episódio e acumulam o resultado;
+    os episódios são gravados em lote (`tamanho_lote` ou a cada
+    `intervalo_flush` segundos) numa única transação.
+
+    `conversation_turns` guarda quantas mensagens do cliente a conversa tinha
+    no episódio; o maior valor da thread no banco marca até onde ela já foi
+    resumida, o que vale entre reinícios e entre workers.
+
+    Nada disso roda no caminho da requisição: `agendar()` e
+    `registrar_atividade()` apenas registram em memória.
+    """
+
+    def __init__(
+        self,
+        max_concorrencia: int = 2,
+        tamanho_fila: int = 1000,
+        tamanho_lote: int = 20,
+        intervalo_flush: float = 5.0,
+        ociosidade_segundos: float = 1800.0,
+        intervalo_verificacao: float = 60.0,
+    ):
+        self.max_concorrencia = max_concorrencia
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_flush = intervalo_flush
+        self.ociosidade_segundos = ociosidade_segundos
+        self.intervalo_verificacao = intervalo_verificacao
+
+        self._fila: asyncio.Queue = asyncio.Queue(maxsize=tamanho_fila)
+        self._pendentes: set = set()
+        self._ultima_atividade: Dict[str, Tuple[str, float]] = {}
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock_gravacao = asyncio.Lock()
+        self._tarefas: List[asyncio.Task] = []
+
+    # ---- API usada pelo serviço (não bloqueante) ----
+
+    def registrar_atividade(self, thread_id: str, phone_number: str):
+        """Marca a thread como ativa; ela vira episódio se ficar ociosa."""
+        self._ultima_atividade[thread_id] = (phone_number, time.monotonic())
+
+    def agendar(self, thread_id: str, phone_number: str, motivo: str):
+        """Enfileira a thread para gerar um episódio."""
+        self._ultima_atividade.pop(thread_id, None)
+        if thread_id in self._pendentes:
+            return
+        try:
+            self._fila.put_nowait((thread_id, phone_number, motivo))
+            self._pendentes.add(thread_id)
+        except asyncio.QueueFull:
+            episodes_total.inc(result="dropped")
+            logger.warning(f"Fila de memória episódica cheia; thread {thread_id} descartada")
+
+    def backlog(self) -> int:
+        return self._fila.qsize() + len(self._buffer)
+
+    # ---- Ciclo de vida ----
+
+    async def setup(self):
+        """Cria as tabelas de usuários e episódios, se não existirem."""
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                Base.metadata.create_all,
+                tables=[User.__table__, EpisodicMemory.__table__],
+            )
+        logger.info("Tabelas de memória episódica verificadas/criadas.")
+
+    def iniciar(self):
+        if self._tarefas:
+            return
+        self._tarefas = [
+            asyncio.create_task(self._consumir(), name=f"episodic-memory-{i}")
+            for i in range(self.max_concorrencia)
+        ]
+        self._tarefas.append(asyncio.create_task(self._flush_periodico(), name="episodic-memory-flush"))
+        self._tarefas.append(asyncio.create_task(self._verificar_ociosas(), name="episodic-memory-idle"))
+        logger.info(f"Worker de memória episódica iniciado ({self.max_concorrencia} tarefas)")
+
+    async def parar(self, timeout: float = 10.0):
+        """Processa o que já está na fila (até `timeout`) e grava o buffer."""
+        if not self._tarefas:
+            return
+        try:
+            await asyncio.wait_for(self._fila.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Memória episódica: {self._fila.qsize()} threads não processadas no shutdown")
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+        await self._gravar_buffer()
+
+    # ---- Processamento ----
+
+    async def _consumir(self):
+        while True:
+            thread_id, phone_number, motivo = await self._fila.get()
+            try:
+                episodio = await self._condensar(thread_id, phone_number, motivo)
+                if episodio is None:
+                    episodes_total.inc(result="skipped")
+                else:
+                    self._buffer.append(episodio)
+                    if len(self._buffer) >= self.tamanho_lote:
+                        await self._gravar_buffer()
+            except Exception as e:
+                episodes_total.inc(result="failed")
+                logger.error(f"Erro ao gerar episódio da thread {thread_id}: {e}")
+            finally:
+                self._pendentes.discard(thread_id)
+                self._fila.task_done()
+
+    async def _condensar(self, thread_id: str, phone_number: str, motivo: str) -> Optional[Dict[str, Any]]:
+        """Lê a conversa do checkpoint e resume as mensagens novas."""
+        # Imports tardios: a fábrica de LLM depende do pacote de nós, que só
+        # deve ser importado depois do grafo (ver scheduling_agent_builder)
+        from app.application.agent.scheduling_agent_cache import scheduling_agent_cache
+        from app.infrastructure.services.llm.llm_factory import LLMFactory
+
+        agent = await scheduling_agent_cache.get_agent()
+        snapshot = await agent.aget_state({"configurable": {"thread_id": thread_id}})
+        valores = snapshot.values or {}
+        mensagens = valores.get("messages", [])
+
+        # O episódio começa na primeira mensagem do cliente ainda não resumida
+        posicoes_cliente = [i for i, m in enumerate(mensagens) if isinstance(m, HumanMessage)]
+        turnos_processados = await self._turnos_processados(thread_id)
+        if len(posicoes_cliente) <= turnos_processados:
+            return None
+        inicio = posicoes_cliente[turnos_processados] if turnos_processados else 0
+        novas = mensagens[inicio:]
+
+        # Reaproveita o resumo acumulado do histórico quando ele cobre o início
+        resumo_anterior = None
+        resumidas = valores.get("summarized_messages") or 0
+        if inicio == 0 and resumidas:
+            resumo_anterior = valores.get("history_summary")
+            novas = mensagens[resumidas:]
+
+        llm_service = LLMFactory.get_llm_service(settings.LLM_PROVIDER)
+        resumo = await llm_service.summarize_history(resumo_anterior, novas)
+
+        scheduling_data = valores.get("scheduling_data")
+        return {
+            "thread_id": thread_id,
+            "phone_number": phone_number,
+            "full_name": getattr(getattr(scheduling_data, "cliente", None), "nome_completo", None),
+            "summary": resumo,
+            "outcome": motivo,
+            "key_entities": self._entidades(scheduling_data),
+            "conversation_turns": len(posicoes_cliente),
+        }
+
+    async def _turnos_processados(self, thread_id: str) -> int:
+        """Mensagens do cliente já resumidas: episódios gravados e os do buffer."""
+        async with AsyncSessionFactory() as session:
+            gravados = await session.scalar(
+                select(func.max(EpisodicMemory.conversation_turns)).where(
+                    EpisodicMemory.thread_id == thread_id
+                )
+            )
+        no_buffer = [e["conversation_turns"] for e in self._buffer if e["thread_id"] == thread_id]
+        return max([gravados or 0, *no_buffer])
+
+    @staticmethod
+    def _entidades(scheduling_data) -> Dict[str, Any]:
+        if scheduling_data is None:
+            return {}
+
+        def valor(campo):
+            return getattr(campo, "value", campo)
+
+        servico = scheduling_data.servico
+        return {
+            "etapa": valor(scheduling_data.etapa_atual),
+            "item": valor(servico.item_selecionado),
+            "quantidade_itens": servico.quantidade_itens,
+            "tamanho_item": servico.tamanho_item,
+            "aceito_orcamento": servico.aceito_orcamento,
+            "cidade": scheduling_data.cidade,
+            "franquia": scheduling_data.franquia,
+        }
+
+    async def _flush_periodico(self):
+        while True:
+            await asyncio.sleep(self.intervalo_flush)
+            await self._gravar_buffer()
+
+    async def _verificar_ociosas(self):
+        while True:
+            await asyncio.sleep(self.intervalo_verificacao)
+            limite = time.monotonic() - self.ociosidade_segundos
+            ociosas = [
+                (thread_id, phone)
+                for thread_id, (phone, visto_em) in self._ultima_atividade.items()
+                if visto_em < limite
+            ]
+            for thread_id, phone in ociosas:
+                self.agendar(thread_id, phone, "inativo")
+
+    async def _gravar_buffer(self):
+        """Grava os episódios acumulados em uma única transação."""
+        async with self._lock_gravacao:
+            if not self._buffer:
+                return
+            lote, self._buffer = self._buffer, []
+            try:
+                async with AsyncSessionFactory() as session:
+                    # Outro worker pode criar o mesmo usuário ao mesmo tempo:
+                    # o conflito no telefone é ignorado e o ID vem da consulta
+                    nomes = {e["phone_number"]: e["full_name"] for e in lote}
+                    await session.execute(
+                        insert(User)
+                        .values([
+                            {"user_id": uuid.uuid4(), "phone_number": telefone, "full_name": nome}
+                            for telefone, nome in nomes.items()
+                        ])
+                        .on_conflict_do_nothing(index_elements=[User.phone_number])
+                    )
+                    result = await session.execute(
+                        select(User.phone_number, User.user_id).where(
+                            User.phone_number.in_(nomes)
+                        )
+                    )
+                    usuarios = dict(result.all())
+
+                    for episodio in lote:
+                        episodio["episode_id"] = uuid.uuid4()
+                    session.add_all(
+                        EpisodicMemory(
+                            episode_id=e["episode_id"],
+                            user_id=usuarios[e["phone_number"]],
+                            thread_id=e["thread_id"],
+                            summary=e["summary"],
+                            outcome=e["outcome"],
+                            key_entities=e["key_entities"],
+                            conversation_turns=e["conversation_turns"],
+                        )
+                        for e in lote
+                    )
+                    await session.commit()
+                episodes_total.inc(len(lote), result="written")
+                logger.info(f"{len(lote)} episódios de memória gravados")
+            except Exception as e:
+                episodes_total.inc(len(lote), result="failed")
+                logger.error(f"Erro ao gravar lote de memória episódica: {e}")
+                return
+
+            if settings.EPISODE_INDEX_ENABLED:
+                await self._indexar(lote)
+
+    @staticmethod
+    async def _indexar(lote: List[Dict[str, Any]]):
+        """Adiciona os episódios gravados ao índice vetorial local."""
+        try:
+            await episode_index.aadicionar_lote([
+                (
+                    e["phone_number"],
+                    e["summary"],
+                    {
+                        "episode_id": str(e["episode_id"]),
+                        "thread_id": e["thread_id"],
+                        "outcome": e["outcome"],
+                    },
+                )
+                for e in lote
+            ])
+        except Exception as e:
+            logger.error(f"Erro ao indexar episódios: {e}")
+
+
+episodic_memory_worker = EpisodicMemoryWorker(
+    max_concorrencia=settings.EPISODIC_MEMORY_CONCURRENCY,
+    tamanho_lote=settings.EPISODIC_MEMORY_BATCH_SIZE,
+    ociosidade_segundos=settings.EPISODIC_MEMORY_IDLE_SECONDS,
+)
+
+metrics_registry.gauge(
+    "episodic_memory_backlog",
+    "Threads aguardando resumo + episódios aguardando gravação",
+).set_function(episodic_memory_worker.backlog)
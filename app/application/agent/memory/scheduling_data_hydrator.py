@@ -0,0 +1,45 @@
+# app/application/agent/memory/scheduling_data_hydrator.py
+import logging
+
+from app.domain.scheduling_data import SchedulingData
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.pesistence.postgres_persistence import get_store
+
+logger = logging.getLogger(__name__)
+
+hydration_total = metrics_registry.counter(
+    "scheduling_data_hydration_total",
+    "Origem do scheduling_data de threads sem checkpoint (store, new)",
+    labelnames=("source",),
+)
+
+
+class SchedulingDataHydrator:
+    """
+    Carrega o SchedulingData de uma thread que ainda não tem checkpoint.
+
+    O serviço não envia scheduling_data no estado inicial do turno: o
+    LangGraph mantém o valor do último checkpoint, lido junto com o resto do
+    estado, sem uma leitura extra por turno. Só quando a thread não tem
+    checkpoint (conversa nova, ou checkpoints apagados) o nó orquestrador
+    recorre a este hidratador, que busca a cópia no BaseStore ou cria um
+    SchedulingData novo.
+    """
+
+    async def carregar(self, thread_id: str) -> SchedulingData:
+        """Retorna a cópia da thread no BaseStore ou um SchedulingData novo."""
+        origem, dados = "new", None
+        try:
+            store = await get_store()
+            item = await store.aget(("scheduling_data", thread_id), "data")
+            if item is not None:
+                dados, origem = item.value, "store"
+        except Exception as e:
+            logger.warning(f"Falha ao ler o scheduling_data de {thread_id} no BaseStore: {e}")
+
+        hydration_total.inc(source=origem)
+        return SchedulingData.model_validate(dados) if dados else SchedulingData()
+
+
+# Instância única (Singleton)
+scheduling_data_hydrator = SchedulingDataHydrator()
@@ -1,12 +1,27 @@
+import asyncio
 import logging
-from typing import List
-from langchain_core.messages import AIMessage, BaseMessage
+import time
+from typing import List, Optional
+from datetime import datetime
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
 from app.application.agent.state.sheduling_agent_state import SchedulingAgentState
 from app.infrastructure.services.llm.llm_factory import LLMFactory
+from app.infrastructure.services.llm.openai_service import RESPOSTA_FALLBACK
+from app.infrastructure.services.llm.token_usage import TokenUsage, contabilizar_tokens
+from app.application.services.token_budget import token_budget
+from app.infrastructure.cache.response_cache import response_cache
+from app.infrastructure.cache.extraction_cache import CAMPOS_PESSOAIS, extraction_cache
+from app.infrastructure.vector.episode_index import episode_index
+from app.infrastructure.config.config import settings
+from app.infrastructure.metrics.metrics_registry import metrics_registry
 from app.utils.get_last_message import get_last_message
 from app.infrastructure.pesistence.postgres_persistence import get_store
+from app.infrastructure.pesistence.store_write_behind import store_write_behind
 from app.application.agent.registry.node_registry import register_node
+from app.application.agent.memory.chat_history_manager import chat_history_manager
+from app.application.agent.memory.scheduling_data_hydrator import scheduling_data_hydrator
 from app.domain.scheduling_data import TipoItem, StatusFluxo, SchedulingData
+from app.domain.local_extractor import LocalExtractor
 from app.domain.exception_handlers import (
     ExceptionDetector, 
     TipoExcecao, 
@@ -15,17 +30,126 @@ from app.domain.exception_handlers import (
 
 logger = logging.getLogger(__name__)
 
+exception_detector = ExceptionDetector()
+local_extractor = LocalExtractor(confianca_minima=settings.LOCAL_EXTRACTOR_MIN_CONFIDENCE)
+
+speculation_total = metrics_registry.counter(
+    "orchestrator_speculation_total",
+    "Rascunhos especulativos aceitos ou descartados (e o motivo)",
+    labelnames=("outcome",),
+)
+llm_phase_seconds = metrics_registry.histogram(
+    "orchestrator_llm_phase_seconds",
+    "Duração da fase de LLM (extração + resposta) do orquestrador por modo",
+    labelnames=("mode",),
+)
+history_tokens_total = metrics_registry.counter(
+    "orchestrator_history_tokens_total",
+    "Tokens estimados do histórico: 'full' (conversa inteira) x 'sent' (enviado ao LLM)",
+    labelnames=("kind",),
+)
+extraction_requests_total = metrics_registry.counter(
+    "extraction_requests_total",
+    "Extrações por origem: 'local' (regex, sem LLM) ou 'llm'",
+    labelnames=("source",),
+)
+
+
+def _taxa_extracao_local() -> float:
+    local = extraction_requests_total.value(source="local")
+    total = local + extraction_requests_total.value(source="llm")
+    return local / total if total else 0.0
+
+
+metrics_registry.gauge(
+    "local_extractor_skip_ratio",
+    "Fração das extrações resolvidas pelo extrator local sem chamar o LLM",
+).set_function(_taxa_extracao_local)
+
+async def _preparar_estado(state: SchedulingAgentState) -> SchedulingAgentState:
+    """
+    Garante o scheduling_data do turno e registra a etapa em que ele começou.
+
+    O serviço não envia scheduling_data: em threads com checkpoint ele já
+    vem do estado; nas demais, é carregado do BaseStore (ou criado).
+    """
+    if not isinstance(state, dict):
+        return state
+    scheduling_data = state.get("scheduling_data")
+    if scheduling_data is None:
+        scheduling_data = await scheduling_data_hydrator.carregar(
+            state.get("phone_number", "user_default")
+        )
+    etapa_inicial = state.get("etapa_inicial") or getattr(
+        scheduling_data.etapa_atual, "value", scheduling_data.etapa_atual
+    )
+    return {**state, "scheduling_data": scheduling_data, "etapa_inicial": etapa_inicial}
+
+
+async def _fallback_erro_tecnico(state: SchedulingAgentState, erro: BaseException) -> SchedulingAgentState:
+    """Fallback do nó (timeout ou erro não tratado): segue pelo caminho de ERRO_TECNICO."""
+    state = await _preparar_estado(state)
+    scheduling_data = state.get("scheduling_data") if isinstance(state, dict) else state.scheduling_data
+    if scheduling_data is None:
+        scheduling_data = SchedulingData()
+    motivo = "tempo limite excedido" if isinstance(erro, asyncio.TimeoutError) else str(erro)
+    return await _tratar_excecoes(state, [_excecao_tecnica(motivo)], scheduling_data)
+
+
 @register_node(
     name="ORCHESTRATOR",
     enabled=True,
-    timeout=0,
+    timeout=settings.ORCHESTRATOR_NODE_TIMEOUT_SECONDS,
     priority=1,
+    fallback=_fallback_erro_tecnico,
     description="Nó principal de orquestração que interage como LLM"
 )
 
 async def orchestrator_node(state: SchedulingAgentState) -> SchedulingAgentState:
     """
     Nó orquestrador que extrai informações, atualiza estado e interage com LLM.
+    Contabiliza os tokens do turno no consumo acumulado da conversa.
+
+    Erros e timeouts seguem para o fallback do registry (ERRO_TECNICO). Os
+    tokens já gastos são contabilizados mesmo assim: o consumo acumulado (e
+    o scheduling_data preparado) é gravado no estado de entrada, que é o
+    mesmo que o fallback recebe.
+    """
+    entrada = state
+    state = await _preparar_estado(state)
+    if isinstance(state, dict):
+        uso_conversa = TokenUsage.model_validate(state.get("token_usage") or {})
+        user_name = state.get("phone_number", "user_default")
+    else:
+        uso_conversa = TokenUsage.model_validate(state.token_usage or {})
+        user_name = state.phone_number
+
+    politica = token_budget.avaliar(uso_conversa)
+    concluido = False
+    with contabilizar_tokens() as uso_turno:
+        try:
+            resultado = await _orquestrar(state, politica)
+            concluido = True
+        finally:
+            # Também quando o turno falha ou é cancelado pelo timeout do nó
+            token_budget.registrar(user_name, uso_turno, politica)
+            token_usage = uso_conversa.somar(uso_turno).model_dump()
+            if not concluido and isinstance(entrada, dict):
+                entrada.update(
+                    scheduling_data=state["scheduling_data"],
+                    etapa_inicial=state["etapa_inicial"],
+                    token_usage=token_usage,
+                )
+
+    resultado = dict(resultado)
+    resultado["token_usage"] = token_usage
+    return resultado
+
+
+async def _orquestrar(state: SchedulingAgentState, politica: Optional[str]) -> SchedulingAgentState:
+    """
+    Executa o turno. `politica` é a ação do orçamento de tokens da conversa
+    (None, "downgrade_model", "shrink_history" ou "handoff").
     """
     scheduling_data = None
     
@@ -37,10 +161,14 @@ async def orchestrator_node(state: SchedulingAgentState) -> SchedulingAgentState
             scheduling_data = state.get("scheduling_data")
             user_name = state.get("phone_number", "user_default")
             messages = state.get("messages", [])
+            history_summary = state.get("history_summary")
+            summarized_messages = state.get("summarized_messages") or 0
         else:
             scheduling_data = state.scheduling_data
             user_name = state.phone_number
             messages = state.messages
+            history_summary = state.history_summary
+            summarized_messages = state.summarized_messages
             
         if scheduling_data is None:
             logger.warning("scheduling_data era None, criando novo SchedulingData")
@@ -56,15 +184,85 @@ async def orchestrator_node(state: SchedulingAgentState) -> SchedulingAgentState
             return state
         
         logger.info(f"Conteúdo da mensagem: {user_message.content}")
-        
-        # Extrair informações estruturadas da mensagem
-        llm_service = LLMFactory.create_llm_service("openai")
-        extracted_info = await llm_service.extract_information(user_message.content)
+
+        # Conversa acima do orçamento de tokens
+        if politica == "handoff":
+            logger.info(f"Orçamento de tokens excedido por {user_name}; transbordo humano")
+            return await _tratar_excecoes(state, [_excecao_limite_consumo()], scheduling_data)
+        provedor = settings.LLM_PROVIDER
+        if politica == "downgrade_model":
+            provedor = settings.TOKEN_BUDGET_DOWNGRADE_PROVIDER
+        llm_service = LLMFactory.get_llm_service(provedor)
+
+        # Histórico dentro do orçamento de tokens (mensagens antigas resumidas)
+        historico = await chat_history_manager.preparar(
+            messages[:-1],  # Excluir a última mensagem (atual)
+            history_summary,
+            summarized_messages,
+            llm_service,
+            max_tokens=settings.TOKEN_BUDGET_HISTORY_MAX_TOKENS if politica == "shrink_history" else None,
+        )
+        history_tokens_total.inc(historico.tokens_completo, kind="full")
+        history_tokens_total.inc(historico.tokens_enviados, kind="sent")
+        # Atendimentos anteriores do mesmo cliente (índice vetorial local)
+        if settings.EPISODE_INDEX_ENABLED:
+            memoria = await _memoria_episodica(user_message.content, user_name)
+            if memoria is not None:
+                historico.mensagens.insert(0, memoria)
+
+        logger.info(
+            f"Tokens estimados do histórico: {historico.tokens_completo} na conversa, "
+            f"{historico.tokens_enviados} enviados ({len(historico.mensagens)} mensagens)"
+        )
+        llm_response = None
+        rascunho = None
+        modo = settings.ORCHESTRATOR_LLM_MODE
+        inicio_llm = time.perf_counter()
+
+        # Mensagens só com dados estruturados (telefone, CPF, "sim"...) não
+        # precisam da extração via LLM
+        extracao_local = None
+        if settings.LOCAL_EXTRACTOR_ENABLED:
+            extracao_local = local_extractor.extrair(user_message.content)
+            if not local_extractor.dispensa_llm(extracao_local, scheduling_data.etapa_atual):
+                extracao_local = None
+
+        if extracao_local is not None:
+            extraction_requests_total.inc(source="local")
+            extracted_info = extracao_local.para_extracted_info(scheduling_data.etapa_atual)
+        elif modo == "speculative":
+            # Extração e rascunho da resposta em paralelo; o rascunho é
+            # validado depois que a extração atualizar o scheduling_data
+            etapa_antes = scheduling_data.etapa_atual
+            contexto_antes = _build_intelligent_context(scheduling_data)
+            extracted_info, rascunho = await asyncio.gather(
+                _extrair_informacoes(llm_service, user_message.content, user_name),
+                llm_service.orchestrator_prompt_template(
+                    user_query=user_message.content,
+                    chat_history=historico.mensagens,
+                    scheduling_data=scheduling_data
+                ),
+            )
+        elif modo == "fused":
+            # Extrair informações e gerar a resposta em uma única chamada
+            resultado = await llm_service.extract_and_respond(
+                user_query=user_message.content,
+                chat_history=historico.mensagens,
+                scheduling_data=scheduling_data
+            )
+            extracted_info = resultado.get("extracted_info", {})
+            llm_response = resultado.get("resposta")
+        else:
+            # Extrair informações estruturadas da mensagem
+            extracted_info = await _extrair_informacoes(llm_service, user_message.content, user_name)
+        if extracao_local is None:
+            extraction_requests_total.inc(source="llm")
         logger.info(f"Informações extraídas: {extracted_info}")
         
-        exception_detector = ExceptionDetector()
         excecoes = exception_detector.detectar_excecoes(user_message.content, extracted_info)
         if excecoes:
+            if rascunho is not None:
+                speculation_total.inc(outcome="discarded_exception")
             return await _tratar_excecoes(state, excecoes, scheduling_data)
         
         # Atualizar scheduling_data com informações extraídas
@@ -72,47 +270,105 @@ async def orchestrator_node(state: SchedulingAgentState) -> SchedulingAgentState
         
         # Construir contexto inteligente
         contexto_inteligente = _build_intelligent_context(scheduling_data)
+
+        if rascunho is not None:
+            motivo = _motivo_invalidacao_rascunho(
+                etapa_antes, contexto_antes, scheduling_data.etapa_atual, contexto_inteligente
+            )
+            if motivo is None:
+                llm_response = rascunho
+                speculation_total.inc(outcome="accepted")
+            else:
+                logger.info(f"Rascunho especulativo descartado ({motivo}); regenerando resposta.")
+                speculation_total.inc(outcome=f"discarded_{motivo}")
         
-        # Gerar resposta do LLM
-        llm_response = await llm_service.orchestrator_prompt_template(
-            user_query=user_message.content,
-            chat_history=messages[:-1],  # Excluir a última mensagem (atual)
-            scheduling_data=scheduling_data
-        )
+        # Perguntas repetidas na mesma etapa reaproveitam a resposta em cache,
+        # exceto em turnos com dados pessoais
+        escopo_cache = None
+        if llm_response is None and settings.RESPONSE_CACHE_ENABLED:
+            if _turno_tem_dados_pessoais(extracted_info, scheduling_data):
+                response_cache.registrar_desvio()
+            else:
+                escopo_cache = _escopo_cache_resposta(scheduling_data)
+                llm_response = response_cache.buscar(user_message.content, escopo_cache)
+                if llm_response is not None:
+                    escopo_cache = None
+
+        # Gerar resposta do LLM (nos modos fused/speculative ela pode já ter vindo)
+        if llm_response is None:
+            llm_response = await llm_service.orchestrator_prompt_template(
+                user_query=user_message.content,
+                chat_history=historico.mensagens,
+                scheduling_data=scheduling_data
+            )
+            if escopo_cache is not None and llm_response != RESPOSTA_FALLBACK:
+                response_cache.armazenar(user_message.content, escopo_cache, llm_response)
         
+        llm_phase_seconds.observe(time.perf_counter() - inicio_llm, mode=modo)
+
         ai_message = AIMessage(content=llm_response)
         
         # Persistir no BaseStore
-        try:
-            user_key = user_name or "user_default"
-            await store.aput(("scheduling_data", user_key), "data", scheduling_data.model_dump())
-            logger.info("SchedulingData persistido no BaseStore com sucesso")
-        except Exception as e:
-            logger.error(f"Erro no BaseStore: {e}")
+        await _persistir_scheduling_data(store, user_name, scheduling_data)
         
         updated_state = state.copy()
         updated_state["messages"] = messages + [ai_message]
         updated_state["scheduling_data"] = scheduling_data
         updated_state["conversation_context"] = contexto_inteligente
+        updated_state["history_summary"] = historico.resumo
+        updated_state["summarized_messages"] = historico.mensagens_resumidas
         
         return updated_state
         
     except Exception as e:
+        # O fallback do registry (_fallback_erro_tecnico) responde com ERRO_TECNICO
         logger.error(f"Erro no nó orquestrador: {e}")
-        
-        # Criar exceção técnica e tratar
-        excecao_tecnica = ExcecaoDetectada(
-            tipo=TipoExcecao.ERRO_TECNICO,
-            confianca=1.0,
-            descricao=f"Erro técnico: {str(e)}",
-            prioridade=1
+        raise
+
+
+async def _persistir_scheduling_data(store, user_name: str, scheduling_data):
+    """Grava o scheduling_data no BaseStore conforme STORE_WRITE_DURABILITY."""
+    modo = settings.STORE_WRITE_DURABILITY
+    if modo == "checkpoint_only":
+        return
+    namespace = ("scheduling_data", user_name or "user_default")
+    if modo == "write_behind":
+        store_write_behind.agendar(namespace, "data", scheduling_data.model_dump())
+        return
+    try:
+        await store.aput(namespace, "data", scheduling_data.model_dump())
+        logger.info("SchedulingData persistido no BaseStore com sucesso")
+    except Exception as e:
+        logger.error(f"Erro no BaseStore: {e}")
+
+
+async def _extrair_informacoes(llm_service, mensagem: str, telefone: str) -> dict:
+    """Extração via LLM, passando pelo cache de extração quando habilitado."""
+    if not settings.EXTRACTION_CACHE_ENABLED:
+        return await llm_service.extract_information(mensagem)
+    return await extraction_cache.get_or_extract(
+        mensagem, telefone, lambda: llm_service.extract_information(mensagem)
+    )
+
+
+async def _memoria_episodica(mensagem: str, telefone: str) -> Optional[SystemMessage]:
+    """Mensagem de sistema com os episódios anteriores mais relevantes do cliente."""
+    try:
+        episodios = await episode_index.abuscar(
+            mensagem, k=settings.EPISODE_RECALL_TOP_K, phone_number=telefone
         )
-        
-        # Garantir que scheduling_data existe
-        if scheduling_data is None:
-            scheduling_data = SchedulingData()
-            
-        return await _tratar_excecoes(state, [excecao_tecnica], scheduling_data)
+    except Exception as e:
+        logger.error(f"Erro ao buscar episódios anteriores: {e}")
+        return None
+    if not episodios:
+        return None
+
+    linhas = [
+        f"- {datetime.fromtimestamp(e['criado_em']):%d/%m/%Y}: {e['texto']}" for e in episodios
+    ]
+    return SystemMessage(
+        content="Atendimentos anteriores deste cliente:\n" + "\n".join(linhas)
+    )
 
 
 def _build_intelligent_context(scheduling_data) -> str:
@@ -161,6 +417,61 @@ def _build_intelligent_context(scheduling_data) -> str:
         return ""
 
 
+def _motivo_invalidacao_rascunho(etapa_antes, contexto_antes: str, etapa_depois, contexto_depois: str) -> Optional[str]:
+    """
+    Verifica se o rascunho gerado em paralelo com a extração continua válido.
+
+    O rascunho já viu a mensagem do cliente, então dados novos no contexto não
+    o invalidam. Ele é descartado se a etapa mudou ou se algum dado que já
+    estava no contexto foi substituído por outro valor.
+
+    Returns:
+        None se o rascunho pode ser usado, ou o motivo ("stage"/"context").
+    """
+    if etapa_depois != etapa_antes:
+        return "stage"
+
+    def _campos(contexto: str) -> dict:
+        campos = {}
+        for parte in contexto.split(" | ") if contexto else []:
+            chave, _, valor = parte.partition(": ")
+            campos[chave] = valor
+        return campos
+
+    campos_depois = _campos(contexto_depois)
+    for chave, valor in _campos(contexto_antes).items():
+        novo_valor = campos_depois.get(chave)
+        if novo_valor is not None and not novo_valor.startswith(valor):
+            return "context"
+
+    return None
+
+
+def _turno_tem_dados_pessoais(extracted_info: dict, scheduling_data) -> bool:
+    """
+    Indica se a resposta do turno pode conter dados pessoais: a mensagem
+    trouxe dados do cliente ou a conversa já tem algum deles (de turnos
+    anteriores). O escopo do cache não inclui o telefone, então uma resposta
+    de conversa com dados pessoais poderia ser servida a outro cliente.
+    """
+    if any(extracted_info.get(campo) for campo in CAMPOS_PESSOAIS):
+        return True
+    cliente = scheduling_data.cliente
+    return any(getattr(cliente, campo, None) for campo in CAMPOS_PESSOAIS)
+
+
+def _escopo_cache_resposta(scheduling_data) -> tuple:
+    """Escopo do cache de respostas: tudo do contexto que muda a resposta."""
+    servico = scheduling_data.servico
+    return (
+        scheduling_data.etapa_atual,
+        scheduling_data.franquia,
+        servico.item_selecionado,
+        servico.tamanho_item,
+        scheduling_data.cidade,
+    )
+
+
 async def _update_scheduling_data(scheduling_data, extracted_info: dict):
     """Atualiza o SchedulingData com as informações extraídas"""
     
@@ -180,6 +491,8 @@ async def _update_scheduling_data(scheduling_data, extracted_info: dict):
         cliente_updates["cpf"] = cpf
     if extracted_info.get("endereco_completo"):
         cliente_updates["endereco_completo"] = extracted_info["endereco_completo"]
+    if extracted_info.get("cep"):
+        cliente_updates["cep"] = extracted_info["cep"]
     if extracted_info.get("ponto_referencia"):
         cliente_updates["ponto_referencia"] = extracted_info["ponto_referencia"]
     
@@ -303,6 +616,26 @@ def _determinar_nova_etapa(etapa_atual: StatusFluxo, etapa_detectada: str, extra
     return etapa_atual
 
 
+def _excecao_tecnica(motivo: str) -> ExcecaoDetectada:
+    """Exceção de ERRO_TECNICO usada quando o nó falha."""
+    return ExcecaoDetectada(
+        tipo=TipoExcecao.ERRO_TECNICO,
+        confianca=1.0,
+        descricao=f"Erro técnico: {motivo}",
+        prioridade=1
+    )
+
+
+def _excecao_limite_consumo() -> ExcecaoDetectada:
+    """Exceção usada quando a conversa excede o orçamento de tokens (política 'handoff')."""
+    return ExcecaoDetectada(
+        tipo=TipoExcecao.LIMITE_CONSUMO,
+        confianca=1.0,
+        descricao="Orçamento de tokens da conversa excedido",
+        prioridade=1
+    )
+
+
 async def _tratar_excecoes(state: SchedulingAgentState, 
                           excecoes: List[ExcecaoDetectada], 
                           scheduling_data) -> SchedulingAgentState:
@@ -319,7 +652,8 @@ async def _tratar_excecoes(state: SchedulingAgentState,
         TipoExcecao.HORARIO_NAO_COMERCIAL: "Nosso atendimento é das 8h às 18h. Assim que iniciarmos o expediente, nossa equipe retornará seu contato.",
         TipoExcecao.DADOS_INVALIDOS: "Verifiquei que algumas informações precisam ser corrigidas. Vou conectar você com nossa equipe para ajustar os dados.",
         TipoExcecao.RESISTENCIA_CLIENTE: "Entendo suas preocupações. Vou conectar você com nossa equipe comercial que poderá esclarecer melhor todos os detalhes do nosso serviço.",
-        TipoExcecao.ERRO_TECNICO: "Desculpe, tivemos um problema técnico momentâneo. Vou conectar você com nossa equipe para continuarmos o atendimento."
+        TipoExcecao.ERRO_TECNICO: "Desculpe, tivemos um problema técnico momentâneo. Vou conectar você com nossa equipe para continuarmos o atendimento.",
+        TipoExcecao.LIMITE_CONSUMO: "Para continuarmos da melhor forma, vou conectar você com nossa equipe de atendimento. Um momento, por favor!"
     }
     
     resposta = respostas_excecao.get(excecao_principal.tipo, "Vou conectar você com nossa equipe para melhor atendimento.")
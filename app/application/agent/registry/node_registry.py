@@ -1,9 +1,53 @@
+import asyncio
 import logging
-from typing import Dict, Callable, Any
+import time
+from typing import Dict, Callable, Any, Optional, Awaitable
 from functools import wraps
+from app.infrastructure.metrics.metrics_registry import metrics_registry
 
 logger = logging.getLogger(__name__)
 
+node_duration_seconds = metrics_registry.histogram(
+    "agent_node_duration_seconds",
+    "Duração de cada execução de nó do grafo, por nó e desfecho (ok, error, timeout)",
+    labelnames=("node", "outcome"),
+)
+node_fallbacks_total = metrics_registry.counter(
+    "agent_node_fallbacks_total",
+    "Execuções de nó resolvidas pelo fallback, por nó e motivo (error, timeout)",
+    labelnames=("node", "reason"),
+)
+
+# Fallback de um nó: recebe o estado de entrada e o erro, retorna o estado de saída
+NodeFallback = Callable[[Any, BaseException], Awaitable[Any]]
+
+
+class _NodeStats:
+    __slots__ = ("calls", "outcomes", "fallbacks", "total_seconds", "max_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.outcomes: Dict[str, int] = {}
+        self.fallbacks = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def registrar(self, duracao: float, outcome: str, fallback: bool):
+        self.calls += 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.fallbacks += int(fallback)
+        self.total_seconds += duracao
+        self.max_seconds = max(self.max_seconds, duracao)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "outcomes": dict(self.outcomes),
+            "fallbacks": self.fallbacks,
+            "avg_ms": round(self.total_seconds / self.calls * 1000, 2) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 2),
+        }
+
 class NodeRegistry:
     """
     Registry centralizado para nodes do langgraph com controle explícito
@@ -12,17 +56,24 @@ class NodeRegistry:
     def __init__(self):
         self._nodes: Dict[str, Callable] = {}
         self._metadatas: Dict[str, Dict[str, Any]] = {}
+        self._stats: Dict[str, _NodeStats] = {}
 
     def register_node(
             self,
             name: str,
             enabled: bool = True,
-            timeout: int = 0,
+            timeout: float = 0,
             priority: int = 0,
+            fallback: Optional[NodeFallback] = None,
             **metadata
     ):
         """
         decorator para registrar nodes no grafo
+
+        O callable registrado (e retornado) é instrumentado: mede duração e
+        desfecho de cada execução e, com `timeout` > 0, interrompe o nó após
+        `timeout` segundos. Em timeout ou erro, `fallback(state, erro)` produz
+        o estado de saída; sem fallback, o erro é propagado.
         """
         def decorator(func: Callable):
             if not enabled:
@@ -32,20 +83,50 @@ class NodeRegistry:
             if name in self._nodes:
                 raise ValueError(f"Node {name} já registrado.")
             
-            self._nodes[name] = func
+            stats = self._stats[name] = _NodeStats()
+
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                inicio = time.perf_counter()
+                outcome, usou_fallback = "error", False
+                try:
+                    if timeout and timeout > 0:
+                        resultado = await asyncio.wait_for(func(*args, **kwargs), timeout)
+                    else:
+                        resultado = await func(*args, **kwargs)
+                    outcome = "ok"
+                    return resultado
+                except asyncio.TimeoutError as e:
+                    outcome = "timeout"
+                    logger.error(f"Node {name} excedeu o timeout de {timeout}s")
+                    if fallback is None:
+                        raise
+                    usou_fallback = True
+                    node_fallbacks_total.inc(node=name, reason=outcome)
+                    return await fallback(args[0] if args else kwargs.get("state"), e)
+                except Exception as e:
+                    logger.error(f"Erro no node {name}: {e}")
+                    if fallback is None:
+                        raise
+                    usou_fallback = True
+                    node_fallbacks_total.inc(node=name, reason=outcome)
+                    return await fallback(args[0] if args else kwargs.get("state"), e)
+                finally:
+                    duracao = time.perf_counter() - inicio
+                    node_duration_seconds.observe(duracao, node=name, outcome=outcome)
+                    stats.registrar(duracao, outcome, usou_fallback)
+
+            self._nodes[name] = wrapper
             self._metadatas[name] = {
                 'timeout': timeout,
                 'priority': priority,
                 'enabled': enabled,
                 'description': metadata.get('description', func.__doc__ or "No description"),
+                'fallback': getattr(fallback, "__name__", None),
             }
 
             logger.info(f"Node {name} registrado com sucesso.")
 
-            @wraps(func)
-            async def wrapper(*args, **kwargs):
-                return await func(*args, **kwargs)
-            
             return wrapper
     
         return decorator
@@ -70,6 +151,12 @@ class NodeRegistry:
         
         return self._metadatas.copy()
 
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Estatísticas de execução por node (chamadas, desfechos, fallbacks, duração)
+        """
+        return {name: stats.as_dict() for name, stats in self._stats.items()}
+
 # Instância global (Singleton)    
 node_registry = NodeRegistry()
 
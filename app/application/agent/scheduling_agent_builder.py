@@ -21,20 +21,26 @@ class SchedulingAgentBuilder:
         self.node_loader = NodeLoader()
         self.edge_loader = EdgeLoader()
 
-    async def build_agent(self):
+    async def build_agent(self, checkpointer=None, store=None):
         """
         Constrói e compila o agente de agendamento com checkpointer e store.
+
+        Args:
+            checkpointer: Checkpointer a ser usado. Se omitido, usa o do Postgres.
+            store: BaseStore a ser usado. Se omitido, usa o do Postgres.
         """
-        print("Construindo o grafo do agente...")
+        logger.info("Construindo o grafo do agente...")
         self._add_nodes()
         self._add_edges()
 
         self.agent_graph.set_entry_point("ORCHESTRATOR")
 
-        print("Compilando o grafo...")
+        logger.info("Compilando o grafo...")
         # Obter checkpointer e store
-        checkpointer = await get_checkpointer()
-        store = await get_store()
+        if checkpointer is None:
+            checkpointer = await get_checkpointer()
+        if store is None:
+            store = await get_store()
         
         return self.agent_graph.compile(
             checkpointer=checkpointer,
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+from app.application.agent.scheduling_agent_builder import SchedulingAgentBuilder
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulingAgentCache:
+    """
+    Cache do agente de agendamento compilado, compartilhado por todo o processo.
+
+    O grafo é construído e compilado uma única vez (normalmente no lifespan da
+    aplicação) e reutilizado por todas as requisições. Quando o registry de nós
+    ou arestas mudar, use `rebuild()` ou `invalidate()`.
+    """
+
+    def __init__(self, checkpointer=None, store=None):
+        """
+        Inicializa o cache.
+
+        Args:
+            checkpointer: Checkpointer opcional repassado ao builder.
+            store: BaseStore opcional repassado ao builder.
+        """
+        self._checkpointer = checkpointer
+        self._store = store
+        self._agent = None
+        self._lock = asyncio.Lock()
+        self._version = 0
+        self._built_at: Optional[float] = None
+        self._build_duration: Optional[float] = None
+
+    async def get_agent(self):
+        """
+        Retorna o agente compilado, construindo-o na primeira chamada.
+        """
+        agent = self._agent
+        if agent is not None:
+            return agent
+
+        async with self._lock:
+            if self._agent is None:
+                self._agent = await self._build()
+            return self._agent
+
+    async def rebuild(self):
+        """
+        Reconstrói o agente e substitui a instância em cache.
+
+        Requisições em andamento continuam usando o agente anterior;
+        as próximas recebem o novo.
+        """
+        async with self._lock:
+            self._agent = await self._build()
+            return self._agent
+
+    def invalidate(self):
+        """
+        Descarta o agente em cache. A próxima chamada a `get_agent()` reconstrói.
+        """
+        logger.info("Cache do agente de agendamento invalidado.")
+        self._agent = None
+
+    def get_cache_info(self) -> Dict[str, Any]:
+        """Retorna informações do cache para debugging."""
+        return {
+            "cached": self._agent is not None,
+            "version": self._version,
+            "built_at": self._built_at,
+            "build_duration_ms": (
+                round(self._build_duration * 1000, 2)
+                if self._build_duration is not None
+                else None
+            ),
+        }
+
+    async def _build(self):
+        """Constrói e compila um novo agente."""
+        inicio = time.perf_counter()
+        agent = await SchedulingAgentBuilder().build_agent(
+            checkpointer=self._checkpointer, store=self._store
+        )
+        self._build_duration = time.perf_counter() - inicio
+        self._built_at = time.time()
+        self._version += 1
+        logger.info(
+            f"Agente de agendamento compilado (versão {self._version}) "
+            f"em {self._build_duration * 1000:.1f}ms."
+        )
+        return agent
+
+
+# Instância única (Singleton)
+scheduling_agent_cache = SchedulingAgentCache()
+
+
+async def get_cached_scheduling_agent():
+    """
+    Provedor de dependência que retorna o agente compilado em cache.
+    """
+    return await scheduling_agent_cache.get_agent()
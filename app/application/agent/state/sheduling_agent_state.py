@@ -18,6 +18,7 @@ class SchedulingAgentState(TypedDict):
 
     # Dados do atendimento
     scheduling_data: SchedulingData
+    etapa_inicial: Optional[str] = None    # etapa_atual no início do turno
 
     # Controle de ferramentas
     tool_calls: Optional[list] = None
@@ -33,3 +34,10 @@ class SchedulingAgentState(TypedDict):
 
     # Contexto da conversa
     conversation_context: Optional[str] = None
+
+    # Resumo das mensagens antigas (fora da janela de histórico)
+    history_summary: Optional[str] = None
+    summarized_messages: int = 0          # Mensagens do início já incluídas no resumo
+
+    # Tokens e custo acumulados na conversa (TokenUsage.model_dump())
+    token_usage: Optional[dict] = None
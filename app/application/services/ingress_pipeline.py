@@ -0,0 +1,166 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional
+
+from app.infrastructure.config.config import settings
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.pesistence.message_dedup_repository import (
+    MessageDedupRepository,
+    message_dedup_repository,
+)
+from app.presentation.dto.message_request_payload import WebhookPayload
+
+logger = logging.getLogger(__name__)
+
+ingress_messages_total = metrics_registry.counter(
+    "ingress_messages_total",
+    "Webhooks recebidos por resultado (accepted, o motivo do descarte, ou released quando o turno falha)",
+    labelnames=("result",),
+)
+
+
+class IngressFilter(ABC):
+    """
+    Filtro de entrada: decide, antes do agente, se o webhook deve ser ignorado.
+    """
+
+    @abstractmethod
+    async def verificar(self, payload: WebhookPayload) -> Optional[str]:
+        """
+        Retorna o motivo do descarte, ou None se a mensagem segue adiante.
+        """
+        pass
+
+    async def liberar(self, payload: WebhookPayload):
+        """
+        Desfaz o que `verificar` registrou para uma mensagem aceita cujo
+        processamento falhou. Por padrão, nada.
+        """
+        pass
+
+
+class FromMeFilter(IngressFilter):
+    """Ignora o eco das mensagens enviadas pela própria instância."""
+
+    async def verificar(self, payload: WebhookPayload) -> Optional[str]:
+        return "from_me" if payload.from_me else None
+
+
+class GroupFilter(IngressFilter):
+    """Ignora mensagens de grupos."""
+
+    async def verificar(self, payload: WebhookPayload) -> Optional[str]:
+        return "group" if payload.is_group else None
+
+
+class DuplicateMessageFilter(IngressFilter):
+    """
+    Ignora retentativas do provedor com o mesmo messageId.
+
+    Um conjunto em memória com TTL responde às repetições no mesmo worker
+    sem I/O; a tabela `processed_messages` no Postgres garante a
+    deduplicação entre workers. Se o Postgres falhar, a mensagem é aceita.
+
+    O ID é reservado na entrada (duas entregas simultâneas não rodam dois
+    turnos) e liberado por `liberar()` se o turno falhar, para que a
+    retentativa do provedor seja processada.
+    """
+
+    def __init__(
+        self,
+        ttl_segundos: float = 600.0,
+        max_ids: int = 50000,
+        repositorio: Optional[MessageDedupRepository] = None,
+    ):
+        self.ttl_segundos = ttl_segundos
+        self.max_ids = max_ids
+        self.repositorio = repositorio
+        self._vistos: "OrderedDict[str, float]" = OrderedDict()
+
+    def _visto_recentemente(self, message_id: str) -> bool:
+        agora = time.monotonic()
+        while self._vistos:
+            mais_antigo, expira_em = next(iter(self._vistos.items()))
+            if expira_em > agora and len(self._vistos) <= self.max_ids:
+                break
+            del self._vistos[mais_antigo]
+
+        if message_id in self._vistos:
+            return True
+        self._vistos[message_id] = agora + self.ttl_segundos
+        return False
+
+    async def verificar(self, payload: WebhookPayload) -> Optional[str]:
+        message_id = payload.message_id
+        if not message_id:
+            return None
+        if self._visto_recentemente(message_id):
+            return "duplicate"
+
+        if self.repositorio is not None:
+            try:
+                if not await self.repositorio.registrar(message_id):
+                    return "duplicate"
+            except Exception as e:
+                logger.warning(f"Falha na deduplicação persistente de {message_id}: {e}")
+        return None
+
+    async def liberar(self, payload: WebhookPayload):
+        message_id = payload.message_id
+        if not message_id:
+            return
+        self._vistos.pop(message_id, None)
+        if self.repositorio is not None:
+            try:
+                await self.repositorio.remover(message_id)
+            except Exception as e:
+                logger.warning(f"Falha ao liberar {message_id} da deduplicação persistente: {e}")
+
+
+class IngressPipeline:
+    """
+    Sequência de filtros aplicada a cada webhook. Os filtros baratos vêm
+    primeiro; o primeiro que recusar encerra a avaliação.
+    """
+
+    def __init__(self, filtros: List[IngressFilter]):
+        self.filtros = list(filtros)
+
+    def adicionar_filtro(self, filtro: IngressFilter):
+        self.filtros.append(filtro)
+
+    async def avaliar(self, payload: WebhookPayload) -> Optional[str]:
+        """
+        Retorna o motivo do descarte, ou None se a mensagem deve ser processada.
+        """
+        for filtro in self.filtros:
+            motivo = await filtro.verificar(payload)
+            if motivo is not None:
+                ingress_messages_total.inc(result=motivo)
+                logger.info(f"Webhook {payload.message_id} ignorado: {motivo}")
+                return motivo
+        ingress_messages_total.inc(result="accepted")
+        return None
+
+    async def liberar(self, payload: WebhookPayload):
+        """
+        Chamado quando uma mensagem aceita não foi processada (turno com erro),
+        para que a retentativa do provedor não seja descartada como duplicada.
+        """
+        for filtro in self.filtros:
+            await filtro.liberar(payload)
+        ingress_messages_total.inc(result="released")
+
+
+ingress_pipeline = IngressPipeline(
+    [
+        FromMeFilter(),
+        GroupFilter(),
+        DuplicateMessageFilter(
+            ttl_segundos=settings.INGRESS_DEDUP_TTL_SECONDS,
+            repositorio=message_dedup_repository if settings.INGRESS_DEDUP_PERSISTENT else None,
+        ),
+    ]
+)
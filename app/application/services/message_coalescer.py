@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.infrastructure.config.config import settings
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# (texto, message_id, futuro da requisição que trouxe a mensagem)
+Mensagem = Tuple[str, str, asyncio.Future]
+ProcessarTurno = Callable[[str, str], Awaitable[Dict[str, Any]]]
+
+coalescer_messages_total = metrics_registry.counter(
+    "message_coalescer_messages_total", "Mensagens recebidas pelo agrupador de rajadas"
+)
+coalescer_turns_total = metrics_registry.counter(
+    "message_coalescer_turns_total",
+    "Turnos do agente iniciados pelo agrupador, por desfecho (completed, failed, superseded)",
+    labelnames=("outcome",),
+)
+coalescer_llm_calls_saved_total = metrics_registry.counter(
+    "message_coalescer_llm_calls_saved_total",
+    "Estimativa de chamadas ao LLM evitadas por agrupar mensagens em um só turno",
+)
+
+# Chamadas ao LLM por turno em cada modo do orquestrador
+_CHAMADAS_POR_TURNO = {"two_call": 2, "speculative": 2, "fused": 1}
+
+
+class _EstadoThread:
+    __slots__ = ("pendentes", "primeira_em", "timer", "turno", "lote_turno", "processar")
+
+    def __init__(self):
+        self.pendentes: List[Mensagem] = []
+        self.primeira_em: Optional[float] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.turno: Optional[asyncio.Task] = None
+        self.lote_turno: List[Mensagem] = []
+        self.processar: Optional[ProcessarTurno] = None
+
+
+class MessageCoalescer:
+    """
+    Agrupa mensagens em rajada do mesmo thread_id em um único turno do agente.
+
+    Cada mensagem reinicia uma espera de `janela_segundos` (limitada a
+    `espera_maxima_segundos` desde a primeira mensagem pendente). Ao fim da
+    espera, as mensagens são unidas em um texto só e processadas juntas.
+
+    Se uma mensagem chega enquanto o turno anterior ainda está em andamento,
+    esse turno é cancelado e suas mensagens voltam para o próximo lote: o
+    cliente recebe uma única resposta que considera tudo o que escreveu.
+
+    A requisição da última mensagem do lote recebe o resultado do turno; as
+    anteriores recebem, sem resposta do agente:
+
+        {"status": "coalesced", "message": "", "coalesced_into": <messageId da última>}
+
+    Se o turno falha, todas as requisições do lote recebem o mesmo resultado
+    de erro, com os messageIds da rajada em "message_ids", para que cada uma
+    libere o seu ID na deduplicação e a retentativa do provedor seja aceita.
+
+    Desligado por padrão (MESSAGE_COALESCE_ENABLED): a janela soma até
+    `espera_maxima_segundos` à latência e muda o contrato da resposta do webhook.
+    """
+
+    def __init__(self, janela_segundos: float = 1.5, espera_maxima_segundos: float = 5.0):
+        self.janela_segundos = janela_segundos
+        self.espera_maxima_segundos = espera_maxima_segundos
+        self._threads: Dict[str, _EstadoThread] = {}
+
+    async def submeter(
+        self, thread_id: str, texto: str, message_id: str, processar: ProcessarTurno
+    ) -> Dict[str, Any]:
+        """
+        Adiciona a mensagem à rajada do thread e aguarda o turno que a processar.
+
+        Args:
+            thread_id: Conversa (telefone).
+            texto: Conteúdo da mensagem.
+            message_id: ID da mensagem no canal.
+            processar: Corrotina (texto, message_id) que executa o turno do agente.
+        """
+        loop = asyncio.get_running_loop()
+        estado = self._threads.setdefault(thread_id, _EstadoThread())
+        futuro = loop.create_future()
+        coalescer_messages_total.inc()
+
+        if estado.turno is not None and not estado.turno.done():
+            logger.info(f"Nova mensagem de {thread_id}: cancelando o turno em andamento")
+            estado.turno.cancel()
+            coalescer_turns_total.inc(outcome="superseded")
+            estado.pendentes = estado.lote_turno + estado.pendentes
+            estado.primeira_em = estado.primeira_em or time.monotonic()
+            estado.turno = None
+            estado.lote_turno = []
+
+        if not estado.pendentes:
+            estado.primeira_em = time.monotonic()
+        estado.pendentes.append((texto, message_id, futuro))
+        estado.processar = processar
+
+        if estado.timer is not None:
+            estado.timer.cancel()
+        restante = estado.primeira_em + self.espera_maxima_segundos - time.monotonic()
+        estado.timer = loop.call_later(
+            max(0.0, min(self.janela_segundos, restante)), self._disparar, thread_id
+        )
+
+        return await futuro
+
+    def _disparar(self, thread_id: str):
+        estado = self._threads.get(thread_id)
+        if estado is None or not estado.pendentes:
+            return
+        lote, estado.pendentes = estado.pendentes, []
+        estado.timer = None
+        estado.primeira_em = None
+        estado.lote_turno = lote
+        estado.turno = asyncio.create_task(self._executar(thread_id, estado, lote))
+
+    async def _executar(self, thread_id: str, estado: _EstadoThread, lote: List[Mensagem]):
+        texto = "\n".join(mensagem for mensagem, _, _ in lote)
+        # O ID da primeira mensagem identifica a HumanMessage do turno: se um
+        # turno cancelado já a gravou no checkpoint, ela é substituída
+        message_id = lote[0][1]
+        try:
+            resultado = await estado.processar(texto, message_id)
+        except asyncio.CancelledError:
+            # Mensagens e requisições seguem para o próximo lote
+            return
+        except Exception as e:
+            for _, _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            self._liberar(thread_id, estado)
+            return
+
+        if resultado.get("status") == "error":
+            coalescer_turns_total.inc(outcome="failed")
+            erro = {**resultado, "message_ids": [mid for _, mid, _ in lote]}
+            for _, _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_result(dict(erro))
+            self._liberar(thread_id, estado)
+            return
+
+        coalescer_turns_total.inc(outcome="completed")
+        if len(lote) > 1:
+            chamadas = _CHAMADAS_POR_TURNO.get(settings.ORCHESTRATOR_LLM_MODE, 2)
+            coalescer_llm_calls_saved_total.inc((len(lote) - 1) * chamadas)
+            logger.info(f"{len(lote)} mensagens de {thread_id} processadas em um único turno")
+
+        ultimo_id = lote[-1][1]
+        for _, _, futuro in lote[:-1]:
+            if not futuro.done():
+                futuro.set_result(
+                    {"status": "coalesced", "message": "", "coalesced_into": ultimo_id}
+                )
+        if not lote[-1][2].done():
+            lote[-1][2].set_result(resultado)
+        self._liberar(thread_id, estado)
+
+    def _liberar(self, thread_id: str, estado: _EstadoThread):
+        estado.turno = None
+        estado.lote_turno = []
+        if not estado.pendentes and self._threads.get(thread_id) is estado:
+            del self._threads[thread_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "threads": len(self._threads),
+            "pending_messages": sum(len(e.pendentes) for e in self._threads.values()),
+            "turns_in_flight": sum(
+                1 for e in self._threads.values() if e.turno is not None and not e.turno.done()
+            ),
+        }
+
+
+message_coalescer = MessageCoalescer(
+    janela_segundos=settings.MESSAGE_COALESCE_WINDOW_SECONDS,
+    espera_maxima_segundos=settings.MESSAGE_COALESCE_MAX_WAIT_SECONDS,
+)
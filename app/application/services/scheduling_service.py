@@ -1,11 +1,56 @@
+import asyncio
 import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Tuple
 from langchain_core.messages import HumanMessage
 from fastapi import Depends
-from app.application.agent.scheduling_agent_builder import get_scheduling_agent
-from app.domain.scheduling_data import SchedulingData
+from app.application.agent.scheduling_agent_cache import get_cached_scheduling_agent
+from app.application.agent.memory.episodic_memory_worker import episodic_memory_worker
+from app.application.services.message_coalescer import message_coalescer
+from app.domain.scheduling_data import StatusFluxo
+from app.infrastructure.config.config import settings
+from app.infrastructure.interfaces.illm_service import REPLY_STREAM_TAG
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.pesistence.thread_lock import thread_lock_manager
 
 logger = logging.getLogger(__name__)
 
+graph_run_seconds = metrics_registry.histogram(
+    "agent_graph_run_seconds",
+    "Duração da execução do grafo por modo (invoke, stream) e desfecho (ok, error, cancelled)",
+    labelnames=("mode", "outcome"),
+)
+stage_transitions_total = metrics_registry.counter(
+    "scheduling_stage_transitions_total",
+    "Turnos por etapa de origem e de destino do StatusFluxo",
+    labelnames=("from_stage", "to_stage"),
+)
+
+
+@asynccontextmanager
+async def _medir_grafo(modo: str):
+    inicio = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        graph_run_seconds.observe(time.perf_counter() - inicio, mode=modo, outcome=outcome)
+
+
+def _registrar_transicao(etapa_antes, final_state: dict):
+    etapa_depois = getattr(final_state.get("scheduling_data"), "etapa_atual", None)
+    if etapa_antes is None or etapa_depois is None:
+        return
+    stage_transitions_total.inc(
+        from_stage=getattr(etapa_antes, "value", etapa_antes),
+        to_stage=getattr(etapa_depois, "value", etapa_depois),
+    )
+
 
 class SchedulingService:
     """
@@ -29,24 +74,68 @@ class SchedulingService:
         logger.info(f"Conteúdo para análise: '{message_text}'")
         logger.info(f"ID da mensagem: '{message_id}'")
 
+        if settings.MESSAGE_COALESCE_ENABLED:
+            return await message_coalescer.submeter(
+                phone_number,
+                message_text,
+                message_id,
+                lambda texto, mid: self._processar_turno(phone_number, texto, mid),
+            )
+        return await self._processar_turno(phone_number, message_text, message_id)
+
+    async def handle_incoming_burst(
+        self, phone_number: str, mensagens: List[Tuple[str, str]]
+    ) -> List[dict]:
+        """
+        Processa, em ordem, várias mensagens (texto, message_id) do mesmo telefone.
+
+        Com o agrupador ativo, as mensagens são submetidas juntas e viram um
+        único turno; sem ele, cada uma é um turno, em sequência. Retorna um
+        resultado por mensagem, na ordem recebida.
+        """
+        if settings.MESSAGE_COALESCE_ENABLED:
+            return list(
+                await asyncio.gather(
+                    *(
+                        self.handle_incoming_message(phone_number, texto, message_id)
+                        for texto, message_id in mensagens
+                    )
+                )
+            )
+        resultados = []
+        for texto, message_id in mensagens:
+            resultados.append(
+                await self.handle_incoming_message(phone_number, texto, message_id)
+            )
+        return resultados
+
+    async def _processar_turno(
+        self, phone_number: str, message_text: str, message_id: str
+    ) -> dict:
+        """
+        Executa um turno do agente para a mensagem (ou rajada de mensagens).
+        """
         try:
             thread_id = phone_number
             config = {"configurable": {"thread_id": thread_id}}
+            # Um turno por thread por vez, também entre workers: a leitura e a
+            # gravação do checkpoint ficam dentro do lock
+            async with thread_lock_manager.travar(thread_id):
+                initial_state = self._estado_inicial(phone_number, message_text, message_id)
 
-            initial_state = {
-                "phone_number": phone_number,
-                "message_id": message_id,
-                "messages": [HumanMessage(content=message_text)],
-                "scheduling_data": SchedulingData(),
-            }
+                async with _medir_grafo("invoke"):
+                    final_state = await self.scheduling_agent.ainvoke(
+                        initial_state, config=config
+                    )
+                etapa_antes = final_state.get("etapa_inicial")
+                _registrar_transicao(etapa_antes, final_state)
 
-            final_state = await self.scheduling_agent.ainvoke(
-                initial_state, config=config
-            )
+                logger.info(
+                    f"Processamento do agente concluído. Estado final: {final_state}"
+                )
 
-            logger.info(
-                f"Processamento do agente concluído. Estado final: {final_state}"
-            )
+            if settings.EPISODIC_MEMORY_ENABLED:
+                self._registrar_memoria_episodica(thread_id, phone_number, etapa_antes, final_state)
 
             messages = final_state.get("messages", [])
 
@@ -57,6 +146,9 @@ class SchedulingService:
                 "message": last_message.content,
             }
 
+        except asyncio.CancelledError:
+            logger.info(f"Turno de {phone_number} cancelado por uma mensagem mais nova")
+            raise
         except Exception as e:
             logger.error(f"Erro ao processar mensagem com agente: {e}", exc_info=True)
             return {
@@ -64,10 +156,116 @@ class SchedulingService:
                 "message": f"Erro ao processar mensagem com agente: {e}",
             }
 
+    async def stream_incoming_message(
+        self, phone_number: str, message_text: str, message_id: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Executa um turno do agente emitindo eventos à medida que a resposta é gerada.
+
+        Eventos:
+            {"event": "token", "data": {"content": ...}}: trecho da resposta.
+            {"event": "reset", "data": {}}: a resposta recomeçou (rascunho
+                especulativo descartado); o cliente deve descartar os trechos.
+            {"event": "done", "data": {"message", "etapa_atual", "scheduling_data"}}
+            {"event": "error", "data": {"message": ...}}
+
+        Não passa pelo agrupador de rajadas: o cliente mantém a conexão aberta
+        e recebe a resposta da própria mensagem.
+        """
+        thread_id = phone_number
+        config = {"configurable": {"thread_id": thread_id}}
+        final_state = None
+        execucao_resposta = None
+        tokens_emitidos = False
+        try:
+            async with thread_lock_manager.travar(thread_id):
+                initial_state = self._estado_inicial(phone_number, message_text, message_id)
+                async with _medir_grafo("stream"):
+                    async for evento in self.scheduling_agent.astream_events(
+                        initial_state, config=config, version="v2"
+                    ):
+                        tipo = evento["event"]
+                        if tipo == "on_chat_model_start" and REPLY_STREAM_TAG in evento.get("tags", []):
+                            if execucao_resposta is not None and tokens_emitidos:
+                                yield {"event": "reset", "data": {}}
+                                tokens_emitidos = False
+                            execucao_resposta = evento["run_id"]
+                        elif tipo == "on_chat_model_stream" and evento["run_id"] == execucao_resposta:
+                            conteudo = evento["data"]["chunk"].content
+                            if conteudo:
+                                tokens_emitidos = True
+                                yield {"event": "token", "data": {"content": conteudo}}
+                        elif tipo == "on_chain_end" and not evento.get("parent_ids"):
+                            final_state = evento["data"].get("output")
+
+                if final_state and final_state.get("messages"):
+                    _registrar_transicao(final_state.get("etapa_inicial"), final_state)
+        except Exception as e:
+            logger.error(f"Erro no streaming da mensagem com agente: {e}", exc_info=True)
+            yield {"event": "error", "data": {"message": f"Erro ao processar mensagem com agente: {e}"}}
+            return
+
+        if not final_state or not final_state.get("messages"):
+            yield {"event": "error", "data": {"message": "O agente não produziu resposta"}}
+            return
+
+        if settings.EPISODIC_MEMORY_ENABLED:
+            self._registrar_memoria_episodica(
+                thread_id, phone_number, final_state.get("etapa_inicial"), final_state
+            )
+
+        resposta = final_state["messages"][-1].content
+        # Respostas que não vieram do LLM (cache, exceções) saem em um único trecho
+        if not tokens_emitidos:
+            yield {"event": "token", "data": {"content": resposta}}
+
+        scheduling_data = final_state.get("scheduling_data")
+        if hasattr(scheduling_data, "model_dump"):
+            scheduling_data = scheduling_data.model_dump(mode="json")
+        yield {
+            "event": "done",
+            "data": {
+                "message": resposta,
+                "etapa_atual": (scheduling_data or {}).get("etapa_atual"),
+                "scheduling_data": scheduling_data,
+            },
+        }
+
+    @staticmethod
+    def _estado_inicial(phone_number: str, message_text: str, message_id: str) -> dict:
+        # Sem scheduling_data: o grafo continua do valor do último checkpoint
+        # (em threads novas, o orquestrador o carrega do BaseStore)
+        return {
+            "phone_number": phone_number,
+            "message_id": message_id,
+            # O ID permite que um turno refeito substitua a mensagem já gravada
+            "messages": [HumanMessage(content=message_text, id=message_id or None)],
+            # Preenchida pelo orquestrador; zerada para não herdar a do turno anterior
+            "etapa_inicial": None,
+        }
+
+    @staticmethod
+    def _registrar_memoria_episodica(thread_id: str, phone_number: str, etapa_antes, final_state: dict):
+        """
+        Agenda o episódio no turno em que a conversa chega ao transbordo;
+        nos demais, marca a atividade para a detecção de inatividade (as
+        mensagens após o transbordo entram no episódio de inatividade).
+        Não bloqueia.
+        """
+        scheduling_data = final_state.get("scheduling_data")
+        etapa = getattr(scheduling_data, "etapa_atual", None)
+        if etapa == StatusFluxo.TRANSBORDO_HUMANO and etapa_antes != StatusFluxo.TRANSBORDO_HUMANO:
+            episodic_memory_worker.agendar(thread_id, phone_number, StatusFluxo.TRANSBORDO_HUMANO.value)
+        else:
+            episodic_memory_worker.registrar_atividade(thread_id, phone_number)
+
 
-def get_scheduling_service(agent=Depends(get_scheduling_agent)) -> SchedulingService:
+def get_scheduling_service(
+    agent=Depends(get_cached_scheduling_agent),
+) -> SchedulingService:
     """
     Provedor de dependência para o SchedulingService.
     O FastAPI chamará esta função para injetar o serviço onde for necessário.
+    O agente injetado é o compilado uma única vez por processo.
     """
     return SchedulingService(scheduling_agent=agent)
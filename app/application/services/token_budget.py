@@ -0,0 +1,197 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from app.infrastructure.config.config import settings
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.pesistence.token_usage_repository import (
+    TokenUsageRepository,
+    token_usage_repository,
+)
+from app.infrastructure.services.llm.token_usage import TokenUsage
+
+logger = logging.getLogger(__name__)
+
+budget_actions_total = metrics_registry.counter(
+    "token_budget_actions_total",
+    "Turnos em que a política de orçamento foi aplicada (downgrade_model, shrink_history, handoff)",
+    labelnames=("policy",),
+)
+usage_flush_total = metrics_registry.counter(
+    "token_usage_flush_total",
+    "Gravações em lote do consumo por conversa por resultado (flushed, failed)",
+    labelnames=("result",),
+)
+
+
+class TokenBudget:
+    """
+    Orçamento de tokens e custo por conversa.
+
+    O consumo acumulado da conversa fica no estado do grafo (`token_usage`);
+    `avaliar()` o compara com os limites e devolve a política a aplicar no
+    turno, ou None. Com o orçamento desligado, o excesso só é registrado em
+    log: nenhuma política muda o modelo, o histórico ou a etapa.
+
+    O consumo de cada turno também é somado em memória por thread_id e
+    gravado em lote na tabela agregada, a cada `intervalo_flush` segundos e
+    no shutdown. Se a gravação falhar, os incrementos voltam a ser somados
+    aos pendentes e vão no próximo lote.
+    """
+
+    def __init__(
+        self,
+        repositorio: TokenUsageRepository,
+        habilitado: bool = False,
+        max_tokens: int = 60000,
+        max_custo_usd: Optional[float] = None,
+        politica: str = "downgrade_model",
+        persistir: bool = True,
+        intervalo_flush: float = 5.0,
+    ):
+        self.repositorio = repositorio
+        self.habilitado = habilitado
+        self.max_tokens = max_tokens
+        self.max_custo_usd = max_custo_usd
+        self.politica = politica
+        self.persistir = persistir
+        self.intervalo_flush = intervalo_flush
+        self._pendentes: Dict[str, Dict[str, Any]] = {}
+        self._lock_flush = asyncio.Lock()
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def excedido(self, uso: TokenUsage) -> bool:
+        if uso.total_tokens >= self.max_tokens:
+            return True
+        return self.max_custo_usd is not None and uso.cost_usd >= self.max_custo_usd
+
+    def avaliar(self, uso: TokenUsage) -> Optional[str]:
+        """Política a aplicar no turno de uma conversa com o consumo `uso`."""
+        if not self.excedido(uso):
+            return None
+        if not self.habilitado:
+            logger.info(
+                f"Conversa acima do orçamento ({uso.total_tokens} tokens, US$ {uso.cost_usd:.4f}); "
+                f"política '{self.politica}' não aplicada (TOKEN_BUDGET_ENABLED desligado)"
+            )
+            return None
+        return self.politica
+
+    def registrar(self, thread_id: str, uso_turno: TokenUsage, politica: Optional[str] = None):
+        """Soma o consumo do turno ao próximo lote da tabela agregada. Não bloqueia."""
+        if politica:
+            budget_actions_total.inc(policy=politica)
+        if not self.persistir:
+            return
+
+        pendente = self._pendentes.setdefault(thread_id, self._vazio())
+        self._somar(pendente, uso_turno.model_dump(), turns=1, budget_policy=politica)
+        self._garantir_tarefa()
+
+    async def flush(self) -> int:
+        """Grava os incrementos pendentes e retorna quantas conversas foram gravadas."""
+        async with self._lock_flush:
+            if not self._pendentes:
+                return 0
+            lote, self._pendentes = self._pendentes, {}
+            try:
+                await self.repositorio.incrementar_lote(lote)
+            except asyncio.CancelledError:
+                self._devolver(lote)
+                raise
+            except Exception as e:
+                usage_flush_total.inc(result="failed")
+                logger.error(f"Falha ao gravar o consumo de {len(lote)} conversas: {e}")
+                self._devolver(lote)
+                return 0
+            usage_flush_total.inc(result="flushed")
+            return len(lote)
+
+    async def relatorio(self, thread_id: str) -> Dict[str, Any]:
+        """Consumo gravado da conversa (após gravar os pendentes) e situação do orçamento."""
+        await self.flush()
+        linha = await self.repositorio.buscar(thread_id)
+        uso = TokenUsage.model_validate(linha or {})
+        return {
+            "thread_id": thread_id,
+            "usage": linha,
+            "total_tokens": uso.total_tokens,
+            "budget": self.get_stats(),
+            "exceeded": self.excedido(uso),
+        }
+
+    def pendentes(self) -> int:
+        return len(self._pendentes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.habilitado,
+            "max_tokens": self.max_tokens,
+            "max_cost_usd": self.max_custo_usd,
+            "policy": self.politica,
+            "pending_threads": self.pendentes(),
+        }
+
+    @staticmethod
+    def _vazio() -> Dict[str, Any]:
+        return {
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cost_usd": 0.0,
+            "llm_calls": 0,
+            "turns": 0,
+            "budget_policy": None,
+        }
+
+    @staticmethod
+    def _somar(destino: Dict[str, Any], uso: Dict[str, Any], turns: int, budget_policy: Optional[str]):
+        for campo in ("prompt_tokens", "completion_tokens", "cost_usd", "llm_calls"):
+            destino[campo] += uso[campo]
+        destino["turns"] += turns
+        destino["budget_policy"] = budget_policy or destino["budget_policy"]
+
+    def _devolver(self, lote: Dict[str, Dict[str, Any]]):
+        # Incrementos registrados durante o flush já estão em _pendentes: soma-se o lote a eles
+        for thread_id, incremento in lote.items():
+            pendente = self._pendentes.setdefault(thread_id, self._vazio())
+            self._somar(
+                pendente, incremento, incremento["turns"], pendente["budget_policy"] or incremento["budget_policy"]
+            )
+
+    def _garantir_tarefa(self):
+        if self._tarefa is not None and not self._tarefa.done():
+            return
+        self._tarefa = asyncio.get_running_loop().create_task(
+            self._executar(), name="token-usage-flush"
+        )
+
+    async def _executar(self):
+        while True:
+            await asyncio.sleep(self.intervalo_flush)
+            await self.flush()
+
+    async def parar(self):
+        """Encerra o flush periódico e grava o que estiver pendente."""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+        await self.flush()
+        if self._pendentes:
+            logger.warning(f"Consumo de {len(self._pendentes)} conversas perdido no shutdown")
+
+
+# Instância única (Singleton)
+token_budget = TokenBudget(
+    token_usage_repository,
+    habilitado=settings.TOKEN_BUDGET_ENABLED,
+    max_tokens=settings.TOKEN_BUDGET_MAX_TOKENS,
+    max_custo_usd=settings.TOKEN_BUDGET_MAX_COST_USD,
+    politica=settings.TOKEN_BUDGET_POLICY,
+    persistir=settings.TOKEN_USAGE_PERSIST_ENABLED,
+    intervalo_flush=settings.TOKEN_USAGE_FLUSH_INTERVAL_SECONDS,
+)
+
+metrics_registry.gauge(
+    "token_usage_pending_threads", "Conversas com consumo aguardando a gravação em lote"
+).set_function(token_budget.pendentes)
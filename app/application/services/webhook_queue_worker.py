@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from app.application.agent.scheduling_agent_cache import scheduling_agent_cache
+from app.application.services.scheduling_service import SchedulingService
+from app.infrastructure.config.config import settings
+from app.infrastructure.interfaces.ioutbound_sender import IOutboundSender
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.pesistence.message_queue_repository import (
+    MessageQueueRepository,
+    message_queue_repository,
+)
+from app.infrastructure.services.outbound.http_outbound_sender import create_outbound_sender
+
+logger = logging.getLogger(__name__)
+
+queue_depth = metrics_registry.gauge(
+    "webhook_queue_depth", "Mensagens pendentes na fila de webhooks"
+)
+queue_wait_seconds = metrics_registry.histogram(
+    "webhook_queue_wait_seconds", "Tempo entre o enfileiramento e a reserva por um worker"
+)
+queue_processing_seconds = metrics_registry.histogram(
+    "webhook_queue_processing_seconds",
+    "Tempo de processamento de uma rajada reservada (agente + envio da resposta)",
+)
+queue_messages_total = metrics_registry.counter(
+    "webhook_queue_messages_total",
+    "Mensagens consumidas da fila por resultado (done, retried, send_failed)",
+    labelnames=("result",),
+)
+
+
+class WebhookQueueWorker:
+    """
+    Pool de workers que consome a fila durável de webhooks.
+
+    Cada worker reserva a rajada pendente de um telefone, executa o agente
+    pelo SchedulingService e entrega as respostas pelo IOutboundSender. Por
+    padrão cada mensagem da rajada é um turno, em sequência; só com
+    MESSAGE_COALESCE_ENABLED a rajada passa pelo agrupador e vira um único
+    turno. Em caso de erro do agente, as mensagens voltam à fila até
+    `max_tentativas`. O monitor também apaga, de hora em hora, as mensagens
+    concluídas há mais de `dias_retencao` dias.
+    """
+
+    INTERVALO_LIMPEZA_SEGUNDOS = 3600.0
+
+    def __init__(
+        self,
+        repositorio: MessageQueueRepository,
+        num_workers: int = 4,
+        intervalo_consulta: float = 0.5,
+        max_tentativas: int = 3,
+        timeout_reserva: float = 300.0,
+        intervalo_monitor: float = 5.0,
+        dias_retencao: int = 7,
+        sender: Optional[IOutboundSender] = None,
+    ):
+        self.repositorio = repositorio
+        self.num_workers = num_workers
+        self.intervalo_consulta = intervalo_consulta
+        self.max_tentativas = max_tentativas
+        self.timeout_reserva = timeout_reserva
+        self.intervalo_monitor = intervalo_monitor
+        self.dias_retencao = dias_retencao
+        self.sender = sender
+
+        self._tarefas: List[asyncio.Task] = []
+        self._parando = False
+        self._novas_mensagens = asyncio.Event()
+        self._em_processamento = 0
+        self._profundidade = 0
+        self._ultima_limpeza = 0.0
+
+    # ---- API usada pelo router ----
+
+    async def enfileirar(self, message_id: str, phone_number: str, message: str) -> int:
+        """Grava a mensagem na fila e acorda os workers deste processo."""
+        queue_id = await self.repositorio.enfileirar(message_id, phone_number, message)
+        self._novas_mensagens.set()
+        return queue_id
+
+    # ---- Ciclo de vida ----
+
+    def iniciar(self):
+        if self._tarefas:
+            return
+        if self.sender is None:
+            self.sender = create_outbound_sender()
+        self._parando = False
+        self._tarefas = [
+            asyncio.create_task(self._consumir(), name=f"webhook-queue-{i}")
+            for i in range(self.num_workers)
+        ]
+        self._tarefas.append(asyncio.create_task(self._monitorar(), name="webhook-queue-monitor"))
+        logger.info(f"Fila de webhooks iniciada ({self.num_workers} workers)")
+
+    async def parar(self, timeout: float = 30.0):
+        """Aguarda as rajadas em andamento (até `timeout`) e encerra os workers."""
+        if not self._tarefas:
+            return
+        self._parando = True
+        self._novas_mensagens.set()
+        _, pendentes = await asyncio.wait(self._tarefas, timeout=timeout)
+        for tarefa in pendentes:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+        if self.sender is not None:
+            await self.sender.aclose()
+        logger.info("Fila de webhooks encerrada.")
+
+    # ---- Processamento ----
+
+    async def _consumir(self):
+        while not self._parando:
+            try:
+                lote = await self.repositorio.reservar_rajada()
+            except Exception as e:
+                logger.error(f"Erro ao reservar mensagens da fila: {e}")
+                lote = []
+
+            if not lote:
+                await self._aguardar_mensagens()
+                continue
+
+            self._em_processamento += 1
+            try:
+                await self._processar_lote(lote)
+            finally:
+                self._em_processamento -= 1
+
+    async def _aguardar_mensagens(self):
+        try:
+            await asyncio.wait_for(self._novas_mensagens.wait(), self.intervalo_consulta)
+        except asyncio.TimeoutError:
+            pass
+        if not self._parando:
+            self._novas_mensagens.clear()
+
+    async def _processar_lote(self, lote: List[Dict[str, Any]]):
+        inicio = time.perf_counter()
+        ids = [linha["id"] for linha in lote]
+        phone_number = lote[0]["phone_number"]
+        for linha in lote:
+            queue_wait_seconds.observe(float(linha["wait_seconds"]))
+
+        try:
+            service = SchedulingService(await scheduling_agent_cache.get_agent())
+            resultados = await service.handle_incoming_burst(
+                phone_number, [(linha["message"], linha["message_id"]) for linha in lote]
+            )
+            erros = [r for r in resultados if r.get("status") == "error"]
+            if erros:
+                raise RuntimeError(erros[0].get("message", "erro no agente"))
+        except Exception as e:
+            logger.error(f"Falha ao processar a rajada de {phone_number} (ids {ids}): {e}")
+            queue_messages_total.inc(len(ids), result="retried")
+            try:
+                await self.repositorio.falhar(ids, str(e), self.max_tentativas)
+            except Exception as erro_db:
+                logger.error(f"Erro ao devolver mensagens {ids} à fila: {erro_db}")
+            return
+
+        for linha, resultado in zip(lote, resultados):
+            if resultado.get("status") != "success":
+                continue
+            try:
+                await self.sender.enviar(phone_number, resultado["message"], linha["message_id"])
+            except Exception as e:
+                # O turno já foi gravado no checkpoint: reprocessar duplicaria a resposta
+                queue_messages_total.inc(result="send_failed")
+                logger.error(f"Falha ao enviar a resposta para {phone_number}: {e}")
+
+        try:
+            await self.repositorio.concluir(ids)
+        except Exception as e:
+            logger.error(f"Erro ao concluir mensagens {ids} na fila: {e}")
+        queue_messages_total.inc(len(ids), result="done")
+        queue_processing_seconds.observe(time.perf_counter() - inicio)
+
+    async def _monitorar(self):
+        """Atualiza a profundidade da fila, devolve reservas abandonadas e limpa as concluídas."""
+        while not self._parando:
+            try:
+                liberadas = await self.repositorio.liberar_travadas(self.timeout_reserva)
+                if liberadas:
+                    logger.warning(f"{liberadas} mensagens presas em processamento voltaram à fila")
+                self._profundidade = await self.repositorio.profundidade()
+                queue_depth.set(self._profundidade)
+            except Exception as e:
+                logger.error(f"Erro ao monitorar a fila de webhooks: {e}")
+            await self._limpar_concluidas()
+            await asyncio.sleep(self.intervalo_monitor)
+
+    async def _limpar_concluidas(self):
+        agora = time.monotonic()
+        if self._ultima_limpeza and agora - self._ultima_limpeza < self.INTERVALO_LIMPEZA_SEGUNDOS:
+            return
+        self._ultima_limpeza = agora
+        try:
+            removidas = await self.repositorio.remover_concluidas(self.dias_retencao)
+        except Exception as e:
+            logger.error(f"Erro ao limpar mensagens concluídas da fila: {e}")
+            return
+        if removidas:
+            logger.info(f"{removidas} mensagens concluídas removidas da fila de webhooks")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.num_workers,
+            "running": bool(self._tarefas),
+            "batches_in_flight": self._em_processamento,
+            "queue_depth": self._profundidade,
+        }
+
+
+webhook_queue_worker = WebhookQueueWorker(
+    message_queue_repository,
+    num_workers=settings.WEBHOOK_QUEUE_WORKERS,
+    intervalo_consulta=settings.WEBHOOK_QUEUE_POLL_INTERVAL_SECONDS,
+    max_tentativas=settings.WEBHOOK_QUEUE_MAX_ATTEMPTS,
+    timeout_reserva=settings.WEBHOOK_QUEUE_LOCK_TIMEOUT_SECONDS,
+    dias_retencao=settings.WEBHOOK_QUEUE_RETENTION_DAYS,
+)
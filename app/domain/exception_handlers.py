@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from enum import Enum
 import re
+from app.utils.normalize_text import normalize_text
 
 class TipoExcecao(str, Enum):
     """Tipos de exceção que requerem intervenção humana"""
@@ -13,6 +14,7 @@ class TipoExcecao(str, Enum):
     PERGUNTA_COMPLEXA = "pergunta_complexa"
     RESISTENCIA_CLIENTE = "resistencia_cliente"
     ERRO_TECNICO = "erro_tecnico"
+    LIMITE_CONSUMO = "limite_consumo"
 
 class ExcecaoDetectada(BaseModel):
     """Modelo para exceções detectadas"""
@@ -23,122 +25,202 @@ class ExcecaoDetectada(BaseModel):
     sugestao_resposta: Optional[str] = Field(None, description="Sugestão de resposta")
     requer_transbordo: bool = Field(True, description="Se requer transbordo imediato")
 
+# Padrões por tipo de exceção, na ordem de avaliação.
+# Cada ".*" indica termos que precisam aparecer nessa ordem na mesma linha.
+_PADROES_EXCECAO = {
+    # Padrões que indicam serviços fora do escopo
+    TipoExcecao.SERVICO_FORA_ESCOPO: [
+        r"banco.*carro", r"carro.*banco", r"assento.*carro",
+        r"tapete.*carro", r"volante", r"painel.*carro",
+        r"carpete.*residencial", r"piso", r"tapete.*comum",
+        r"roupa", r"tecido.*roupa", r"cortina.*lavagem",
+        r"móvel.*madeira", r"mesa.*madeira", r"guarda.*roupa"
+    ],
+    # Padrões de reclamação
+    TipoExcecao.RECLAMACAO: [
+        r"não.*ficou.*bom", r"ficou.*pior", r"danificou", r"estragou",
+        r"mancha.*não.*saiu", r"cheiro.*ruim", r"problema.*serviço",
+        r"insatisfeito", r"não.*gostei", r"quero.*reclamar",
+        r"técnico.*mal.*educado", r"atraso", r"não.*veio"
+    ],
+    # Padrões de cancelamento
+    TipoExcecao.CANCELAMENTO: [
+        r"cancelar.*agendamento", r"desmarcar", r"não.*quero.*mais",
+        r"mudei.*ideia", r"cancelar.*serviço", r"não.*vai.*dar"
+    ],
+    # Padrões de resistência do cliente
+    TipoExcecao.RESISTENCIA_CLIENTE: [
+        r"não.*quero.*dar.*dados", r"muita.*pergunta", r"já.*disse",
+        r"esse.*mesmo.*número", r"não.*precisa.*saber",
+        r"por.*que.*precisa", r"porque.*precisa", r"muito.*burocrático"
+    ],
+    # Perguntas complexas que requerem especialista
+    TipoExcecao.PERGUNTA_COMPLEXA: [
+        r"que.*produto.*usa", r"é.*tóxico", r"faz.*mal.*pet",
+        r"alergia.*produto", r"garantia.*quanto.*tempo",
+        r"seguro.*dano", r"responsabilidade.*civil",
+        r"como.*funciona.*equipamento", r"técnica.*limpeza"
+    ],
+}
+
+# Como cada tipo detectado vira uma ExcecaoDetectada
+_REGRAS_EXCECAO = {
+    TipoExcecao.SERVICO_FORA_ESCOPO: dict(
+        confianca=0.9,
+        descricao="Serviço fora do escopo detectado",
+        prioridade=1,
+        sugestao_resposta="Para esse tipo de serviço, vou conectar você com nossa equipe especializada.",
+        requer_transbordo=True,
+    ),
+    TipoExcecao.RECLAMACAO: dict(
+        confianca=0.85,
+        descricao="Reclamação detectada",
+        prioridade=1,
+        sugestao_resposta="Entendo sua preocupação. Vou conectar você imediatamente com nossa equipe para resolver essa situação.",
+        requer_transbordo=True,
+    ),
+    TipoExcecao.CANCELAMENTO: dict(
+        confianca=0.8,
+        descricao="Solicitação de cancelamento",
+        prioridade=1,
+        sugestao_resposta="Vou conectar você com nossa equipe para processar o cancelamento.",
+        requer_transbordo=True,
+    ),
+    TipoExcecao.RESISTENCIA_CLIENTE: dict(
+        confianca=0.7,
+        descricao="Resistência detectada",
+        prioridade=2,
+        sugestao_resposta="Entendo. Esses dados são necessários apenas para o agendamento e são protegidos pela LGPD.",
+        requer_transbordo=False,
+    ),
+    TipoExcecao.PERGUNTA_COMPLEXA: dict(
+        confianca=0.8,
+        descricao="Pergunta complexa",
+        prioridade=1,
+        sugestao_resposta="Essa é uma excelente pergunta técnica. Vou conectar você com nosso especialista.",
+        requer_transbordo=True,
+    ),
+}
+
+# Distância máxima (em caracteres) entre termos consecutivos de um padrão.
+# Limitar o intervalo evita o backtracking quadrático do ".*" em mensagens longas.
+_DISTANCIA_MAXIMA_TERMOS = 120
+
+# Sem acentos, termos curtos aparecem dentro de outras palavras ("já" em
+# "jamais", "janela"; "não" em "canão"): até este tamanho, o termo precisa
+# ser uma palavra inteira
+_TAMANHO_MAXIMO_TERMO_PALAVRA = 3
+
+
+def _termo_regex(termo: str) -> str:
+    regex = re.escape(termo)
+    if len(termo) <= _TAMANHO_MAXIMO_TERMO_PALAVRA:
+        return rf"\b{regex}\b"
+    return regex
+
+
+def _compilar_matchers() -> Dict[TipoExcecao, re.Pattern]:
+    """
+    Compila os padrões de cada TipoExcecao em uma única alternação por tipo.
+    Os padrões são normalizados (sem acentos) como a mensagem.
+
+    Um matcher por tipo, e não uma alternação de todos: nela, o casamento
+    mais à esquerda de um tipo esconderia outro tipo que começa na mesma
+    posição ("não quero mais dar dados" é cancelamento e resistência).
+    """
+    lacuna = f"[^\\n]{{0,{_DISTANCIA_MAXIMA_TERMOS}}}?"
+    matchers = {}
+    for tipo, padroes in _PADROES_EXCECAO.items():
+        alternativas = (
+            lacuna.join(_termo_regex(termo) for termo in normalize_text(padrao).split(".*"))
+            for padrao in padroes
+        )
+        matchers[tipo] = re.compile("|".join(alternativas))
+    return matchers
+
+
+_MATCHERS_EXCECAO = _compilar_matchers()
+
+# Termos de cada padrão, usados como pré-filtro barato: um padrão só pode
+# casar se todos os seus termos aparecerem na mensagem (busca por substring).
+_TERMOS_PADROES = tuple(
+    frozenset(normalize_text(padrao).split(".*"))
+    for padroes in _PADROES_EXCECAO.values()
+    for padrao in padroes
+)
+_TERMOS = frozenset().union(*_TERMOS_PADROES)
+
+# Abaixo deste tamanho a varredura direta é mais barata que o pré-filtro
+_TAMANHO_MINIMO_PREFILTRO = 200
+
+
+def _pode_conter_excecao(mensagem_normalizada: str) -> bool:
+    """Retorna False quando nenhum padrão tem todos os termos na mensagem."""
+    if len(mensagem_normalizada) < _TAMANHO_MINIMO_PREFILTRO:
+        return True
+    presentes = {termo for termo in _TERMOS if termo in mensagem_normalizada}
+    return any(termos <= presentes for termos in _TERMOS_PADROES)
+
+
+def validar_cpf(cpf: str) -> bool:
+    """
+    Valida o CPF: 11 dígitos, não repetidos, com os dois dígitos
+    verificadores corretos (módulo 11).
+    """
+    cpf_numeros = re.sub(r'[^0-9]', '', cpf)
+    if len(cpf_numeros) != 11 or cpf_numeros == cpf_numeros[0] * 11:
+        return False
+
+    digitos = [int(d) for d in cpf_numeros]
+    for tamanho in (9, 10):
+        soma = sum(d * peso for d, peso in zip(digitos[:tamanho], range(tamanho + 1, 1, -1)))
+        verificador = (soma * 10) % 11 % 10
+        if digitos[tamanho] != verificador:
+            return False
+    return True
+
+
 class ExceptionDetector:
     """Detector inteligente de exceções e casos especiais"""
     
-    def __init__(self):
-        # Padrões que indicam serviços fora do escopo
-        self.servicos_fora_escopo = [
-            r"banco.*carro", r"carro.*banco", r"assento.*carro",
-            r"tapete.*carro", r"volante", r"painel.*carro",
-            r"carpete.*residencial", r"piso", r"tapete.*comum",
-            r"roupa", r"tecido.*roupa", r"cortina.*lavagem",
-            r"móvel.*madeira", r"mesa.*madeira", r"guarda.*roupa"
-        ]
-        
-        # Padrões de reclamação
-        self.padroes_reclamacao = [
-            r"não.*ficou.*bom", r"ficou.*pior", r"danificou", r"estragou",
-            r"mancha.*não.*saiu", r"cheiro.*ruim", r"problema.*serviço",
-            r"insatisfeito", r"não.*gostei", r"quero.*reclamar",
-            r"técnico.*mal.*educado", r"atraso", r"não.*veio"
-        ]
-        
-        # Padrões de cancelamento
-        self.padroes_cancelamento = [
-            r"cancelar.*agendamento", r"desmarcar", r"não.*quero.*mais",
-            r"mudei.*ideia", r"cancelar.*serviço", r"não.*vai.*dar"
-        ]
-        
-        # Padrões de resistência do cliente
-        self.padroes_resistencia = [
-            r"não.*quero.*dar.*dados", r"muita.*pergunta", r"já.*disse",
-            r"esse.*mesmo.*número", r"não.*precisa.*saber",
-            r"por.*que.*precisa", r"muito.*burocrático"
-        ]
-        
-        # Perguntas complexas que requerem especialista
-        self.perguntas_complexas = [
-            r"que.*produto.*usa", r"é.*tóxico", r"faz.*mal.*pet",
-            r"alergia.*produto", r"garantia.*quanto.*tempo",
-            r"seguro.*dano", r"responsabilidade.*civil",
-            r"como.*funciona.*equipamento", r"técnica.*limpeza"
-        ]
-    
     def detectar_excecoes(self, mensagem: str, contexto: dict = None) -> List[ExcecaoDetectada]:
-        """Detecta exceções na mensagem do usuário"""
-        excecoes = []
-        mensagem_lower = mensagem.lower()
-        
-        # 1. Detectar serviços fora do escopo
-        for padrao in self.servicos_fora_escopo:
-            if re.search(padrao, mensagem_lower):
-                excecoes.append(ExcecaoDetectada(
-                    tipo=TipoExcecao.SERVICO_FORA_ESCOPO,
-                    confianca=0.9,
-                    descricao=f"Serviço fora do escopo detectado: {padrao}",
-                    prioridade=1,
-                    sugestao_resposta="Para esse tipo de serviço, vou conectar você com nossa equipe especializada.",
-                    requer_transbordo=True
-                ))
-        
-        # 2. Detectar reclamações
-        for padrao in self.padroes_reclamacao:
-            if re.search(padrao, mensagem_lower):
-                excecoes.append(ExcecaoDetectada(
-                    tipo=TipoExcecao.RECLAMACAO,
-                    confianca=0.85,
-                    descricao=f"Reclamação detectada: {padrao}",
-                    prioridade=1,
-                    sugestao_resposta="Entendo sua preocupação. Vou conectar você imediatamente com nossa equipe para resolver essa situação.",
-                    requer_transbordo=True
-                ))
-        
-        # 3. Detectar cancelamentos
-        for padrao in self.padroes_cancelamento:
-            if re.search(padrao, mensagem_lower):
-                excecoes.append(ExcecaoDetectada(
-                    tipo=TipoExcecao.CANCELAMENTO,
-                    confianca=0.8,
-                    descricao=f"Solicitação de cancelamento: {padrao}",
-                    prioridade=1,
-                    sugestao_resposta="Vou conectar você com nossa equipe para processar o cancelamento.",
-                    requer_transbordo=True
-                ))
-        
-        # 4. Detectar resistência do cliente
-        for padrao in self.padroes_resistencia:
-            if re.search(padrao, mensagem_lower):
-                excecoes.append(ExcecaoDetectada(
-                    tipo=TipoExcecao.RESISTENCIA_CLIENTE,
-                    confianca=0.7,
-                    descricao=f"Resistência detectada: {padrao}",
-                    prioridade=2,
-                    sugestao_resposta="Entendo. Esses dados são necessários apenas para o agendamento e são protegidos pela LGPD.",
-                    requer_transbordo=False
-                ))
-        
-        # 5. Detectar perguntas complexas
-        for padrao in self.perguntas_complexas:
-            if re.search(padrao, mensagem_lower):
-                excecoes.append(ExcecaoDetectada(
-                    tipo=TipoExcecao.PERGUNTA_COMPLEXA,
-                    confianca=0.8,
-                    descricao=f"Pergunta complexa: {padrao}",
-                    prioridade=1,
-                    sugestao_resposta="Essa é uma excelente pergunta técnica. Vou conectar você com nosso especialista.",
-                    requer_transbordo=True
-                ))
-        
-        # 6. Detectar horário não comercial (baseado no contexto se disponível)
+        """
+        Detecta exceções na mensagem do usuário.
+
+        A mensagem é normalizada uma única vez, passa por um pré-filtro de
+        termos e, se necessário, é varrida pelo matcher pré-compilado de
+        cada tipo. Retorna no máximo uma exceção por tipo, na ordem de avaliação dos
+        tipos (a mesma da detecção padrão a padrão), da qual depende a
+        escolha da exceção principal em `_tratar_excecoes`.
+        """
+        # Horário não comercial (baseado no contexto se disponível)
         if contexto and contexto.get("horario_nao_comercial"):
-            excecoes.append(ExcecaoDetectada(
+            return [ExcecaoDetectada(
                 tipo=TipoExcecao.HORARIO_NAO_COMERCIAL,
                 confianca=1.0,
                 descricao="Atendimento fora do horário comercial",
                 prioridade=1,
                 sugestao_resposta="Nosso horário de atendimento é Segunda à Sexta das 08:00 às 18:00, Sábados das 08:00 às 12:00. Retornaremos em breve!",
                 requer_transbordo=True
+            )]
+
+        mensagem_normalizada = normalize_text(mensagem)
+        if not _pode_conter_excecao(mensagem_normalizada):
+            return []
+
+        excecoes = []
+        for tipo, matcher in _MATCHERS_EXCECAO.items():
+            match = matcher.search(mensagem_normalizada)
+            if match is None:
+                continue
+            regra = _REGRAS_EXCECAO[tipo]
+            excecoes.append(ExcecaoDetectada(
+                tipo=tipo,
+                confianca=regra["confianca"],
+                descricao=f"{regra['descricao']}: {match.group(0)[:60]}",
+                prioridade=regra["prioridade"],
+                sugestao_resposta=regra["sugestao_resposta"],
+                requer_transbordo=regra["requer_transbordo"]
             ))
         
         return excecoes
@@ -186,9 +268,8 @@ class ExceptionDetector:
         return excecoes
     
     def _validar_cpf(self, cpf: str) -> bool:
-        """Valida formato básico do CPF"""
-        cpf_numeros = re.sub(r'[^0-9]', '', cpf)
-        return len(cpf_numeros) == 11 and not cpf_numeros == cpf_numeros[0] * 11
+        """Valida formato e dígitos verificadores do CPF"""
+        return validar_cpf(cpf)
     
     def _validar_telefone(self, telefone: str) -> bool:
         """Valida formato básico do telefone"""
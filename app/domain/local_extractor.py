@@ -0,0 +1,217 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Tuple
+import re
+from app.domain.exception_handlers import validar_cpf
+from app.domain.scheduling_data import StatusFluxo
+from app.utils.normalize_text import normalize_text
+
+
+class CampoExtraido(BaseModel):
+    """Campo extraído localmente, com o nível de confiança da extração"""
+    valor: Any = Field(..., description="Valor extraído")
+    confianca: float = Field(..., description="Nível de confiança (0-1)")
+
+
+class ExtracaoLocal(BaseModel):
+    """Resultado da extração local de uma mensagem"""
+    campos: Dict[str, CampoExtraido] = Field(default_factory=dict)
+    mensagem_coberta: bool = Field(
+        False, description="Se toda a mensagem foi explicada pelos campos extraídos"
+    )
+
+    def para_extracted_info(self, etapa_atual: StatusFluxo) -> Dict[str, Any]:
+        """Converte para o mesmo formato retornado por `extract_information`."""
+        info = {nome: campo.valor for nome, campo in self.campos.items()}
+        info.setdefault("foto_enviada", False)
+        info.setdefault("quer_agendar", False)
+        etapa = StatusFluxo(etapa_atual)
+        if etapa == StatusFluxo.INICIAL and "item_mencionado" in info:
+            etapa = StatusFluxo.IDENTIFICACAO_ITEM
+        info["etapa_detectada"] = etapa.value
+        return info
+
+
+# Campos que cada etapa está coletando. A extração local só dispensa o LLM
+# quando todos os campos encontrados na mensagem pertencem à etapa atual.
+CAMPOS_POR_ETAPA = {
+    StatusFluxo.INICIAL: {"quantidade_itens", "item_mencionado", "tamanho_item"},
+    StatusFluxo.IDENTIFICACAO_ITEM: {"quantidade_itens", "item_mencionado", "tamanho_item"},
+    StatusFluxo.CAPTACAO_LOCALIZACAO: {"cidade", "cep"},
+    StatusFluxo.ORCAMENTO: {"aceita_orcamento", "cidade"},
+    StatusFluxo.CONFIRMACAO_ORCAMENTO: {"aceita_orcamento", "telefone", "cpf", "email", "cep"},
+    StatusFluxo.IDENTIFICACAO_CLIENTE: {"telefone", "cpf", "email", "cep"},
+    StatusFluxo.TRANSBORDO_HUMANO: set(),
+}
+
+# Cidades reconhecidas (forma normalizada -> forma de exibição)
+CIDADES_CONHECIDAS = {
+    normalize_text(cidade): cidade
+    for cidade in [
+        "Aracaju", "Fortaleza", "Salvador", "São Paulo", "Recife", "Maceió",
+        "João Pessoa", "Natal", "Teresina", "São Luís", "Belém", "Manaus",
+        "Brasília", "Goiânia", "Belo Horizonte", "Rio de Janeiro", "Vitória",
+        "Curitiba", "Florianópolis", "Porto Alegre", "Campo Grande", "Cuiabá",
+        "Palmas", "Macapá", "Boa Vista", "Porto Velho", "Rio Branco",
+        "Campinas", "Caucaia", "Maracanaú", "Olinda", "Jaboatão dos Guararapes",
+        "Feira de Santana", "Nossa Senhora do Socorro", "Lauro de Freitas",
+    ]
+}
+
+_RESPOSTAS_ACEITE = {
+    "sim": True, "ok": True, "okay": True, "pode ser": True, "pode": True,
+    "fechado": True, "fechou": True, "combinado": True, "aceito": True,
+    "pode agendar": True, "bora": True, "claro": True, "perfeito": True,
+    "nao": False, "nao quero": False, "agora nao": False,
+}
+
+_NUMEROS_POR_EXTENSO = {
+    "um": 1, "uma": 1, "dois": 2, "duas": 2, "tres": 3, "quatro": 4,
+    "cinco": 5, "seis": 6, "sete": 7, "oito": 8, "nove": 9, "dez": 10,
+}
+
+# Palavras que não carregam informação além dos campos extraídos
+_PALAVRAS_NEUTRAS = {
+    "meu", "minha", "o", "a", "e", "eh", "de", "do", "da", "em", "no", "na",
+    "cpf", "email", "e-mail", "mail", "telefone", "fone", "tel", "celular",
+    "whatsapp", "zap", "numero", "n", "cep", "segue", "aqui", "ta", "esta",
+    "sou", "moro", "fico", "cidade", "e ai", "entao", "certo", "beleza",
+    "por", "favor", "obrigado", "obrigada", "pra", "para", "contato",
+}
+
+_RE_EMAIL = re.compile(r"[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}")
+_RE_CPF_FORMATADO = re.compile(r"(?<!\d)\d{3}\.\d{3}\.\d{3}-?\d{2}(?!\d)")
+_RE_TELEFONE = re.compile(
+    r"(?<!\d)(?:\+?55[\s.-]?)?\(?([1-9]{2})\)?[\s.-]?(9?\d{4})[\s.-]?(\d{4})(?!\d)"
+)
+_RE_ONZE_DIGITOS = re.compile(r"(?<!\d)\d{11}(?!\d)")
+_RE_CEP = re.compile(r"(?<![\d.])(\d{5})-?(\d{3})(?![\d-])")
+_ITENS = {
+    "sofa": "sofá", "cadeira": "cadeira", "colchao": "colchão",
+    "poltrona": "poltrona", "cabeceira": "cabeceira",
+}
+
+_RE_QUANTIDADE = re.compile(
+    r"\b(\d{1,2}|" + "|".join(_NUMEROS_POR_EXTENSO) + r")\s+"
+    r"(sofa|cadeira|colchao|colchoe|poltrona|cabeceira|unidade|iten|item|peca)s?\b"
+)
+_RE_TAMANHO = re.compile(r"\b(\d)\s+lugares\b")
+_RE_SEPARADORES = re.compile(r"[\s,;:.!?()/\-]+")
+
+
+class LocalExtractor:
+    """
+    Extrator determinístico (regex + validação) para mensagens curtas que
+    contêm apenas dados estruturados: telefone, CPF, e-mail, CEP, quantidade
+    de itens, tamanho em lugares, cidade conhecida ou aceite ("sim", "ok").
+    """
+
+    def __init__(self, confianca_minima: float = 0.9):
+        self.confianca_minima = confianca_minima
+
+    def extrair(self, mensagem: str) -> ExtracaoLocal:
+        """Extrai os campos reconhecíveis e verifica se cobrem toda a mensagem."""
+        texto = normalize_text(mensagem).strip()
+        campos: Dict[str, CampoExtraido] = {}
+        trechos: List[Tuple[int, int]] = []
+
+        def registrar(nome: str, valor: Any, confianca: float, inicio: int, fim: int):
+            atual = campos.get(nome)
+            if atual is None or confianca > atual.confianca:
+                campos[nome] = CampoExtraido(valor=valor, confianca=confianca)
+            trechos.append((inicio, fim))
+
+        for m in _RE_EMAIL.finditer(texto):
+            registrar("email", m.group(0), 0.98, *m.span())
+
+        for m in _RE_CPF_FORMATADO.finditer(texto):
+            if validar_cpf(m.group(0)):
+                registrar("cpf", re.sub(r"\D", "", m.group(0)), 0.99, *m.span())
+
+        for m in _RE_TELEFONE.finditer(texto):
+            if self._sobrepoe(m.span(), trechos):
+                continue
+            ddd, prefixo, sufixo = m.groups()
+            numero = ddd + prefixo + sufixo
+            digitos_originais = re.sub(r"\D", "", m.group(0))
+            if len(numero) == 11 and not prefixo.startswith("9"):
+                continue
+            if len(digitos_originais) == 11 and validar_cpf(digitos_originais):
+                # 11 dígitos sem formatação: pode ser CPF ou celular
+                registrar("telefone", numero, 0.5, *m.span())
+                registrar("cpf", digitos_originais, 0.5, *m.span())
+                continue
+            confianca = 0.95 if len(numero) == 11 else 0.85
+            registrar("telefone", numero, confianca, *m.span())
+
+        for m in _RE_ONZE_DIGITOS.finditer(texto):
+            if not self._sobrepoe(m.span(), trechos) and validar_cpf(m.group(0)):
+                registrar("cpf", m.group(0), 0.9, *m.span())
+
+        for m in _RE_CEP.finditer(texto):
+            if self._sobrepoe(m.span(), trechos):
+                continue
+            confianca = 0.95 if "-" in m.group(0) or "cep" in texto else 0.7
+            registrar("cep", f"{m.group(1)}-{m.group(2)}", confianca, *m.span())
+
+        for m in _RE_QUANTIDADE.finditer(texto):
+            quantidade, item = m.groups()
+            valor = int(quantidade) if quantidade.isdigit() else _NUMEROS_POR_EXTENSO[quantidade]
+            if valor > 0:
+                registrar("quantidade_itens", valor, 0.9, *m.span())
+                item = "colchao" if item == "colchoe" else item
+                if item in _ITENS:
+                    registrar("item_mencionado", _ITENS[item], 0.9, *m.span())
+
+        for m in _RE_TAMANHO.finditer(texto):
+            registrar("tamanho_item", f"{m.group(1)} lugares", 0.9, *m.span())
+
+        residuo = self._residuo(texto, trechos)
+
+        cidade = CIDADES_CONHECIDAS.get(residuo) or CIDADES_CONHECIDAS.get(
+            self._sem_palavras_neutras(residuo)
+        )
+        if cidade:
+            campos["cidade"] = CampoExtraido(valor=cidade, confianca=0.95)
+            residuo = ""
+
+        aceite = _RESPOSTAS_ACEITE.get(residuo)
+        if aceite is not None:
+            campos["aceita_orcamento"] = CampoExtraido(valor=aceite, confianca=0.9)
+            residuo = ""
+
+        residuo = self._sem_palavras_neutras(residuo)
+        return ExtracaoLocal(campos=campos, mensagem_coberta=bool(campos) and not residuo)
+
+    def dispensa_llm(self, extracao: ExtracaoLocal, etapa_atual: StatusFluxo) -> bool:
+        """
+        Indica se a extração local basta para o turno: a mensagem foi
+        inteiramente explicada por campos de alta confiança, todos eles
+        coletados pela etapa atual.
+        """
+        if not extracao.mensagem_coberta:
+            return False
+        campos_da_etapa = CAMPOS_POR_ETAPA.get(StatusFluxo(etapa_atual), set())
+        return all(
+            nome in campos_da_etapa and campo.confianca >= self.confianca_minima
+            for nome, campo in extracao.campos.items()
+        )
+
+    @staticmethod
+    def _sobrepoe(span: Tuple[int, int], trechos: List[Tuple[int, int]]) -> bool:
+        inicio, fim = span
+        return any(inicio < t_fim and t_inicio < fim for t_inicio, t_fim in trechos)
+
+    @staticmethod
+    def _residuo(texto: str, trechos: List[Tuple[int, int]]) -> str:
+        """Remove os trechos extraídos e normaliza os separadores."""
+        partes, posicao = [], 0
+        for inicio, fim in sorted(trechos):
+            if inicio > posicao:
+                partes.append(texto[posicao:inicio])
+            posicao = max(posicao, fim)
+        partes.append(texto[posicao:])
+        return _RE_SEPARADORES.sub(" ", " ".join(partes)).strip()
+
+    @staticmethod
+    def _sem_palavras_neutras(texto: str) -> str:
+        return " ".join(p for p in texto.split() if p not in _PALAVRAS_NEUTRAS)
@@ -25,7 +25,7 @@ class EpisodicMemory(Base):
     
     episode_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey('users.user_id'))
-    thread_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    thread_id: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
     summary: Mapped[Optional[str]] = mapped_column(TEXT)
     outcome: Mapped[Optional[str]] = mapped_column(String(50))
     key_entities: Mapped[Optional[dict]] = mapped_column(JSON)
@@ -35,6 +35,7 @@ class ClienteInfo(BaseModel):
     email: Optional[str] = None
     cpf: Optional[str] = None
     endereco_completo: Optional[str] = None
+    cep: Optional[str] = None
     ponto_referencia: Optional[str] = None
     status_erp: StatusClienteERP = StatusClienteERP.NOVO
     cliente_id_erp: Optional[str] = None
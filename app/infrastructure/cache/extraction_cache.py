@@ -0,0 +1,135 @@
+# app/infrastructure/cache/extraction_cache.py
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.infrastructure.cache.memory_cache_backend import InMemoryCacheBackend
+from app.infrastructure.config.config import settings
+from app.infrastructure.interfaces.icache_backend import ICacheBackend
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.utils.normalize_text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Campos que identificam o cliente: resultados com eles nunca são
+# compartilhados entre telefones
+CAMPOS_PESSOAIS = ("nome_completo", "telefone", "email", "cpf", "endereco_completo", "cep")
+
+extraction_cache_requests_total = metrics_registry.counter(
+    "extraction_cache_requests_total",
+    "Consultas ao cache de extração por resultado (hit, miss, coalesced)",
+    labelnames=("result",),
+)
+
+
+class ExtractionCache:
+    """
+    Cache do resultado de `extract_information`, que depende apenas do texto
+    normalizado da mensagem.
+
+    - Resultados sem dados pessoais são compartilhados entre conversas
+      ("sim", "pode ser", "2 lugares"...).
+    - Resultados com dados pessoais ficam restritos ao telefone que os enviou.
+    - Chamadas concorrentes com o mesmo texto aguardam uma única extração
+      em andamento (single-flight).
+
+    As chaves são hashes, então o texto da mensagem não é gravado no backend.
+    """
+
+    def __init__(self, backend: ICacheBackend, ttl_segundos: float = 3600.0):
+        self.backend = backend
+        self.ttl_segundos = ttl_segundos
+        self._em_andamento: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _normalizar(mensagem: str) -> str:
+        return " ".join(normalize_text(mensagem).split()).strip(" .!?")
+
+    @staticmethod
+    def _chave(*partes: str) -> str:
+        return "extraction:" + hashlib.sha256("\x00".join(partes).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def tem_dados_pessoais(extracted_info: Dict[str, Any]) -> bool:
+        return any(extracted_info.get(campo) for campo in CAMPOS_PESSOAIS)
+
+    async def get_or_extract(
+        self,
+        mensagem: str,
+        telefone: Optional[str],
+        extrair: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """
+        Retorna a extração em cache para a mensagem ou executa `extrair`.
+
+        Args:
+            mensagem: Texto da mensagem do cliente.
+            telefone: Telefone da conversa (escopo dos resultados com dados pessoais).
+            extrair: Corrotina que faz a extração via LLM.
+        """
+        texto = self._normalizar(mensagem)
+        if not texto:
+            return await extrair()
+
+        chave_compartilhada = self._chave(texto)
+        chave_telefone = self._chave(telefone or "", texto)
+
+        for chave in (chave_compartilhada, chave_telefone):
+            resultado = await self.backend.get(chave)
+            if resultado is not None:
+                extraction_cache_requests_total.inc(result="hit")
+                return dict(resultado)
+
+        # O resultado depende só do texto, então quem manda o mesmo texto ao
+        # mesmo tempo recebe o que a própria extração retornaria
+        em_andamento = self._em_andamento.get(chave_compartilhada)
+        if em_andamento is not None:
+            extraction_cache_requests_total.inc(result="coalesced")
+            return dict(await asyncio.shield(em_andamento))
+
+        extraction_cache_requests_total.inc(result="miss")
+        tarefa = asyncio.ensure_future(extrair())
+        self._em_andamento[chave_compartilhada] = tarefa
+        try:
+            resultado = await asyncio.shield(tarefa)
+        finally:
+            if tarefa.done():
+                self._em_andamento.pop(chave_compartilhada, None)
+            else:
+                # Quem iniciou foi cancelado; a extração continua para os demais
+                tarefa.add_done_callback(
+                    lambda _: self._em_andamento.pop(chave_compartilhada, None)
+                )
+
+        # {} é o retorno de erro de extract_information: não vai para o cache
+        if resultado:
+            chave = (
+                chave_telefone if self.tem_dados_pessoais(resultado) else chave_compartilhada
+            )
+            try:
+                await self.backend.set(chave, dict(resultado), ttl=self.ttl_segundos)
+            except Exception as e:
+                logger.warning(f"Falha ao gravar no cache de extração: {e}")
+        return dict(resultado)
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = extraction_cache_requests_total.value(result="hit")
+        coalesced = extraction_cache_requests_total.value(result="coalesced")
+        total = hits + coalesced + extraction_cache_requests_total.value(result="miss")
+        return {
+            "hits": hits,
+            "coalesced": coalesced,
+            "lookups": total,
+            "llm_calls_saved_ratio": (hits + coalesced) / total if total else 0.0,
+            "in_flight": len(self._em_andamento),
+        }
+
+
+extraction_cache = ExtractionCache(
+    backend=InMemoryCacheBackend(
+        max_entries=settings.EXTRACTION_CACHE_MAX_ENTRIES,
+        default_ttl=settings.EXTRACTION_CACHE_TTL_SECONDS,
+    ),
+    ttl_segundos=settings.EXTRACTION_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,45 @@
+# app/infrastructure/cache/memory_cache_backend.py
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from app.infrastructure.interfaces.icache_backend import ICacheBackend
+
+
+class InMemoryCacheBackend(ICacheBackend):
+    """
+    Backend em memória do processo com expiração por TTL e descarte LRU
+    acima de `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 5000, default_ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,189 @@
+# app/infrastructure/cache/response_cache.py
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.infrastructure.config.config import settings
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.vector.hashing_embedder import (
+    HashingEmbedder,
+    cosine_similarity,
+    hashing_embedder,
+)
+from app.utils.normalize_text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_RE_NUMEROS = re.compile(r"\d+")
+_RE_PONTUACAO = re.compile(r"[^\w\s]")
+
+response_cache_requests_total = metrics_registry.counter(
+    "response_cache_requests_total",
+    "Consultas ao cache de respostas por resultado (exact, semantic, miss, bypass)",
+    labelnames=("result",),
+)
+
+
+class _Entrada:
+    __slots__ = ("resposta", "vetor", "numeros", "expira_em")
+
+    def __init__(self, resposta: str, vetor: np.ndarray, numeros: FrozenSet[str], expira_em: float):
+        self.resposta = resposta
+        self.vetor = vetor
+        self.numeros = numeros
+        self.expira_em = expira_em
+
+
+class SemanticResponseCache:
+    """
+    Cache de respostas do orquestrador para perguntas repetidas.
+
+    As entradas são separadas por escopo (etapa, franquia, item...) e uma
+    mensagem encontra resposta em duas etapas:
+
+    1. Texto normalizado idêntico (sem acentos, caixa e pontuação);
+    2. Similaridade de cosseno entre embeddings locais >= limiar, desde que
+       os números da mensagem sejam os mesmos ("2 lugares" != "3 lugares").
+
+    Entradas expiram por TTL e, acima de `max_entradas`, as menos usadas
+    recentemente são descartadas (LRU).
+    """
+
+    def __init__(
+        self,
+        max_entradas: int = 2000,
+        ttl_segundos: float = 3600.0,
+        limiar_similaridade: float = 0.92,
+        embedder: HashingEmbedder = hashing_embedder,
+    ):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.limiar_similaridade = limiar_similaridade
+        self.embedder = embedder
+        self._entradas: "OrderedDict[Tuple[Hashable, str], _Entrada]" = OrderedDict()
+        # Matriz de vetores por escopo, reconstruída apenas após alterações
+        self._matrizes: Dict[Hashable, Tuple[List[str], np.ndarray]] = {}
+
+    @staticmethod
+    def _normalizar(mensagem: str) -> str:
+        return " ".join(_RE_PONTUACAO.sub(" ", normalize_text(mensagem)).split())
+
+    def buscar(self, mensagem: str, escopo: Hashable) -> Optional[str]:
+        """Retorna a resposta em cache para a mensagem no escopo, se houver."""
+        texto = self._normalizar(mensagem)
+        if not texto:
+            response_cache_requests_total.inc(result="miss")
+            return None
+
+        agora = time.monotonic()
+        chave = (escopo, texto)
+        entrada = self._entradas.get(chave)
+        if entrada is not None:
+            if entrada.expira_em > agora:
+                self._entradas.move_to_end(chave)
+                response_cache_requests_total.inc(result="exact")
+                return entrada.resposta
+            self._remover(chave)
+
+        resposta = self._buscar_similar(texto, escopo, agora)
+        response_cache_requests_total.inc(result="semantic" if resposta else "miss")
+        return resposta
+
+    def _buscar_similar(self, texto: str, escopo: Hashable, agora: float) -> Optional[str]:
+        textos, matriz = self._matriz_do_escopo(escopo)
+        if not textos:
+            return None
+
+        similaridades = cosine_similarity(matriz, self.embedder.embed(texto))
+        numeros = frozenset(_RE_NUMEROS.findall(texto))
+        for indice in np.argsort(similaridades)[::-1]:
+            if similaridades[indice] < self.limiar_similaridade:
+                break
+            chave = (escopo, textos[indice])
+            entrada = self._entradas[chave]
+            if entrada.expira_em <= agora or entrada.numeros != numeros:
+                continue
+            self._entradas.move_to_end(chave)
+            logger.debug(
+                f"Cache semântico: '{texto}' ~ '{textos[indice]}' "
+                f"(similaridade {similaridades[indice]:.3f})"
+            )
+            return entrada.resposta
+        return None
+
+    def _matriz_do_escopo(self, escopo: Hashable) -> Tuple[List[str], np.ndarray]:
+        if escopo not in self._matrizes:
+            textos = [texto for (e, texto) in self._entradas if e == escopo]
+            matriz = (
+                np.stack([self._entradas[(escopo, t)].vetor for t in textos])
+                if textos
+                else np.zeros((0, self.embedder.dimensao), dtype=np.float32)
+            )
+            self._matrizes[escopo] = (textos, matriz)
+        return self._matrizes[escopo]
+
+    def armazenar(self, mensagem: str, escopo: Hashable, resposta: str):
+        """Guarda a resposta gerada para a mensagem no escopo."""
+        texto = self._normalizar(mensagem)
+        if not texto or not resposta:
+            return
+
+        chave = (escopo, texto)
+        self._entradas[chave] = _Entrada(
+            resposta=resposta,
+            vetor=self.embedder.embed(texto),
+            numeros=frozenset(_RE_NUMEROS.findall(texto)),
+            expira_em=time.monotonic() + self.ttl_segundos,
+        )
+        self._entradas.move_to_end(chave)
+        self._matrizes.pop(escopo, None)
+
+        while len(self._entradas) > self.max_entradas:
+            self._remover(next(iter(self._entradas)))
+
+    def registrar_desvio(self):
+        """Registra um turno que não consultou o cache (ex.: dados pessoais)."""
+        response_cache_requests_total.inc(result="bypass")
+
+    def _remover(self, chave: Tuple[Hashable, str]):
+        self._entradas.pop(chave, None)
+        self._matrizes.pop(chave[0], None)
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def limpar(self):
+        self._entradas.clear()
+        self._matrizes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        acertos = response_cache_requests_total.value(
+            result="exact"
+        ) + response_cache_requests_total.value(result="semantic")
+        consultas = acertos + response_cache_requests_total.value(result="miss")
+        return {
+            "entries": len(self),
+            "scopes": len({escopo for escopo, _ in self._entradas}),
+            "hits": acertos,
+            "lookups": consultas,
+            "hit_ratio": acertos / consultas if consultas else 0.0,
+        }
+
+
+response_cache = SemanticResponseCache(
+    max_entradas=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_segundos=settings.RESPONSE_CACHE_TTL_SECONDS,
+    limiar_similaridade=settings.RESPONSE_CACHE_SIMILARITY_THRESHOLD,
+)
+
+metrics_registry.gauge(
+    "response_cache_hit_ratio",
+    "Fração das consultas ao cache de respostas que evitaram a geração pelo LLM",
+).set_function(lambda: response_cache.get_stats()["hit_ratio"])
+metrics_registry.gauge(
+    "response_cache_entries", "Entradas no cache de respostas"
+).set_function(lambda: len(response_cache))
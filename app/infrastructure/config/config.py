@@ -1,3 +1,4 @@
+from typing import Dict, List, Literal, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field, SecretStr
 
@@ -24,6 +25,298 @@ class Settings(BaseSettings):
     OPENAI_MODEL_NAME: str = Field(..., description="Modelo do OpenAI")
     OPENAI_TEMPERATURE: float = Field(..., description="Temperatura do OpenAI")
 
+    # ==== Pool HTTP dos clientes de LLM ====
+    LLM_HTTP_MAX_CONNECTIONS: int = Field(
+        default=50, description="Máximo de conexões HTTP simultâneas com o provedor de LLM"
+    )
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(
+        default=20, description="Máximo de conexões keep-alive ociosas mantidas no pool"
+    )
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = Field(
+        default=60.0, description="Segundos até fechar uma conexão keep-alive ociosa"
+    )
+    LLM_HTTP_CONNECT_TIMEOUT: float = Field(
+        default=5.0, description="Timeout (s) para abrir conexão com o provedor de LLM"
+    )
+    LLM_HTTP_READ_TIMEOUT: float = Field(
+        default=60.0, description="Timeout (s) de leitura da resposta do provedor de LLM"
+    )
+    LLM_HTTP_POOL_TIMEOUT: float = Field(
+        default=10.0, description="Timeout (s) aguardando uma conexão livre no pool"
+    )
+    LLM_MAX_RETRIES: int = Field(
+        default=2, description="Número de tentativas extras do cliente de LLM"
+    )
+
+    # ==== Provedor de LLM ====
+    LLM_PROVIDER: str = Field(
+        default="openai", description="Provedor usado pelo agente (openai, replay)"
+    )
+    LLM_REPLAY_MODE: Literal["record", "replay"] = Field(
+        default="replay",
+        description=(
+            "Provedor 'replay': 'record' chama o OpenAI e grava as respostas no "
+            "cassete; 'replay' responde apenas a partir do cassete, sem rede"
+        ),
+    )
+    LLM_REPLAY_CASSETTE_PATH: str = Field(
+        default="data/llm_cassette.jsonl", description="Arquivo JSONL com as chamadas gravadas"
+    )
+    LLM_REPLAY_LATENCY_DISTRIBUTION: Literal["none", "constant", "uniform", "lognormal"] = Field(
+        default="none", description="Distribuição da latência simulada no modo 'replay'"
+    )
+    LLM_REPLAY_LATENCY_MEAN_MS: float = Field(
+        default=0.0, description="Latência média simulada (ms) no modo 'replay'"
+    )
+    LLM_REPLAY_LATENCY_STDDEV_MS: float = Field(
+        default=0.0,
+        description="Desvio da latência simulada (ms): meia largura na 'uniform', desvio padrão na 'lognormal'",
+    )
+    LLM_REPLAY_SEED: Optional[int] = Field(
+        default=None, description="Semente da latência simulada (execuções reprodutíveis)"
+    )
+
+    # ==== Configurações do Orquestrador ====
+    ORCHESTRATOR_LLM_MODE: Literal["two_call", "fused", "speculative"] = Field(
+        default="two_call",
+        description=(
+            "Como o orquestrador usa o LLM: 'two_call' (extração e resposta em "
+            "chamadas separadas), 'fused' (uma única chamada estruturada) ou "
+            "'speculative' (extração e resposta em paralelo, com validação do rascunho)"
+        ),
+    )
+    ORCHESTRATOR_NODE_TIMEOUT_SECONDS: float = Field(
+        default=45.0,
+        description="Tempo máximo (s) do nó orquestrador; excedido, o turno segue como ERRO_TECNICO (0 desativa)",
+    )
+    LOCAL_EXTRACTOR_ENABLED: bool = Field(
+        default=True,
+        description="Usa o extrator local (regex) para dispensar o LLM em mensagens estruturadas",
+    )
+    LOCAL_EXTRACTOR_MIN_CONFIDENCE: float = Field(
+        default=0.9, description="Confiança mínima dos campos para dispensar a extração via LLM"
+    )
+
+    # ==== Filtros de entrada (webhook) ====
+    INGRESS_DEDUP_TTL_SECONDS: float = Field(
+        default=600.0, description="Tempo (s) que um messageId fica no conjunto de deduplicação em memória"
+    )
+    INGRESS_DEDUP_PERSISTENT: bool = Field(
+        default=True, description="Deduplica messageIds também no Postgres (entre workers)"
+    )
+    INGRESS_DEDUP_RETENTION_DAYS: int = Field(
+        default=7, description="Dias que um messageId fica em processed_messages (limpo junto com a compactação)"
+    )
+
+    # ==== Agrupamento de mensagens em rajada ====
+    MESSAGE_COALESCE_ENABLED: bool = Field(
+        default=False,
+        description=(
+            "Une mensagens seguidas do mesmo telefone em um único turno. Cada mensagem "
+            "passa a esperar a janela antes do turno, e as anteriores da rajada respondem "
+            '{"status": "coalesced", "message": "", "coalesced_into": <messageId>} em vez da resposta do agente'
+        ),
+    )
+    MESSAGE_COALESCE_WINDOW_SECONDS: float = Field(
+        default=1.5, description="Espera (s) por novas mensagens após cada mensagem recebida"
+    )
+    MESSAGE_COALESCE_MAX_WAIT_SECONDS: float = Field(
+        default=5.0, description="Espera máxima (s) desde a primeira mensagem da rajada"
+    )
+
+    # ==== Fila de webhooks (modo assíncrono) ====
+    WEBHOOK_ASYNC_MODE: bool = Field(
+        default=False,
+        description="Enfileira o webhook no Postgres e responde 202; workers enviam a resposta",
+    )
+    WEBHOOK_QUEUE_WORKERS: int = Field(
+        default=4, description="Workers assíncronos que consomem a fila de webhooks"
+    )
+    WEBHOOK_QUEUE_POLL_INTERVAL_SECONDS: float = Field(
+        default=0.5, description="Intervalo (s) de consulta à fila quando ela está vazia"
+    )
+    WEBHOOK_QUEUE_MAX_ATTEMPTS: int = Field(
+        default=3, description="Tentativas por mensagem antes de marcá-la como falha"
+    )
+    WEBHOOK_QUEUE_LOCK_TIMEOUT_SECONDS: float = Field(
+        default=300.0, description="Tempo (s) após o qual uma mensagem em processamento volta à fila"
+    )
+    WEBHOOK_QUEUE_RETENTION_DAYS: int = Field(
+        default=7, description="Dias que uma mensagem concluída fica na fila de webhooks antes de ser apagada"
+    )
+    WEBHOOK_BATCH_MAX_SIZE: int = Field(
+        default=200, description="Máximo de mensagens aceitas por requisição no endpoint em lote"
+    )
+    WEBHOOK_BATCH_CONCURRENCY: int = Field(
+        default=8, description="Conversas processadas em paralelo por requisição em lote"
+    )
+    OUTBOUND_WEBHOOK_URL: Optional[str] = Field(
+        default=None, description="URL que recebe as respostas do agente (sem ela, apenas registra em log)"
+    )
+    OUTBOUND_TIMEOUT_SECONDS: float = Field(
+        default=10.0, description="Timeout (s) do envio das respostas"
+    )
+
+    # ==== Serialização de turnos por thread ====
+    THREAD_LOCK_BACKEND: Literal["postgres", "local"] = Field(
+        default="postgres",
+        description=(
+            "'postgres' (asyncio.Lock + advisory lock, serializa entre workers) ou "
+            "'local' (apenas asyncio.Lock, para um único processo)"
+        ),
+    )
+    THREAD_LOCK_TIMEOUT_SECONDS: float = Field(
+        default=30.0, description="Espera máxima (s) pelo lock da thread antes de abortar o turno"
+    )
+    THREAD_LOCK_POLL_INTERVAL_SECONDS: float = Field(
+        default=0.05, description="Intervalo (s) entre tentativas de obter o advisory lock"
+    )
+    THREAD_LOCK_MAX_CONNECTIONS: int = Field(
+        default=10,
+        description=(
+            "Conexões do pool próprio dos advisory locks, por worker; cada turno em "
+            "andamento ocupa uma (fora do pool compartilhado)"
+        ),
+    )
+
+    # ==== Retenção de checkpoints ====
+    CHECKPOINT_RETENTION_KEEP_LAST: int = Field(
+        default=10, description="Checkpoints mais recentes mantidos por thread"
+    )
+    CHECKPOINT_RETENTION_MAX_AGE_HOURS: float = Field(
+        default=24.0, description="Checkpoints mais novos que isso (h) são sempre mantidos"
+    )
+    CHECKPOINT_COMPACTION_BATCH_SIZE: int = Field(
+        default=500, description="Linhas removidas por transação na compactação"
+    )
+    CHECKPOINT_COMPACTION_THREADS_PER_BATCH: int = Field(
+        default=100, description="Threads ranqueadas por lote da compactação (cursor por thread_id)"
+    )
+    CHECKPOINT_COMPACTION_INTERVAL_SECONDS: float = Field(
+        default=3600.0, description="Intervalo (s) da compactação agendada (0 desativa)"
+    )
+
+    # ==== Persistência do scheduling_data no BaseStore ====
+    STORE_WRITE_DURABILITY: Literal["sync", "write_behind", "checkpoint_only"] = Field(
+        default="write_behind",
+        description=(
+            "Como o orquestrador grava o scheduling_data no BaseStore: 'sync' (a cada "
+            "turno, antes da resposta), 'write_behind' (em lote, em segundo plano) ou "
+            "'checkpoint_only' (não grava; o checkpoint já contém o estado)"
+        ),
+    )
+    STORE_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS: float = Field(
+        default=1.0, description="Intervalo máximo (s) entre flushes da fila write-behind"
+    )
+    STORE_WRITE_BEHIND_BATCH_SIZE: int = Field(
+        default=100, description="Chaves pendentes que disparam um flush antecipado"
+    )
+
+    # ==== Histórico enviado ao LLM ====
+    HISTORY_MAX_TOKENS: int = Field(
+        default=1500, description="Orçamento de tokens das mensagens recentes enviadas na íntegra"
+    )
+    HISTORY_MIN_RECENT_MESSAGES: int = Field(
+        default=4, description="Mínimo de mensagens recentes enviadas na íntegra"
+    )
+    HISTORY_SUMMARY_BATCH_MESSAGES: int = Field(
+        default=6, description="Mensagens fora da janela acumuladas antes de atualizar o resumo"
+    )
+
+    # ==== Consumo de tokens e orçamento por conversa ====
+    LLM_PRICES_PER_1M_TOKENS: Dict[str, List[float]] = Field(
+        default={"gpt-4o-mini": [0.15, 0.60], "gpt-4.1-nano": [0.10, 0.40]},
+        description="Preço em USD por milhão de tokens [prompt, completion] de cada modelo",
+    )
+    TOKEN_BUDGET_ENABLED: bool = Field(
+        default=False,
+        description=(
+            "Aplica a política de orçamento quando a conversa excede o limite. Desligado, "
+            "o consumo continua sendo contabilizado e o excesso apenas registrado em log"
+        ),
+    )
+    TOKEN_BUDGET_MAX_TOKENS: int = Field(
+        default=60000, description="Tokens (prompt + completion) por conversa antes de aplicar a política"
+    )
+    TOKEN_BUDGET_MAX_COST_USD: Optional[float] = Field(
+        default=None, description="Custo (USD) por conversa antes de aplicar a política (None desativa)"
+    )
+    TOKEN_BUDGET_POLICY: Literal["downgrade_model", "shrink_history", "handoff"] = Field(
+        default="downgrade_model",
+        description=(
+            "Ação ao exceder o orçamento: 'downgrade_model' (modelo mais barato), "
+            "'shrink_history' (janela de histórico menor) ou 'handoff' (transbordo humano)"
+        ),
+    )
+    TOKEN_BUDGET_DOWNGRADE_PROVIDER: str = Field(
+        default="openai_economy", description="Provedor de LLM usado pela política 'downgrade_model'"
+    )
+    TOKEN_BUDGET_DOWNGRADE_MODEL: str = Field(
+        default="gpt-4.1-nano", description="Modelo do provedor 'openai_economy'"
+    )
+    TOKEN_BUDGET_HISTORY_MAX_TOKENS: int = Field(
+        default=400, description="Orçamento de tokens do histórico na política 'shrink_history'"
+    )
+    TOKEN_USAGE_PERSIST_ENABLED: bool = Field(
+        default=True, description="Grava o consumo por conversa na tabela agregada do Postgres"
+    )
+    TOKEN_USAGE_FLUSH_INTERVAL_SECONDS: float = Field(
+        default=5.0, description="Intervalo (s) entre as gravações em lote do consumo por conversa"
+    )
+
+    # ==== Memória episódica ====
+    EPISODIC_MEMORY_ENABLED: bool = Field(
+        default=True, description="Gera episódios de memória ao fim (ou inatividade) das conversas"
+    )
+    EPISODIC_MEMORY_CONCURRENCY: int = Field(
+        default=2, description="Resumos de episódio processados em paralelo"
+    )
+    EPISODIC_MEMORY_BATCH_SIZE: int = Field(
+        default=20, description="Episódios gravados por transação"
+    )
+    EPISODIC_MEMORY_IDLE_SECONDS: float = Field(
+        default=1800.0, description="Inatividade (s) após a qual a conversa vira episódio"
+    )
+
+    EPISODE_INDEX_ENABLED: bool = Field(
+        default=True, description="Injeta episódios anteriores do cliente no contexto do orquestrador"
+    )
+    EPISODE_INDEX_DIR: str = Field(
+        default="data/episode_index", description="Diretório do índice vetorial de episódios"
+    )
+    EPISODE_RECALL_TOP_K: int = Field(
+        default=3, description="Episódios anteriores injetados por turno"
+    )
+
+    # ==== Cache de respostas ====
+    RESPONSE_CACHE_ENABLED: bool = Field(
+        default=False,
+        description=(
+            "Reutiliza respostas para perguntas repetidas na mesma etapa. A chave não "
+            "considera o histórico da conversa, só a etapa e o contexto do serviço"
+        ),
+    )
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(
+        default=2000, description="Máximo de respostas em cache (LRU)"
+    )
+    RESPONSE_CACHE_TTL_SECONDS: float = Field(
+        default=3600.0, description="Tempo de vida (s) de uma resposta em cache"
+    )
+    RESPONSE_CACHE_SIMILARITY_THRESHOLD: float = Field(
+        default=0.92, description="Similaridade de cosseno mínima para reutilizar uma resposta"
+    )
+
+    # ==== Cache de extração ====
+    EXTRACTION_CACHE_ENABLED: bool = Field(
+        default=True, description="Reutiliza extrações de mensagens com o mesmo texto normalizado"
+    )
+    EXTRACTION_CACHE_MAX_ENTRIES: int = Field(
+        default=5000, description="Máximo de extrações em cache (LRU)"
+    )
+    EXTRACTION_CACHE_TTL_SECONDS: float = Field(
+        default=3600.0, description="Tempo de vida (s) de uma extração em cache"
+    )
+
     # ==== Configurações do LangSmith ====
     LANGSMITH_API_KEY: str = Field(..., description="Chave da API do LangSmith")
     LANGSMITH_PROJECT: str = Field(..., description="Projeto do LangSmith")
@@ -0,0 +1,36 @@
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+
+class ICacheBackend(ABC):
+    """
+    Interface para backends de cache chave/valor com expiração.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Retorna o valor da chave ou None se ausente/expirado.
+        """
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Grava o valor da chave. `ttl` em segundos (None = padrão do backend).
+        """
+        pass
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """
+        Remove a chave, se existir.
+        """
+        pass
+
+    @abstractmethod
+    async def clear(self):
+        """
+        Remove todas as chaves.
+        """
+        pass
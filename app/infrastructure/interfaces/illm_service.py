@@ -1,7 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from langchain_core.messages import BaseMessage
 
+# Tag da chamada que gera a resposta ao cliente; o endpoint de streaming
+# repassa apenas os tokens das execuções com essa tag
+REPLY_STREAM_TAG = "orchestrator_reply"
+
+# Resposta ao cliente quando a chamada ao LLM falha (ou não há resposta gravada)
+RESPOSTA_FALLBACK = "Desculpe, tive um problema momentâneo. Pode repetir?"
+
 
 class ILLMService(ABC):
     """
@@ -21,3 +28,18 @@ class ILLMService(ABC):
         Extrai informações estruturadas da mensagem do usuário.
         """
         pass
+
+    @abstractmethod
+    async def extract_and_respond(self, user_query: str, chat_history: List[BaseMessage] = None, scheduling_data = None) -> Dict[str, Any]:
+        """
+        Extrai informações e gera a resposta em uma única chamada.
+        Retorna {"extracted_info": {...}, "resposta": "..."}.
+        """
+        pass
+
+    @abstractmethod
+    async def summarize_history(self, previous_summary: Optional[str], messages: List[BaseMessage]) -> str:
+        """
+        Incorpora as mensagens ao resumo anterior e retorna o novo resumo.
+        """
+        pass
@@ -0,0 +1,20 @@
+from abc import ABC, abstractmethod
+
+
+class IOutboundSender(ABC):
+    """
+    Interface para o envio das respostas do agente ao canal (ex.: WhatsApp).
+    """
+
+    @abstractmethod
+    async def enviar(self, phone_number: str, message: str, reply_to: str = None):
+        """
+        Envia a mensagem ao telefone. Deve levantar exceção em caso de falha.
+        """
+        pass
+
+    async def aclose(self):
+        """
+        Libera recursos (conexões). Opcional.
+        """
+        pass
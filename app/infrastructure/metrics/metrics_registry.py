@@ -0,0 +1,250 @@
+# app/infrastructure/metrics/metrics_registry.py
+import logging
+import math
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, math.inf
+)
+
+
+class _Metric:
+    """
+    Base das métricas em processo. Os valores ficam em memória e são
+    atualizados sem I/O, indexados pelos valores dos labels.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def _labels_dict(self, key: LabelKey) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    """Contador monotônico."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def total(self) -> float:
+        return sum(self._values.values())
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        return [(self._labels_dict(k), v) for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """
+    Valor instantâneo. Pode ser alimentado diretamente (`set`/`inc`/`dec`)
+    ou por uma função avaliada apenas na leitura (`set_function`).
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+        self._function: Optional[Callable[[], Any]] = None
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], Any]):
+        """
+        Define uma função chamada na leitura. Deve retornar um número ou,
+        para gauges com labels, um dict {tupla_de_labels: valor}.
+        """
+        self._function = function
+
+    def value(self, **labels) -> float:
+        for sample_labels, value in self.samples():
+            if sample_labels == self._labels_dict(self._key(labels)):
+                return value
+        return 0.0
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        if self._function is None:
+            return [(self._labels_dict(k), v) for k, v in self._values.items()]
+        try:
+            result = self._function()
+        except Exception as e:
+            logger.warning(f"Falha ao calcular gauge '{self.name}': {e}")
+            return []
+        if isinstance(result, dict):
+            return [
+                (self._labels_dict(tuple(str(x) for x in k)), float(v))
+                for k, v in result.items()
+            ]
+        return [({}, float(result))]
+
+
+class Histogram(_Metric):
+    """Histograma com buckets cumulativos (semântica do Prometheus)."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        buckets = tuple(sorted(buckets))
+        if buckets[-1] != math.inf:
+            buckets = buckets + (math.inf,)
+        self.buckets = buckets
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * len(self.buckets)
+            self._sums[key] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def sum(self, **labels) -> float:
+        return self._sums.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[Dict[str, str], Dict[str, Any]]]:
+        """Retorna, por conjunto de labels, buckets cumulativos, soma e contagem."""
+        result = []
+        for key, counts in self._counts.items():
+            cumulative, acc = [], 0
+            for bound, c in zip(self.buckets, counts):
+                acc += c
+                cumulative.append((bound, acc))
+            result.append(
+                (
+                    self._labels_dict(key),
+                    {"buckets": cumulative, "sum": self._sums[key], "count": acc},
+                )
+            )
+        return result
+
+
+class MetricsRegistry:
+    """
+    Registry centralizado das métricas da aplicação.
+    Registrar duas vezes o mesmo nome retorna a métrica já existente.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = cls(name, *args, **kwargs)
+            self._metrics[name] = metric
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Métrica {name} já registrada com outro tipo.")
+        return metric
+
+    def counter(self, name: str, description: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, description, labelnames)
+
+    def gauge(self, name: str, description: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, description, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labelnames, buckets)
+
+    def get_metrics(self) -> Dict[str, _Metric]:
+        """Retorna todas as métricas registradas."""
+        return self._metrics.copy()
+
+    def render_prometheus(self) -> str:
+        """Serializa todas as métricas no formato de texto do Prometheus (0.0.4)."""
+        linhas: List[str] = []
+        for name, metric in self._metrics.items():
+            linhas.append(f"# HELP {name} {_escape_help(metric.description)}")
+            linhas.append(f"# TYPE {name} {metric.type_name}")
+            for labels, value in metric.samples():
+                if metric.type_name == "histogram":
+                    for bound, count in value["buckets"]:
+                        bucket_labels = {**labels, "le": _format_value(bound)}
+                        linhas.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+                    linhas.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                    linhas.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+                else:
+                    linhas.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(linhas) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Retorna os valores atuais de todas as métricas (debugging)."""
+        return {
+            name: {"type": metric.type_name, "samples": metric.samples()}
+            for name, metric in self._metrics.items()
+        }
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pares = ",".join(f'{k}="{_escape_label_value(str(v))}"' for k, v in labels.items())
+    return "{" + pares + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+# Instância global (Singleton)
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,275 @@
+"""
+Retenção e compactação dos checkpoints do LangGraph.
+
+Uso via CLI:
+    python -m app.infrastructure.pesistence.checkpoint_compactor --keep 10 --max-age-hours 24
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from app.infrastructure.config.config import settings
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.pesistence.message_dedup_repository import message_dedup_repository
+from app.infrastructure.pesistence.postgres_persistence import db_manager
+
+logger = logging.getLogger(__name__)
+
+compaction_rows_total = metrics_registry.counter(
+    "checkpoint_compaction_rows_total",
+    "Linhas removidas pela compactação de checkpoints, por tabela",
+    labelnames=("table",),
+)
+compaction_seconds = metrics_registry.histogram(
+    "checkpoint_compaction_seconds",
+    "Duração de cada execução da compactação de checkpoints",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0),
+)
+
+# Remove um lote de checkpoints antigos e as escritas pendentes associadas,
+# em uma única transação curta. As threads são percorridas por cursor
+# (thread_id > %(ultima)s): cada lote ranqueia só os checkpoints das próximas
+# %(threads)s threads, pela chave primária (thread_id, checkpoint_ns, checkpoint_id),
+# em vez da tabela inteira
+_SQL_REMOVER_CHECKPOINTS = """
+WITH candidatas AS (
+    SELECT DISTINCT thread_id
+    FROM checkpoints
+    WHERE thread_id > %(ultima)s
+    ORDER BY thread_id
+    LIMIT %(threads)s
+),
+ranqueados AS (
+    SELECT c.thread_id, c.checkpoint_ns, c.checkpoint_id,
+           row_number() OVER (
+               PARTITION BY c.thread_id, c.checkpoint_ns ORDER BY c.checkpoint_id DESC
+           ) AS posicao,
+           (c.checkpoint->>'ts')::timestamptz AS criado_em
+    FROM checkpoints c
+    WHERE c.thread_id IN (SELECT thread_id FROM candidatas)
+),
+alvo AS (
+    SELECT thread_id, checkpoint_ns, checkpoint_id
+    FROM ranqueados
+    WHERE posicao > %(manter)s
+      AND criado_em < now() - make_interval(secs => %(idade)s)
+    LIMIT %(lote)s
+),
+removidos AS (
+    DELETE FROM checkpoints c
+    USING alvo a
+    WHERE c.thread_id = a.thread_id
+      AND c.checkpoint_ns = a.checkpoint_ns
+      AND c.checkpoint_id = a.checkpoint_id
+    RETURNING c.thread_id, c.checkpoint_ns, c.checkpoint_id
+),
+escritas AS (
+    DELETE FROM checkpoint_writes w
+    USING removidos r
+    WHERE w.thread_id = r.thread_id
+      AND w.checkpoint_ns = r.checkpoint_ns
+      AND w.checkpoint_id = r.checkpoint_id
+    RETURNING 1
+)
+SELECT
+    (SELECT count(*) FROM removidos) AS checkpoints,
+    (SELECT count(*) FROM escritas) AS writes,
+    (SELECT coalesce(array_agg(DISTINCT thread_id), '{}') FROM removidos) AS threads,
+    (SELECT max(thread_id) FROM candidatas) AS ultima_thread
+"""
+
+# Remove um lote de blobs que nenhum checkpoint restante referencia. Só
+# considera threads compactadas nesta execução e sem atividade recente,
+# para não apagar blobs de um checkpoint que ainda está sendo gravado
+_SQL_REMOVER_BLOBS = """
+WITH alvo AS (
+    SELECT b.thread_id, b.checkpoint_ns, b.channel, b.version
+    FROM checkpoint_blobs b
+    WHERE b.thread_id = ANY(%(threads)s)
+      AND NOT EXISTS (
+          SELECT 1 FROM checkpoints c
+          WHERE c.thread_id = b.thread_id
+            AND c.checkpoint_ns = b.checkpoint_ns
+            AND c.checkpoint->'channel_versions'->>b.channel = b.version
+      )
+      AND NOT EXISTS (
+          SELECT 1 FROM checkpoints r
+          WHERE r.thread_id = b.thread_id
+            AND (r.checkpoint->>'ts')::timestamptz > now() - make_interval(secs => %(margem)s)
+      )
+    LIMIT %(lote)s
+)
+DELETE FROM checkpoint_blobs b
+USING alvo a
+WHERE b.thread_id = a.thread_id
+  AND b.checkpoint_ns = a.checkpoint_ns
+  AND b.channel = a.channel
+  AND b.version = a.version
+"""
+
+
+class CheckpointCompactor:
+    """
+    Mantém, por thread, os `manter_ultimos` checkpoints mais recentes e todos
+    os mais novos que `idade_maxima_horas`; o restante é removido em lotes de
+    até `tamanho_lote` linhas, cada um em sua própria transação, para não
+    segurar locks. Cada lote cobre as próximas `threads_por_lote` threads
+    em ordem de thread_id; o cursor só avança quando o lote não atinge o
+    limite de linhas, então nenhuma thread fica pela metade.
+
+    Também remove as escritas pendentes (checkpoint_writes) dos checkpoints
+    removidos e os blobs de canais que ficaram sem referência. A execução
+    agendada aproveita para limpar os messageIds antigos da deduplicação.
+    """
+
+    def __init__(
+        self,
+        manter_ultimos: int = 10,
+        idade_maxima_horas: float = 24.0,
+        tamanho_lote: int = 500,
+        threads_por_lote: int = 100,
+        margem_atividade_segundos: float = 300.0,
+        pausa_entre_lotes: float = 0.05,
+    ):
+        self.manter_ultimos = max(1, manter_ultimos)
+        self.idade_maxima_horas = idade_maxima_horas
+        self.tamanho_lote = tamanho_lote
+        self.threads_por_lote = threads_por_lote
+        self.margem_atividade_segundos = margem_atividade_segundos
+        self.pausa_entre_lotes = pausa_entre_lotes
+        self._tarefa: Optional[asyncio.Task] = None
+
+    async def compactar(self) -> Dict[str, Any]:
+        """Executa uma compactação completa e retorna o relatório."""
+        inicio = time.perf_counter()
+        removidas = {"checkpoints": 0, "checkpoint_writes": 0, "checkpoint_blobs": 0}
+        threads: set = set()
+        pool = await db_manager.get_pool()
+
+        ultima_thread = ""
+        while True:
+            async with pool.connection() as conn:
+                cursor = await conn.execute(
+                    _SQL_REMOVER_CHECKPOINTS,
+                    {
+                        "ultima": ultima_thread,
+                        "threads": self.threads_por_lote,
+                        "manter": self.manter_ultimos,
+                        "idade": self.idade_maxima_horas * 3600,
+                        "lote": self.tamanho_lote,
+                    },
+                )
+                linha = await cursor.fetchone()
+            removidas["checkpoints"] += linha["checkpoints"]
+            removidas["checkpoint_writes"] += linha["writes"]
+            threads.update(linha["threads"])
+            if linha["ultima_thread"] is None:
+                break
+            # Lote cheio: as mesmas threads ainda podem ter checkpoints a remover
+            if linha["checkpoints"] < self.tamanho_lote:
+                ultima_thread = linha["ultima_thread"]
+            await asyncio.sleep(self.pausa_entre_lotes)
+
+        lista_threads: List[str] = sorted(threads)
+        while lista_threads:
+            async with pool.connection() as conn:
+                cursor = await conn.execute(
+                    _SQL_REMOVER_BLOBS,
+                    {
+                        "threads": lista_threads,
+                        "margem": self.margem_atividade_segundos,
+                        "lote": self.tamanho_lote,
+                    },
+                )
+                quantidade = cursor.rowcount
+            removidas["checkpoint_blobs"] += quantidade
+            if quantidade < self.tamanho_lote:
+                break
+            await asyncio.sleep(self.pausa_entre_lotes)
+
+        duracao = time.perf_counter() - inicio
+        for tabela, quantidade in removidas.items():
+            compaction_rows_total.inc(quantidade, table=tabela)
+        compaction_seconds.observe(duracao)
+
+        relatorio = {
+            "rows_deleted": removidas,
+            "threads_compacted": len(threads),
+            "duration_seconds": round(duracao, 3),
+        }
+        logger.info(f"Compactação de checkpoints concluída: {relatorio}")
+        return relatorio
+
+    # ---- Agendamento ----
+
+    def iniciar_agendamento(self, intervalo_segundos: float):
+        """Executa a compactação periodicamente em segundo plano."""
+        if self._tarefa is not None or intervalo_segundos <= 0:
+            return
+        self._tarefa = asyncio.create_task(
+            self._executar_periodicamente(intervalo_segundos), name="checkpoint-compactor"
+        )
+        logger.info(f"Compactação de checkpoints agendada a cada {intervalo_segundos:.0f}s")
+
+    async def parar(self):
+        if self._tarefa is None:
+            return
+        self._tarefa.cancel()
+        await asyncio.gather(self._tarefa, return_exceptions=True)
+        self._tarefa = None
+
+    async def _executar_periodicamente(self, intervalo_segundos: float):
+        while True:
+            await asyncio.sleep(intervalo_segundos)
+            try:
+                await self.compactar()
+            except Exception as e:
+                logger.error(f"Erro na compactação de checkpoints: {e}")
+            if settings.INGRESS_DEDUP_PERSISTENT:
+                await self._limpar_deduplicacao()
+
+    @staticmethod
+    async def _limpar_deduplicacao():
+        try:
+            removidas = await message_dedup_repository.remover_antigas(
+                settings.INGRESS_DEDUP_RETENTION_DAYS
+            )
+        except Exception as e:
+            logger.error(f"Erro ao limpar processed_messages: {e}")
+            return
+        compaction_rows_total.inc(removidas, table="processed_messages")
+        logger.info(f"{removidas} messageIds antigos removidos da deduplicação")
+
+
+# Instância única (Singleton)
+checkpoint_compactor = CheckpointCompactor(
+    manter_ultimos=settings.CHECKPOINT_RETENTION_KEEP_LAST,
+    idade_maxima_horas=settings.CHECKPOINT_RETENTION_MAX_AGE_HOURS,
+    tamanho_lote=settings.CHECKPOINT_COMPACTION_BATCH_SIZE,
+    threads_por_lote=settings.CHECKPOINT_COMPACTION_THREADS_PER_BATCH,
+)
+
+
+async def _main(manter: int, idade_horas: float, lote: int, threads_por_lote: int):
+    compactador = CheckpointCompactor(manter, idade_horas, lote, threads_por_lote)
+    try:
+        relatorio = await compactador.compactar()
+    finally:
+        await db_manager.close()
+    print(relatorio)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Compacta os checkpoints do LangGraph")
+    parser.add_argument("--keep", type=int, default=settings.CHECKPOINT_RETENTION_KEEP_LAST)
+    parser.add_argument("--max-age-hours", type=float, default=settings.CHECKPOINT_RETENTION_MAX_AGE_HOURS)
+    parser.add_argument("--batch-size", type=int, default=settings.CHECKPOINT_COMPACTION_BATCH_SIZE)
+    parser.add_argument(
+        "--threads-per-batch", type=int, default=settings.CHECKPOINT_COMPACTION_THREADS_PER_BATCH
+    )
+    args = parser.parse_args()
+    asyncio.run(_main(args.keep, args.max_age_hours, args.batch_size, args.threads_per_batch))
@@ -0,0 +1,71 @@
+import logging
+from app.infrastructure.pesistence.postgres_persistence import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+class MessageDedupRepository:
+    """
+    Registro de message_ids já recebidos, compartilhado entre workers.
+
+    A unicidade é garantida pela chave primária: o primeiro INSERT de um
+    message_id vence e os demais (retentativas do provedor, outro worker)
+    não inserem nada. Se o turno falhar, o registro é removido para que a
+    retentativa seja processada.
+    """
+
+    async def setup(self):
+        """Cria a tabela de mensagens processadas, se não existir."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS processed_messages (
+                    message_id TEXT PRIMARY KEY,
+                    received_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                """
+            )
+            await conn.execute(
+                "CREATE INDEX IF NOT EXISTS processed_messages_received_at_idx "
+                "ON processed_messages (received_at)"
+            )
+        logger.info("Tabela processed_messages verificada/criada com sucesso.")
+
+    async def registrar(self, message_id: str) -> bool:
+        """
+        Registra o message_id.
+
+        Returns:
+            True se é a primeira vez que o ID é visto; False se é duplicado.
+        """
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute(
+                "INSERT INTO processed_messages (message_id) VALUES (%s) "
+                "ON CONFLICT (message_id) DO NOTHING RETURNING message_id",
+                (message_id,),
+            )
+            return await cursor.fetchone() is not None
+
+    async def remover(self, message_id: str):
+        """Esquece o message_id (turno com erro), liberando a retentativa."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                "DELETE FROM processed_messages WHERE message_id = %s", (message_id,)
+            )
+
+    async def remover_antigas(self, dias: int = 7) -> int:
+        """Remove registros mais antigos que `dias` e retorna quantos removeu."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute(
+                "DELETE FROM processed_messages WHERE received_at < now() - make_interval(days => %s)",
+                (dias,),
+            )
+            return cursor.rowcount
+
+
+# Instância única (Singleton)
+message_dedup_repository = MessageDedupRepository()
@@ -0,0 +1,174 @@
+import logging
+from typing import Any, Dict, List
+from app.infrastructure.pesistence.postgres_persistence import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+class MessageQueueRepository:
+    """
+    Fila durável de mensagens recebidas, em uma tabela do Postgres.
+
+    A reserva pega todas as mensagens pendentes de um telefone de uma vez (a
+    rajada) e nunca um telefone que já está em processamento, preservando a
+    ordem por conversa. Para que dois workers não reservem o mesmo telefone
+    ao mesmo tempo, cada reserva toma um advisory lock de transação sobre o
+    telefone (`pg_try_advisory_xact_lock`) antes de marcar as linhas; quem não
+    consegue o lock passa ao próximo telefone em vez de esperar.
+    """
+
+    # Candidatos avaliados por reserva antes de desistir e esperar a próxima consulta
+    CANDIDATOS_POR_RESERVA = 5
+
+    async def setup(self):
+        """Cria a tabela da fila, se não existir."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS inbound_message_queue (
+                    id BIGSERIAL PRIMARY KEY,
+                    message_id TEXT,
+                    phone_number TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    enqueued_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    locked_at TIMESTAMPTZ,
+                    processed_at TIMESTAMPTZ
+                )
+                """
+            )
+            await conn.execute(
+                "CREATE INDEX IF NOT EXISTS inbound_message_queue_status_idx "
+                "ON inbound_message_queue (status, id)"
+            )
+            await conn.execute(
+                "CREATE INDEX IF NOT EXISTS inbound_message_queue_phone_idx "
+                "ON inbound_message_queue (phone_number, status)"
+            )
+        logger.info("Tabela inbound_message_queue verificada/criada com sucesso.")
+
+    async def enfileirar(self, message_id: str, phone_number: str, message: str) -> int:
+        """Insere a mensagem na fila e retorna o ID da linha."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute(
+                "INSERT INTO inbound_message_queue (message_id, phone_number, message) "
+                "VALUES (%s, %s, %s) RETURNING id",
+                (message_id, phone_number, message),
+            )
+            row = await cursor.fetchone()
+            return row["id"]
+
+    async def reservar_rajada(self) -> List[Dict[str, Any]]:
+        """
+        Reserva as mensagens pendentes do telefone mais antigo na fila que
+        não está em processamento. Retorna [] se não houver nada a fazer.
+        """
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn, conn.transaction():
+            cursor = await conn.execute(
+                """
+                SELECT q.phone_number
+                FROM inbound_message_queue q
+                WHERE q.status = 'pending'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM inbound_message_queue p
+                      WHERE p.phone_number = q.phone_number AND p.status = 'processing'
+                  )
+                GROUP BY q.phone_number
+                ORDER BY min(q.id)
+                LIMIT %s
+                """,
+                (self.CANDIDATOS_POR_RESERVA,),
+            )
+            candidatos = [row["phone_number"] for row in await cursor.fetchall()]
+
+            for phone_number in candidatos:
+                cursor = await conn.execute(
+                    "SELECT pg_try_advisory_xact_lock(hashtext('inbound_message_queue'), hashtext(%s)) AS obtido",
+                    (phone_number,),
+                )
+                if not (await cursor.fetchone())["obtido"]:
+                    continue
+                # Instrução nova, snapshot novo: enxerga a reserva de quem tinha o lock antes
+                cursor = await conn.execute(
+                    """
+                    UPDATE inbound_message_queue
+                    SET status = 'processing', locked_at = now(), attempts = attempts + 1
+                    WHERE status = 'pending' AND phone_number = %s
+                      AND NOT EXISTS (
+                          SELECT 1 FROM inbound_message_queue p
+                          WHERE p.phone_number = %s AND p.status = 'processing'
+                      )
+                    RETURNING id, message_id, phone_number, message, attempts,
+                              EXTRACT(EPOCH FROM (now() - enqueued_at)) AS wait_seconds
+                    """,
+                    (phone_number, phone_number),
+                )
+                rows = await cursor.fetchall()
+                if rows:
+                    return sorted(rows, key=lambda r: r["id"])
+            return []
+
+    async def concluir(self, ids: List[int]):
+        """Marca as mensagens como processadas."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                "UPDATE inbound_message_queue SET status = 'done', processed_at = now() "
+                "WHERE id = ANY(%s)",
+                (ids,),
+            )
+
+    async def falhar(self, ids: List[int], erro: str, max_tentativas: int):
+        """Devolve as mensagens à fila ou, esgotadas as tentativas, marca como falha."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                """
+                UPDATE inbound_message_queue
+                SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                    last_error = %s, locked_at = NULL
+                WHERE id = ANY(%s)
+                """,
+                (max_tentativas, erro[:1000], ids),
+            )
+
+    async def liberar_travadas(self, timeout_segundos: float) -> int:
+        """Devolve à fila mensagens presas em 'processing' (worker que caiu)."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute(
+                "UPDATE inbound_message_queue SET status = 'pending', locked_at = NULL "
+                "WHERE status = 'processing' AND locked_at < now() - make_interval(secs => %s)",
+                (timeout_segundos,),
+            )
+            return cursor.rowcount
+
+    async def remover_concluidas(self, dias_retencao: int) -> int:
+        """Apaga mensagens concluídas há mais de `dias_retencao` dias."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute(
+                "DELETE FROM inbound_message_queue "
+                "WHERE status = 'done' AND processed_at < now() - make_interval(days => %s)",
+                (dias_retencao,),
+            )
+            return cursor.rowcount
+
+    async def profundidade(self) -> int:
+        """Quantidade de mensagens pendentes."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute(
+                "SELECT count(*) AS total FROM inbound_message_queue WHERE status = 'pending'"
+            )
+            row = await cursor.fetchone()
+            return row["total"]
+
+
+# Instância única (Singleton)
+message_queue_repository = MessageQueueRepository()
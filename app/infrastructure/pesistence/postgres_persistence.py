@@ -4,6 +4,7 @@ from psycopg.rows import dict_row
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from langgraph.store.postgres import AsyncPostgresStore
 from app.infrastructure.config.config import settings
+from app.infrastructure.metrics.metrics_registry import metrics_registry
 
 logger = logging.getLogger(__name__)
 
@@ -42,22 +43,31 @@ class DatabaseManager:
         """Retorna o pool de conexões. Cria um se não existir."""
         if self._pool is None:
             logger.info("Criando novo pool de conexões com o PostgreSQL...")
-            
-            connection_kwargs = {
-                "autocommit": True,
-                "prepare_threshold": 0,
-                "row_factory": dict_row,
-            }
-            
-            self._pool = AsyncConnectionPool(
-                conninfo=postgres_uri,
-                max_size=20,
-                kwargs=connection_kwargs
-            )
-            await self._pool.open()
+            self._pool = await self.criar_pool(max_size=20)
             
         return self._pool
 
+    @staticmethod
+    async def criar_pool(max_size: int, min_size: int = 4, conninfo: str = None) -> AsyncConnectionPool:
+        """
+        Abre um pool independente do compartilhado, com as mesmas opções de
+        conexão (ex.: conexões que ficam presas por um turno inteiro).
+        """
+        connection_kwargs = {
+            "autocommit": True,
+            "prepare_threshold": 0,
+            "row_factory": dict_row,
+        }
+        pool = AsyncConnectionPool(
+            conninfo=conninfo or postgres_uri,
+            min_size=min(min_size, max_size),
+            max_size=max_size,
+            kwargs=connection_kwargs,
+            open=False,
+        )
+        await pool.open()
+        return pool
+
     async def initialize_database(self):
         """
         Orquestra a criação das tabelas do LangGraph (checkpoints + store).
@@ -122,9 +132,37 @@ class DatabaseManager:
             self._store = AsyncPostgresStore(pool)
         return self._store
 
+    async def close(self):
+        """Fecha o pool de conexões, se estiver aberto."""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+            self._checkpointer = None
+            self._store = None
+
+    def get_pool_stats(self) -> dict:
+        """Conexões do pool em uso, ociosas e requisições aguardando (sem I/O)."""
+        if self._pool is None:
+            return {}
+        stats = self._pool.get_stats()
+        tamanho = stats.get("pool_size", 0)
+        disponiveis = stats.get("pool_available", 0)
+        return {
+            "in_use": tamanho - disponiveis,
+            "idle": disponiveis,
+            "waiting": stats.get("requests_waiting", 0),
+            "max_size": self._pool.max_size,
+        }
+
 # Instância única (Singleton)
 db_manager = DatabaseManager()
 
+metrics_registry.gauge(
+    "db_pool_connections",
+    "Conexões do pool do Postgres por estado (in_use, idle, waiting, max_size)",
+    labelnames=("state",),
+).set_function(lambda: {(estado,): valor for estado, valor in db_manager.get_pool_stats().items()})
+
 # Funções de fachada
 async def get_checkpointer() -> AsyncPostgresSaver:
     return await db_manager.get_checkpointer()
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from langgraph.store.base import PutOp
+
+from app.infrastructure.config.config import settings
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.pesistence.postgres_persistence import get_store
+
+logger = logging.getLogger(__name__)
+
+Chave = Tuple[Tuple[str, ...], str]
+
+store_writes_total = metrics_registry.counter(
+    "store_write_behind_writes_total",
+    "Escritas no BaseStore pela fila write-behind (scheduled, coalesced, flushed, failed)",
+    labelnames=("result",),
+)
+store_flush_seconds = metrics_registry.histogram(
+    "store_write_behind_flush_seconds", "Duração de cada flush em lote para o BaseStore"
+)
+
+
+class StoreWriteBehindQueue:
+    """
+    Fila write-behind para escritas no BaseStore.
+
+    `agendar()` apenas registra o valor em memória: escritas repetidas da
+    mesma chave antes do flush são unidas (vale o último valor). O flush
+    envia tudo em um único `abatch`, a cada `intervalo_flush` segundos ou
+    quando `tamanho_lote` chaves estão pendentes, e também no shutdown.
+
+    Se o flush falhar, as chaves voltam para a fila (sem sobrescrever
+    valores mais novos) e são tentadas no próximo ciclo.
+    """
+
+    def __init__(self, intervalo_flush: float = 1.0, tamanho_lote: int = 100):
+        self.intervalo_flush = intervalo_flush
+        self.tamanho_lote = tamanho_lote
+        self._pendentes: Dict[Chave, Dict[str, Any]] = {}
+        self._lote_cheio = asyncio.Event()
+        self._lock_flush = asyncio.Lock()
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def agendar(self, namespace: Tuple[str, ...], key: str, value: Dict[str, Any]):
+        """Registra a escrita para o próximo flush. Não bloqueia."""
+        chave = (tuple(namespace), key)
+        if chave in self._pendentes:
+            store_writes_total.inc(result="coalesced")
+        else:
+            store_writes_total.inc(result="scheduled")
+        self._pendentes[chave] = value
+
+        self._garantir_tarefa()
+        if len(self._pendentes) >= self.tamanho_lote:
+            self._lote_cheio.set()
+
+    async def flush(self) -> int:
+        """Grava todas as escritas pendentes e retorna quantas foram gravadas."""
+        async with self._lock_flush:
+            if not self._pendentes:
+                return 0
+            lote, self._pendentes = self._pendentes, {}
+            inicio = time.perf_counter()
+            try:
+                store = await get_store()
+                await store.abatch(
+                    [PutOp(namespace, key, value) for (namespace, key), value in lote.items()]
+                )
+            except asyncio.CancelledError:
+                for chave, value in lote.items():
+                    self._pendentes.setdefault(chave, value)
+                raise
+            except Exception as e:
+                store_writes_total.inc(len(lote), result="failed")
+                logger.error(f"Falha no flush de {len(lote)} escritas para o BaseStore: {e}")
+                for chave, value in lote.items():
+                    self._pendentes.setdefault(chave, value)
+                return 0
+            store_flush_seconds.observe(time.perf_counter() - inicio)
+            store_writes_total.inc(len(lote), result="flushed")
+            return len(lote)
+
+    def pendentes(self) -> int:
+        return len(self._pendentes)
+
+    def _garantir_tarefa(self):
+        if self._tarefa is not None and not self._tarefa.done():
+            return
+        self._tarefa = asyncio.get_running_loop().create_task(
+            self._executar(), name="store-write-behind"
+        )
+
+    async def _executar(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._lote_cheio.wait(), self.intervalo_flush)
+            except asyncio.TimeoutError:
+                pass
+            self._lote_cheio.clear()
+            await self.flush()
+
+    async def parar(self):
+        """Encerra o flush periódico e grava o que estiver pendente."""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+        gravadas = await self.flush()
+        if self._pendentes:
+            logger.warning(f"{len(self._pendentes)} escritas no BaseStore perdidas no shutdown")
+        elif gravadas:
+            logger.info(f"{gravadas} escritas pendentes gravadas no BaseStore no shutdown")
+
+
+# Instância única (Singleton)
+store_write_behind = StoreWriteBehindQueue(
+    intervalo_flush=settings.STORE_WRITE_BEHIND_FLUSH_INTERVAL_SECONDS,
+    tamanho_lote=settings.STORE_WRITE_BEHIND_BATCH_SIZE,
+)
+
+metrics_registry.gauge(
+    "store_write_behind_pending", "Escritas aguardando o flush para o BaseStore"
+).set_function(store_write_behind.pendentes)
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from app.infrastructure.config.config import settings
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.pesistence.postgres_persistence import db_manager
+
+logger = logging.getLogger(__name__)
+
+thread_lock_wait_seconds = metrics_registry.histogram(
+    "thread_lock_wait_seconds",
+    "Espera pelo lock da thread antes do turno, por escopo (local, advisory)",
+    labelnames=("scope",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+thread_lock_timeouts_total = metrics_registry.counter(
+    "thread_lock_timeouts_total", "Turnos abortados por esgotar a espera pelo lock da thread"
+)
+
+
+class ThreadLockTimeout(TimeoutError):
+    """A thread continuou ocupada por outro turno além do tempo de espera."""
+
+
+class _LockLocal:
+    __slots__ = ("lock", "usuarios")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.usuarios = 0
+
+
+class ThreadLockManager:
+    """
+    Serializa os turnos de uma mesma thread_id.
+
+    Dentro do processo, um asyncio.Lock por thread faz os turnos concorrentes
+    esperarem sem tocar no banco. Entre processos (vários workers do uvicorn
+    ou pods), quem tem o lock local ainda obtém um advisory lock de sessão no
+    Postgres (`pg_try_advisory_lock`, chave = hash de 64 bits da thread_id),
+    mantendo a conexão até o fim do turno.
+
+    Essa conexão vem de um pool próprio, de até `max_conexoes`, e não do
+    pool compartilhado: o turno (checkpointer, store, repositórios) ainda
+    precisa de conexões do pool compartilhado enquanto segura o lock, e
+    turnos simultâneos esgotariam esse pool uns esperando pelos outros.
+
+    A espera total (lock local, conexão do pool próprio e advisory lock) é
+    limitada por `timeout_segundos`; esgotado o prazo, `ThreadLockTimeout` é
+    levantada.
+    """
+
+    def __init__(
+        self,
+        usar_postgres: bool = True,
+        timeout_segundos: float = 30.0,
+        intervalo_tentativa: float = 0.05,
+        max_conexoes: int = 10,
+        conninfo: Optional[str] = None,
+    ):
+        self.usar_postgres = usar_postgres
+        self.timeout_segundos = timeout_segundos
+        self.intervalo_tentativa = intervalo_tentativa
+        self.max_conexoes = max_conexoes
+        self.conninfo = conninfo
+        self._locais: Dict[str, _LockLocal] = {}
+        self._pool: Optional[AsyncConnectionPool] = None
+        self._criando_pool = asyncio.Lock()
+
+    @staticmethod
+    def chave_advisory(thread_id: str) -> int:
+        """Hash estável de 64 bits (com sinal, como o bigint do Postgres)."""
+        digest = hashlib.blake2b(thread_id.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+
+    @asynccontextmanager
+    async def travar(self, thread_id: str) -> AsyncIterator[None]:
+        """Mantém a thread exclusiva para o bloco."""
+        prazo = time.monotonic() + self.timeout_segundos
+        local = self._locais.setdefault(thread_id, _LockLocal())
+        local.usuarios += 1
+        try:
+            inicio = time.perf_counter()
+            try:
+                await asyncio.wait_for(local.lock.acquire(), self.timeout_segundos)
+            except asyncio.TimeoutError:
+                thread_lock_timeouts_total.inc()
+                raise ThreadLockTimeout(f"Thread {thread_id} ocupada (lock local)")
+            thread_lock_wait_seconds.observe(time.perf_counter() - inicio, scope="local")
+
+            try:
+                if self.usar_postgres:
+                    async with self._travar_advisory(thread_id, prazo):
+                        yield
+                else:
+                    yield
+            finally:
+                local.lock.release()
+        finally:
+            local.usuarios -= 1
+            if local.usuarios == 0 and self._locais.get(thread_id) is local:
+                del self._locais[thread_id]
+
+    async def _obter_pool(self) -> AsyncConnectionPool:
+        async with self._criando_pool:
+            if self._pool is None:
+                self._pool = await db_manager.criar_pool(
+                    max_size=self.max_conexoes, min_size=1, conninfo=self.conninfo
+                )
+        return self._pool
+
+    @asynccontextmanager
+    async def _travar_advisory(self, thread_id: str, prazo: float) -> AsyncIterator[None]:
+        chave = self.chave_advisory(thread_id)
+        pool = await self._obter_pool()
+        inicio = time.perf_counter()
+        async with AsyncExitStack() as pilha:
+            try:
+                conn = await pilha.enter_async_context(
+                    pool.connection(timeout=max(0.0, prazo - time.monotonic()))
+                )
+            except PoolTimeout:
+                thread_lock_timeouts_total.inc()
+                raise ThreadLockTimeout(f"Thread {thread_id}: nenhuma conexão livre para o advisory lock")
+
+            while True:
+                cursor = await conn.execute("SELECT pg_try_advisory_lock(%s) AS ok", (chave,))
+                if (await cursor.fetchone())["ok"]:
+                    break
+                if time.monotonic() >= prazo:
+                    thread_lock_timeouts_total.inc()
+                    raise ThreadLockTimeout(f"Thread {thread_id} ocupada em outro worker")
+                await asyncio.sleep(self.intervalo_tentativa)
+            thread_lock_wait_seconds.observe(time.perf_counter() - inicio, scope="advisory")
+
+            try:
+                yield
+            finally:
+                # O lock é da sessão: se não for liberado, a conexão não pode voltar ao pool
+                try:
+                    await asyncio.shield(
+                        conn.execute("SELECT pg_advisory_unlock(%s)", (chave,))
+                    )
+                except BaseException as e:
+                    logger.error(f"Falha ao liberar o advisory lock de {thread_id}: {e}")
+                    await conn.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = {
+            "threads": len(self._locais),
+            "waiting": sum(max(0, l.usuarios - 1) for l in self._locais.values()),
+        }
+        if self._pool is not None:
+            pool_stats = self._pool.get_stats()
+            stats["advisory_connections"] = pool_stats.get("pool_size", 0)
+            stats["advisory_connections_waiting"] = pool_stats.get("requests_waiting", 0)
+        return stats
+
+    async def fechar(self):
+        """Fecha o pool das conexões de advisory lock."""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+# Instância única (Singleton)
+thread_lock_manager = ThreadLockManager(
+    usar_postgres=settings.THREAD_LOCK_BACKEND == "postgres",
+    timeout_segundos=settings.THREAD_LOCK_TIMEOUT_SECONDS,
+    intervalo_tentativa=settings.THREAD_LOCK_POLL_INTERVAL_SECONDS,
+    max_conexoes=settings.THREAD_LOCK_MAX_CONNECTIONS,
+)
@@ -0,0 +1,95 @@
+import logging
+from typing import Any, Dict, List, Optional
+from app.infrastructure.pesistence.postgres_persistence import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+class TokenUsageRepository:
+    """
+    Consumo de tokens agregado por conversa (thread_id), em uma tabela do Postgres.
+
+    As gravações são incrementos: cada lote soma os valores às linhas
+    existentes em um único INSERT ... ON CONFLICT, então vários workers podem
+    gravar a mesma conversa sem perder atualizações.
+    """
+
+    async def setup(self):
+        """Cria a tabela de consumo, se não existir."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conversation_token_usage (
+                    thread_id TEXT PRIMARY KEY,
+                    prompt_tokens BIGINT NOT NULL DEFAULT 0,
+                    completion_tokens BIGINT NOT NULL DEFAULT 0,
+                    cost_usd DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    llm_calls INTEGER NOT NULL DEFAULT 0,
+                    turns INTEGER NOT NULL DEFAULT 0,
+                    budget_policy TEXT,
+                    first_seen_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                """
+            )
+        logger.info("Tabela conversation_token_usage verificada/criada com sucesso.")
+
+    async def incrementar_lote(self, lote: Dict[str, Dict[str, Any]]):
+        """
+        Soma os incrementos de cada conversa.
+
+        Args:
+            lote: thread_id -> {"prompt_tokens", "completion_tokens", "cost_usd",
+                "llm_calls", "turns", "budget_policy"}.
+        """
+        if not lote:
+            return
+        thread_ids = list(lote)
+        colunas = [[lote[t][campo] for t in thread_ids] for campo in (
+            "prompt_tokens", "completion_tokens", "cost_usd", "llm_calls", "turns", "budget_policy"
+        )]
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                """
+                INSERT INTO conversation_token_usage AS u
+                    (thread_id, prompt_tokens, completion_tokens, cost_usd, llm_calls, turns, budget_policy)
+                SELECT * FROM unnest(
+                    %s::text[], %s::bigint[], %s::bigint[], %s::float8[], %s::int[], %s::int[], %s::text[]
+                )
+                ON CONFLICT (thread_id) DO UPDATE SET
+                    prompt_tokens = u.prompt_tokens + EXCLUDED.prompt_tokens,
+                    completion_tokens = u.completion_tokens + EXCLUDED.completion_tokens,
+                    cost_usd = u.cost_usd + EXCLUDED.cost_usd,
+                    llm_calls = u.llm_calls + EXCLUDED.llm_calls,
+                    turns = u.turns + EXCLUDED.turns,
+                    budget_policy = COALESCE(EXCLUDED.budget_policy, u.budget_policy),
+                    updated_at = now()
+                """,
+                (thread_ids, *colunas),
+            )
+
+    async def buscar(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """Consumo acumulado de uma conversa."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute(
+                "SELECT * FROM conversation_token_usage WHERE thread_id = %s", (thread_id,)
+            )
+            return await cursor.fetchone()
+
+    async def listar(self, limite: int = 50) -> List[Dict[str, Any]]:
+        """Conversas com maior custo."""
+        pool = await db_manager.get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute(
+                "SELECT * FROM conversation_token_usage "
+                "ORDER BY cost_usd DESC, prompt_tokens + completion_tokens DESC LIMIT %s",
+                (limite,),
+            )
+            return await cursor.fetchall()
+
+
+# Instância única (Singleton)
+token_usage_repository = TokenUsageRepository()
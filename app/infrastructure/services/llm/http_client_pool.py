@@ -0,0 +1,79 @@
+import logging
+from typing import Any, Dict, Optional
+import httpx
+from app.infrastructure.config.config import settings
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+llm_http_requests_total = metrics_registry.counter(
+    "llm_http_requests_total", "Requisições HTTP enviadas aos provedores de LLM"
+)
+llm_http_connections_opened_total = metrics_registry.counter(
+    "llm_http_connections_opened_total",
+    "Conexões TCP abertas com os provedores de LLM (as demais requisições reutilizaram conexões)",
+)
+
+
+class LLMHttpClientPool:
+    """
+    Cliente HTTP assíncrono compartilhado pelos serviços de LLM.
+
+    Mantém um único pool de conexões keep-alive por processo, dimensionado
+    pelas configurações LLM_HTTP_*, e contabiliza o reuso de conexões.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def get_client(self) -> httpx.AsyncClient:
+        """Retorna o cliente compartilhado. Cria um se não existir."""
+        if self._client is None or self._client.is_closed:
+            logger.info("Criando pool HTTP compartilhado para os clientes de LLM...")
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(
+                    connect=settings.LLM_HTTP_CONNECT_TIMEOUT,
+                    read=settings.LLM_HTTP_READ_TIMEOUT,
+                    write=settings.LLM_HTTP_READ_TIMEOUT,
+                    pool=settings.LLM_HTTP_POOL_TIMEOUT,
+                ),
+                event_hooks={"request": [self._on_request]},
+            )
+        return self._client
+
+    async def aclose(self):
+        """Fecha o cliente e todas as conexões do pool."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("Pool HTTP dos clientes de LLM fechado.")
+        self._client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de reuso de conexões."""
+        requests = llm_http_requests_total.total()
+        opened = llm_http_connections_opened_total.total()
+        return {
+            "requests": int(requests),
+            "connections_opened": int(opened),
+            "connections_reused": int(max(requests - opened, 0)),
+            "reuse_ratio": round((requests - opened) / requests, 4) if requests else 0.0,
+        }
+
+    async def _on_request(self, request: httpx.Request):
+        llm_http_requests_total.inc()
+        request.extensions["trace"] = self._trace
+
+    @staticmethod
+    async def _trace(event_name: str, info: Dict[str, Any]):
+        # Emitido pelo httpcore apenas quando uma conexão nova precisa ser aberta
+        if event_name == "connection.connect_tcp.started":
+            llm_http_connections_opened_total.inc()
+
+
+# Instância única (Singleton)
+llm_http_pool = LLMHttpClientPool()
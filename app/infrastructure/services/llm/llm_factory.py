@@ -1,11 +1,66 @@
+import logging
+from typing import Callable, Dict, List
+from app.infrastructure.config.config import settings
 from app.infrastructure.services.llm.openai_service import OpenAIService
+from app.infrastructure.services.llm.replay_llm_service import create_replay_llm_service
+from app.infrastructure.services.llm.http_client_pool import llm_http_pool
 from app.infrastructure.interfaces.illm_service import ILLMService
 
+logger = logging.getLogger(__name__)
+
 
 class LLMFactory:
-    @staticmethod
-    def create_llm_service(provider: str) -> ILLMService:
-        if provider == "openai":
-            return OpenAIService()
-        else:
+    """
+    Fábrica de serviços de LLM com registry de provedores.
+
+    `create_llm_service` sempre constrói uma instância nova; `get_llm_service`
+    devolve uma instância de longa duração por provedor, compartilhada por
+    todo o processo.
+    """
+
+    _providers: Dict[str, Callable[[], ILLMService]] = {
+        "openai": OpenAIService,
+        # Modelo mais barato, usado quando a conversa excede o orçamento de tokens
+        "openai_economy": lambda: OpenAIService(model=settings.TOKEN_BUDGET_DOWNGRADE_MODEL),
+        # Grava (sobre o OpenAI) ou reproduz chamadas de um cassete, sem rede
+        "replay": lambda: create_replay_llm_service(OpenAIService),
+    }
+    _instances: Dict[str, ILLMService] = {}
+
+    @classmethod
+    def register_provider(cls, provider: str, factory: Callable[[], ILLMService]):
+        """
+        Registra (ou substitui) um provedor. Descarta a instância em cache dele.
+        """
+        cls._providers[provider] = factory
+        cls._instances.pop(provider, None)
+        logger.info(f"Provedor de LLM '{provider}' registrado.")
+
+    @classmethod
+    def list_providers(cls) -> List[str]:
+        """Lista os provedores registrados."""
+        return list(cls._providers)
+
+    @classmethod
+    def create_llm_service(cls, provider: str) -> ILLMService:
+        """Cria uma nova instância do serviço do provedor."""
+        factory = cls._providers.get(provider)
+        if factory is None:
             raise ValueError(f"Provider {provider} not supported")
+        return factory()
+
+    @classmethod
+    def get_llm_service(cls, provider: str) -> ILLMService:
+        """Retorna a instância compartilhada do provedor, criando-a se necessário."""
+        service = cls._instances.get(provider)
+        if service is None:
+            service = cls.create_llm_service(provider)
+            cls._instances[provider] = service
+            logger.info(f"Instância compartilhada do provedor '{provider}' criada.")
+        return service
+
+    @classmethod
+    async def aclose(cls):
+        """Descarta as instâncias compartilhadas e fecha o pool HTTP."""
+        cls._instances.clear()
+        await llm_http_pool.aclose()
@@ -0,0 +1,106 @@
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.services.llm.token_usage import registrar_uso
+
+logger = logging.getLogger(__name__)
+
+# Chave do metadata (config do runnable) que identifica o tipo da chamada
+LLM_CALL_METADATA_KEY = "llm_call"
+
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+llm_call_seconds = metrics_registry.histogram(
+    "llm_call_seconds",
+    "Latência de cada chamada ao LLM por tipo (extraction, response, fused, summary, episode)",
+    labelnames=("call_type",),
+)
+llm_call_tokens = metrics_registry.histogram(
+    "llm_call_tokens",
+    "Tokens por chamada ao LLM, por tipo de chamada e tipo de token (prompt, completion)",
+    labelnames=("call_type", "kind"),
+    buckets=TOKEN_BUCKETS,
+)
+llm_tokens_total = metrics_registry.counter(
+    "llm_tokens_total",
+    "Tokens consumidos por tipo de chamada e tipo de token (prompt, completion)",
+    labelnames=("call_type", "kind"),
+)
+llm_call_errors_total = metrics_registry.counter(
+    "llm_call_errors_total", "Chamadas ao LLM que falharam, por tipo", labelnames=("call_type",)
+)
+
+
+def llm_call_config(call_type: str, **config: Any) -> Dict[str, Any]:
+    """Config de runnable que identifica o tipo da chamada nas métricas."""
+    metadata = {**config.pop("metadata", {}), LLM_CALL_METADATA_KEY: call_type}
+    return {**config, "metadata": metadata}
+
+
+def _extrair_uso(response: LLMResult) -> Tuple[int, int]:
+    """Retorna (prompt_tokens, completion_tokens) da resposta, se o provedor informou."""
+    for geracoes in response.generations:
+        for geracao in geracoes:
+            uso = getattr(getattr(geracao, "message", None), "usage_metadata", None)
+            if uso:
+                return uso.get("input_tokens", 0), uso.get("output_tokens", 0)
+    uso = (response.llm_output or {}).get("token_usage") or {}
+    return uso.get("prompt_tokens", 0), uso.get("completion_tokens", 0)
+
+
+class LLMMetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Registra latência e tokens de cada chamada ao modelo nas métricas em
+    processo e soma o uso ao turno em andamento (orçamento por conversa).
+    Roda inline no loop (sem executor) e não faz I/O.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._inicio: Dict[UUID, Tuple[float, str, Optional[str]]] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        call_type = (metadata or {}).get(LLM_CALL_METADATA_KEY, "other")
+        modelo = (kwargs.get("invocation_params") or {}).get("model")
+        self._inicio[run_id] = (time.perf_counter(), call_type, modelo)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        inicio = self._inicio.pop(run_id, None)
+        if inicio is None:
+            return
+        comeco, call_type, modelo = inicio
+        llm_call_seconds.observe(time.perf_counter() - comeco, call_type=call_type)
+        try:
+            prompt_tokens, completion_tokens = _extrair_uso(response)
+        except Exception as e:
+            logger.debug(f"Uso de tokens indisponível: {e}")
+            return
+        registrar_uso(modelo, prompt_tokens, completion_tokens)
+        for kind, tokens in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+            if tokens:
+                llm_call_tokens.observe(tokens, call_type=call_type, kind=kind)
+                llm_tokens_total.inc(tokens, call_type=call_type, kind=kind)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        inicio = self._inicio.pop(run_id, None)
+        call_type = inicio[1] if inicio else "other"
+        llm_call_errors_total.inc(call_type=call_type)
+
+
+# Instância única, registrada nos clientes de LLM
+llm_metrics_handler = LLMMetricsCallbackHandler()
@@ -1,13 +1,17 @@
 import logging
 import asyncio
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import BaseMessage, HumanMessage
 from pydantic import BaseModel, Field
 from app.infrastructure.config.config import settings
+from app.infrastructure.services.llm.http_client_pool import llm_http_pool
+from app.infrastructure.interfaces.illm_service import REPLY_STREAM_TAG, RESPOSTA_FALLBACK
+from app.infrastructure.services.llm.llm_metrics import llm_call_config, llm_metrics_handler
 from app.application.agent.node.orchestrator.orchestrator_prompt import (
     orchestrator_prompt_template as ORCHESTRATOR_PROMPT_TEMPLATE,
+    system_prompt_text,
 )
 
 logger = logging.getLogger(__name__)
@@ -23,6 +27,7 @@ class ExtractedInfo(BaseModel):
     cpf: str | None = Field(None, description="CPF do cliente")
     endereco_completo: str | None = Field(None, description="Endereço completo")
     bairro: str | None = Field(None, description="Bairro mencionado")
+    cep: str | None = Field(None, description="CEP do endereço")
     ponto_referencia: str | None = Field(None, description="Ponto de referência mencionado")
     
     # Informações do serviço
@@ -42,19 +47,8 @@ class ExtractedInfo(BaseModel):
     etapa_detectada: str = Field("inicial", description="Etapa detectada baseada no contexto")
 
 
-class OpenAIService:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.1,
-            api_key=settings.OPENAI_API_KEY,
-        )
-        
-        # PROMPT DE EXTRAÇÃO DE INFORMAÇÕES
-        self.extraction_prompt = ChatPromptTemplate.from_messages([
-            ("system", """
-Você é um especialista em extrair informações de conversas de atendimento da Doutor Sofá (limpeza de estofados).
-
+# REGRAS DE EXTRAÇÃO (compartilhadas pelo modo de duas chamadas e pelo fundido)
+EXTRACTION_RULES = """
 🔧 IMPORTANTE - CIDADE vs PONTO DE REFERÊNCIA:
 
 **CIDADE** (para localizar franquia responsável):
@@ -95,19 +89,83 @@ Você é um especialista em extrair informações de conversas de atendimento da
 - Cliente aceita orçamento → "confirmacao_orcamento"
 - Cliente fornece dados pessoais → "identificacao_cliente"
 - Todos dados coletados → "transbordo_humano"
+"""
 
+# PROMPT DE EXTRAÇÃO DE INFORMAÇÕES
+EXTRACTION_SYSTEM_PROMPT = """
+Você é um especialista em extrair informações de conversas de atendimento da Doutor Sofá (limpeza de estofados).
+""" + EXTRACTION_RULES + """
 Extraia as informações da mensagem e retorne em JSON estruturado.
-"""),
+"""
+
+FUSED_INSTRUCTIONS = """
+MODO EXTRAÇÃO + RESPOSTA: coloque sua resposta ao cliente no campo "resposta" e
+extraia nos demais campos as informações da ÚLTIMA mensagem dele, seguindo as regras:
+""" + EXTRACTION_RULES
+
+# PROMPT DE RESUMO INCREMENTAL DO HISTÓRICO
+SUMMARY_SYSTEM_PROMPT = """
+Você resume conversas de atendimento da Doutor Sofá (limpeza de estofados).
+Atualize o resumo anterior incorporando as novas mensagens. Mantenha apenas o
+que importa para continuar o atendimento: item, tamanho, cidade, orçamento
+apresentado, aceite, dúvidas e objeções do cliente e dados já informados.
+Responda apenas com o resumo, em no máximo 8 linhas.
+
+RESUMO ANTERIOR:
+{previous_summary}
+"""
+
+
+class ExtractedInfoWithResponse(ExtractedInfo):
+    """Extração estruturada acrescida da resposta ao cliente (modo fundido)"""
+
+    resposta: str = Field(..., description="Resposta da Yasmin para a última mensagem do cliente")
+
+
+class OpenAIService:
+    def __init__(self, http_async_client=None, model: str = "gpt-4o-mini"):
+        """
+        Inicializa o serviço. O cliente HTTP é compartilhado por padrão,
+        para que todas as instâncias reutilizem o mesmo pool de conexões.
+        """
+        self.llm = ChatOpenAI(
+            model=model,
+            temperature=0.1,
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=settings.LLM_MAX_RETRIES,
+            http_async_client=http_async_client or llm_http_pool.get_client(),
+            callbacks=[llm_metrics_handler],
+        )
+
+        # Runnable de saída estruturada pré-construído (reutilizado a cada turno)
+        self.structured_llm = self.llm.with_structured_output(ExtractedInfo)
+        self.fused_llm = self.llm.with_structured_output(ExtractedInfoWithResponse)
+        
+        # PROMPT DE EXTRAÇÃO DE INFORMAÇÕES
+        self.extraction_prompt = ChatPromptTemplate.from_messages([
+            ("system", EXTRACTION_SYSTEM_PROMPT),
             ("user", "{message}")
         ])
 
+        # PROMPT DE RESUMO DO HISTÓRICO
+        self.summary_prompt = ChatPromptTemplate.from_messages([
+            ("system", SUMMARY_SYSTEM_PROMPT),
+            MessagesPlaceholder(variable_name="messages"),
+        ])
+
+        # PROMPT DO MODO FUNDIDO (extração + resposta em uma única chamada)
+        self.fused_prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt_text + FUSED_INSTRUCTIONS),
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("user", "{user_query}")
+        ])
+
     async def extract_information(self, user_message: str) -> Dict[str, Any]:
         """Extrai informações estruturadas da mensagem do usuário"""
         try:
-            structured_llm = self.llm.with_structured_output(ExtractedInfo)
-            
-            result = await structured_llm.ainvoke(
-                self.extraction_prompt.format_messages(message=user_message)
+            result = await self.structured_llm.ainvoke(
+                self.extraction_prompt.format_messages(message=user_message),
+                config=llm_call_config("extraction"),
             )
             
             return result.model_dump()
@@ -127,19 +185,68 @@ Extraia as informações da mensagem e retorne em JSON estruturado.
             # Construir contexto baseado no estado atual
             context = self._build_context(scheduling_data) if scheduling_data else ""
             
+            # A tag marca a chamada da resposta para o streaming de tokens
             response = await self.llm.ainvoke(
                 ORCHESTRATOR_PROMPT_TEMPLATE.format_messages(
                     chat_history=chat_history,
                     user_query=user_query,
                     context=context
-                )
+                ),
+                config=llm_call_config("response", tags=[REPLY_STREAM_TAG]),
             )
             
             return response.content
             
         except Exception as e:
             logger.error(f"Erro no template do orquestrador: {e}")
-            return "Desculpe, tive um problema momentâneo. Pode repetir?"
+            return RESPOSTA_FALLBACK
+
+    async def extract_and_respond(self, user_query: str, chat_history: List[BaseMessage] = None, scheduling_data = None) -> Dict[str, Any]:
+        """
+        Extrai as informações e gera a resposta em uma única chamada ao LLM.
+
+        Returns:
+            Dict com "extracted_info" (mesmo formato de `extract_information`)
+            e "resposta" (texto para o cliente).
+        """
+        try:
+            if chat_history is None:
+                chat_history = []
+
+            context = self._build_context(scheduling_data) if scheduling_data else ""
+
+            result = await self.fused_llm.ainvoke(
+                self.fused_prompt.format_messages(
+                    chat_history=chat_history,
+                    user_query=user_query,
+                    context=context
+                ),
+                config=llm_call_config("fused"),
+            )
+
+            extracted_info = result.model_dump(exclude={"resposta"})
+            return {"extracted_info": extracted_info, "resposta": result.resposta}
+
+        except Exception as e:
+            logger.error(f"Erro na extração + resposta fundida: {e}")
+            return {
+                "extracted_info": {},
+                "resposta": RESPOSTA_FALLBACK,
+            }
+
+    async def summarize_history(self, previous_summary: Optional[str], messages: List[BaseMessage]) -> str:
+        """
+        Incorpora as mensagens ao resumo anterior. Erros são propagados para
+        que o chamador mantenha as mensagens na íntegra.
+        """
+        response = await self.llm.ainvoke(
+            self.summary_prompt.format_messages(
+                previous_summary=previous_summary or "(sem resumo anterior)",
+                messages=list(messages) + [HumanMessage(content="Atualize o resumo.")],
+            ),
+            config=llm_call_config("summary"),
+        )
+        return response.content.strip()
 
     def _build_context(self, scheduling_data) -> str:
         """Constrói o contexto baseado nos dados de agendamento"""
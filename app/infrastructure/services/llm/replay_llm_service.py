@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+
+from app.infrastructure.config.config import settings
+from app.infrastructure.interfaces.illm_service import RESPOSTA_FALLBACK, ILLMService
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.utils.normalize_text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+replay_lookups_total = metrics_registry.counter(
+    "llm_replay_lookups_total",
+    "Consultas ao cassete do provedor replay por método e resultado (hit, fallback, miss, recorded)",
+    labelnames=("method", "result"),
+)
+
+
+class LatencySimulator:
+    """
+    Sorteia a latência simulada de cada chamada.
+
+    - none: sem espera
+    - constant: sempre `media_ms`
+    - uniform: entre `media_ms - desvio_ms` e `media_ms + desvio_ms`
+    - lognormal: média `media_ms` e desvio padrão `desvio_ms` (cauda longa,
+      como a latência real de um provedor)
+    """
+
+    def __init__(
+        self,
+        distribuicao: str = "none",
+        media_ms: float = 0.0,
+        desvio_ms: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        if distribuicao not in ("none", "constant", "uniform", "lognormal"):
+            raise ValueError(f"Distribuição de latência desconhecida: {distribuicao}")
+        self.distribuicao = distribuicao
+        self.media_ms = media_ms
+        self.desvio_ms = desvio_ms
+        self._random = random.Random(seed)
+
+        # Parâmetros da normal subjacente a partir da média e do desvio desejados
+        if distribuicao == "lognormal" and media_ms > 0:
+            self._sigma = math.sqrt(math.log(1 + (desvio_ms / media_ms) ** 2))
+            self._mu = math.log(media_ms) - self._sigma ** 2 / 2
+
+    def sortear(self) -> float:
+        """Latência da próxima chamada, em segundos."""
+        if self.distribuicao == "none" or self.media_ms <= 0:
+            return 0.0
+        if self.distribuicao == "constant":
+            ms = self.media_ms
+        elif self.distribuicao == "uniform":
+            ms = self._random.uniform(self.media_ms - self.desvio_ms, self.media_ms + self.desvio_ms)
+        else:
+            ms = self._random.lognormvariate(self._mu, self._sigma)
+        return max(0.0, ms) / 1000
+
+    async def aguardar(self):
+        segundos = self.sortear()
+        if segundos:
+            await asyncio.sleep(segundos)
+
+
+class ReplayLLMService(ILLMService):
+    """
+    Provedor de LLM que grava e reproduz chamadas a partir de um cassete.
+
+    - record: delega ao serviço real e acrescenta cada resposta ao cassete
+      (JSONL, uma linha por chamada: {"k": chave, "m": método, "u": chave da
+      mensagem, "r": resultado}).
+    - replay: responde apenas do cassete, sem rede, com a latência simulada
+      configurada.
+
+    A chave é o hash do prompt normalizado (método, mensagem do cliente,
+    histórico e contexto relevante do SchedulingData), então a consulta é
+    um acesso a dicionário. Quando o prompt exato não foi gravado (ex.: o
+    mesmo roteiro rodando com históricos diferentes), vale a última resposta
+    gravada para a mesma mensagem do cliente; na falta dela, uma resposta
+    padrão.
+    """
+
+    def __init__(
+        self,
+        cassete: str,
+        modo: str = "replay",
+        servico_real: Optional[ILLMService] = None,
+        latencia: Optional[LatencySimulator] = None,
+    ):
+        if modo not in ("record", "replay"):
+            raise ValueError(f"Modo do provedor replay desconhecido: {modo}")
+        if modo == "record" and servico_real is None:
+            raise ValueError("O modo 'record' precisa do serviço de LLM real")
+
+        self.cassete = cassete
+        self.modo = modo
+        self.servico_real = servico_real
+        self.latencia = latencia or LatencySimulator()
+        self._por_prompt: Dict[str, Any] = {}
+        self._por_mensagem: Dict[str, Any] = {}
+        self._carregar()
+
+    def _carregar(self):
+        if not os.path.exists(self.cassete):
+            if self.modo == "replay":
+                logger.warning(f"Cassete {self.cassete} não encontrado; todas as chamadas usarão a resposta padrão")
+            return
+
+        with open(self.cassete, encoding="utf-8") as f:
+            for numero, linha in enumerate(f, 1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    logger.warning(f"Linha {numero} inválida no cassete {self.cassete}; ignorada")
+                    continue
+                self._indexar(registro)
+        logger.info(f"Cassete {self.cassete} carregado: {len(self._por_prompt)} chamadas")
+
+    def _indexar(self, registro: Dict[str, Any]):
+        self._por_prompt[registro["k"]] = registro["r"]
+        self._por_mensagem[registro["u"]] = registro["r"]
+
+    def _gravar(self, registro: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.cassete) or ".", exist_ok=True)
+        with open(self.cassete, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    # ---- Chaves ----
+
+    @staticmethod
+    def _normalizar(texto: Any) -> str:
+        return " ".join(normalize_text(str(texto or "")).split())
+
+    @staticmethod
+    def _hash(*partes: str) -> str:
+        return hashlib.blake2b("\x00".join(partes).encode("utf-8"), digest_size=16).hexdigest()
+
+    @classmethod
+    def _contexto(cls, scheduling_data: Any) -> str:
+        """Campos do SchedulingData que entram no prompt do orquestrador."""
+        if not scheduling_data:
+            return ""
+        dados = scheduling_data if isinstance(scheduling_data, dict) else scheduling_data.model_dump()
+        cliente = dados.get("cliente") or {}
+        servico = dados.get("servico") or {}
+        return "|".join(
+            cls._normalizar(valor)
+            for valor in (
+                dados.get("etapa_atual"),
+                cliente.get("nome_completo"),
+                servico.get("item_selecionado"),
+                servico.get("tamanho_item"),
+                dados.get("cidade"),
+            )
+        )
+
+    @classmethod
+    def _historico(cls, chat_history: Optional[List[BaseMessage]]) -> str:
+        return "\x1e".join(f"{m.type}:{cls._normalizar(m.content)}" for m in chat_history or [])
+
+    def _chaves(self, metodo: str, mensagem: str, *extras: str) -> Tuple[str, str]:
+        texto = self._normalizar(mensagem)
+        return self._hash(metodo, texto, *extras), self._hash(metodo, texto)
+
+    # ---- Gravação / reprodução ----
+
+    async def _chamar(
+        self,
+        metodo: str,
+        chaves: Tuple[str, str],
+        chamada_real: Callable[[], Awaitable[Any]],
+        padrao: Any,
+    ) -> Any:
+        chave, chave_mensagem = chaves
+
+        if self.modo == "record":
+            resultado = await chamada_real()
+            # Respostas de erro do serviço real não entram no cassete
+            if resultado != padrao:
+                registro = {"k": chave, "m": metodo, "u": chave_mensagem, "r": resultado}
+                self._gravar(registro)
+                self._indexar(registro)
+                replay_lookups_total.inc(method=metodo, result="recorded")
+            return resultado
+
+        await self.latencia.aguardar()
+        if chave in self._por_prompt:
+            replay_lookups_total.inc(method=metodo, result="hit")
+            return self._por_prompt[chave]
+        if chave_mensagem in self._por_mensagem:
+            replay_lookups_total.inc(method=metodo, result="fallback")
+            return self._por_mensagem[chave_mensagem]
+        replay_lookups_total.inc(method=metodo, result="miss")
+        return padrao
+
+    # ---- ILLMService ----
+
+    async def extract_information(self, user_message: str) -> Dict[str, Any]:
+        resultado = await self._chamar(
+            "extract_information",
+            self._chaves("extract_information", user_message),
+            lambda: self.servico_real.extract_information(user_message),
+            {},
+        )
+        return dict(resultado)
+
+    async def orchestrator_prompt_template(self, user_query: str, chat_history: List[BaseMessage] = None, scheduling_data = None):
+        return await self._chamar(
+            "orchestrator_prompt_template",
+            self._chaves(
+                "orchestrator_prompt_template",
+                user_query,
+                self._historico(chat_history),
+                self._contexto(scheduling_data),
+            ),
+            lambda: self.servico_real.orchestrator_prompt_template(
+                user_query, chat_history, scheduling_data
+            ),
+            RESPOSTA_FALLBACK,
+        )
+
+    async def extract_and_respond(self, user_query: str, chat_history: List[BaseMessage] = None, scheduling_data = None) -> Dict[str, Any]:
+        resultado = await self._chamar(
+            "extract_and_respond",
+            self._chaves(
+                "extract_and_respond",
+                user_query,
+                self._historico(chat_history),
+                self._contexto(scheduling_data),
+            ),
+            lambda: self.servico_real.extract_and_respond(user_query, chat_history, scheduling_data),
+            {"extracted_info": {}, "resposta": RESPOSTA_FALLBACK},
+        )
+        return {
+            "extracted_info": dict(resultado.get("extracted_info") or {}),
+            "resposta": resultado.get("resposta", RESPOSTA_FALLBACK),
+        }
+
+    async def summarize_history(self, previous_summary: Optional[str], messages: List[BaseMessage]) -> str:
+        # Sem resumo gravado: mantém o anterior acrescido das novas mensagens
+        partes = [previous_summary] if previous_summary else []
+        partes += [str(m.content)[:80] for m in messages]
+        return await self._chamar(
+            "summarize_history",
+            self._chaves("summarize_history", self._historico(messages), previous_summary or ""),
+            lambda: self.servico_real.summarize_history(previous_summary, messages),
+            " / ".join(partes)[-1000:],
+        )
+
+
+def create_replay_llm_service(servico_real_factory: Callable[[], ILLMService]) -> ReplayLLMService:
+    """Cria o provedor replay a partir das configurações."""
+    return ReplayLLMService(
+        cassete=settings.LLM_REPLAY_CASSETTE_PATH,
+        modo=settings.LLM_REPLAY_MODE,
+        servico_real=servico_real_factory() if settings.LLM_REPLAY_MODE == "record" else None,
+        latencia=LatencySimulator(
+            distribuicao=settings.LLM_REPLAY_LATENCY_DISTRIBUTION,
+            media_ms=settings.LLM_REPLAY_LATENCY_MEAN_MS,
+            desvio_ms=settings.LLM_REPLAY_LATENCY_STDDEV_MS,
+            seed=settings.LLM_REPLAY_SEED,
+        ),
+    )
@@ -0,0 +1,69 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from pydantic import BaseModel, Field
+
+from app.infrastructure.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenUsage(BaseModel):
+    """Tokens e custo consumidos (em um turno ou acumulados na conversa)"""
+    prompt_tokens: int = Field(0, description="Tokens de entrada")
+    completion_tokens: int = Field(0, description="Tokens gerados")
+    cost_usd: float = Field(0.0, description="Custo estimado em USD")
+    llm_calls: int = Field(0, description="Chamadas ao LLM")
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def registrar(self, prompt_tokens: int, completion_tokens: int, cost_usd: float):
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += cost_usd
+        self.llm_calls += 1
+
+    def somar(self, outro: "TokenUsage") -> "TokenUsage":
+        return TokenUsage(
+            prompt_tokens=self.prompt_tokens + outro.prompt_tokens,
+            completion_tokens=self.completion_tokens + outro.completion_tokens,
+            cost_usd=self.cost_usd + outro.cost_usd,
+            llm_calls=self.llm_calls + outro.llm_calls,
+        )
+
+
+# Consumo do turno em andamento. As tarefas filhas (asyncio.gather) herdam
+# uma cópia do contexto apontando para o mesmo objeto, então as chamadas
+# paralelas do modo especulativo somam no mesmo acumulador.
+_uso_turno: ContextVar[Optional[TokenUsage]] = ContextVar("uso_turno", default=None)
+
+
+def custo_usd(modelo: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    """Custo estimado da chamada pela tabela LLM_PRICES_PER_1M_TOKENS (0 se o modelo não estiver nela)."""
+    precos = settings.LLM_PRICES_PER_1M_TOKENS.get(modelo or "")
+    if not precos:
+        return 0.0
+    preco_prompt, preco_completion = precos
+    return (prompt_tokens * preco_prompt + completion_tokens * preco_completion) / 1_000_000
+
+
+@contextmanager
+def contabilizar_tokens() -> Iterator[TokenUsage]:
+    """Acumula no objeto retornado o uso de todas as chamadas ao LLM do bloco."""
+    uso = TokenUsage()
+    token = _uso_turno.set(uso)
+    try:
+        yield uso
+    finally:
+        _uso_turno.reset(token)
+
+
+def registrar_uso(modelo: Optional[str], prompt_tokens: int, completion_tokens: int):
+    """Soma o uso de uma chamada ao turno em andamento (sem turno, não faz nada)."""
+    uso = _uso_turno.get()
+    if uso is not None:
+        uso.registrar(prompt_tokens, completion_tokens, custo_usd(modelo, prompt_tokens, completion_tokens))
@@ -0,0 +1,51 @@
+import logging
+from typing import Optional
+import httpx
+from app.infrastructure.config.config import settings
+from app.infrastructure.interfaces.ioutbound_sender import IOutboundSender
+
+logger = logging.getLogger(__name__)
+
+
+class HttpOutboundSender(IOutboundSender):
+    """
+    Envia as respostas do agente via POST JSON para a URL configurada.
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def enviar(self, phone_number: str, message: str, reply_to: str = None):
+        response = await self._get_client().post(
+            self.url,
+            json={"phoneNumber": phone_number, "message": message, "replyTo": reply_to},
+        )
+        response.raise_for_status()
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+class LoggingOutboundSender(IOutboundSender):
+    """
+    Apenas registra a resposta em log. Usado quando não há URL de saída.
+    """
+
+    async def enviar(self, phone_number: str, message: str, reply_to: str = None):
+        logger.info(f"Resposta para {phone_number} (sem URL de saída configurada): '{message}'")
+
+
+def create_outbound_sender() -> IOutboundSender:
+    """Cria o sender conforme as configurações."""
+    if settings.OUTBOUND_WEBHOOK_URL:
+        return HttpOutboundSender(settings.OUTBOUND_WEBHOOK_URL, settings.OUTBOUND_TIMEOUT_SECONDS)
+    return LoggingOutboundSender()
@@ -0,0 +1,355 @@
+# app/infrastructure/vector/episode_index.py
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.infrastructure.config.config import settings
+from app.infrastructure.metrics.metrics_registry import metrics_registry
+from app.infrastructure.vector.hashing_embedder import hashing_embedder
+
+logger = logging.getLogger(__name__)
+
+episode_index_search_seconds = metrics_registry.histogram(
+    "episode_index_search_seconds",
+    "Duração das buscas no índice vetorial de episódios",
+    labelnames=("strategy",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05),
+)
+
+_ARQUIVO_VETORES = "vetores.f32"
+_ARQUIVO_METADADOS = "metadados.jsonl"
+_ARQUIVO_TRAVA = "indice.lock"
+
+
+class EpisodeVectorIndex:
+    """
+    Índice vetorial em processo para os episódios de memória.
+
+    Os vetores (float32, normalizados) ficam numa matriz contígua mapeada do
+    disco (`np.memmap`), que cresce dobrando a capacidade; os metadados ficam
+    num JSONL ao lado, uma linha por vetor. Inserções são incrementais.
+
+    Vários workers podem abrir o mesmo diretório: as inserções acontecem sob
+    um flock exclusivo, depois de ler as linhas que os outros processos
+    acrescentaram ao JSONL; as buscas leem essa cauda (sob flock
+    compartilhado) sempre que o arquivo cresce.
+
+    Os métodos síncronos bloqueiam (flock, I/O de disco, numpy); no event
+    loop, use `acarregar`, `abuscar` e `aadicionar_lote`, que os executam
+    em threads. O estado em memória é protegido por um lock de thread. O
+    treino do IVF roda numa thread própria: enquanto não termina, as buscas
+    usam os centroides e listas anteriores.
+
+    Busca:
+    - Filtrada por telefone: produto escalar apenas nas linhas do cliente
+      (poucas dezenas), o caso usado a cada turno.
+    - Global: força bruta até `limiar_ivf` vetores; acima disso, um
+      quantizador grosseiro estilo IVF (k-means com `n_listas` centroides)
+      restringe a busca às `n_sondas` listas mais próximas.
+    """
+
+    def __init__(
+        self,
+        diretorio: str,
+        embed_fn: Callable[[str], np.ndarray] = hashing_embedder.embed,
+        dimensao: int = hashing_embedder.dimensao,
+        capacidade_inicial: int = 1024,
+        limiar_ivf: int = 20000,
+        n_listas: int = 128,
+        n_sondas: int = 8,
+    ):
+        self.diretorio = diretorio
+        self.embed_fn = embed_fn
+        self.dimensao = dimensao
+        self.capacidade_inicial = capacidade_inicial
+        self.limiar_ivf = limiar_ivf
+        self.n_listas = n_listas
+        self.n_sondas = n_sondas
+
+        self._vetores: Optional[np.memmap] = None
+        self._metadados: List[Dict[str, Any]] = []
+        self._linhas_por_telefone: Dict[str, List[int]] = {}
+        self._centroides: Optional[np.ndarray] = None
+        self._listas: List[np.ndarray] = []
+        self._treinado_com = 0
+        self._bytes_lidos = 0
+        self._carregado = False
+        self._trava_memoria = threading.RLock()
+        self._treinando = False
+
+    # ---- Persistência ----
+
+    def _caminho(self, nome: str) -> str:
+        return os.path.join(self.diretorio, nome)
+
+    @contextmanager
+    def _travar(self, operacao: int = fcntl.LOCK_EX):
+        """flock no arquivo de trava do diretório, compartilhado entre processos."""
+        with open(self._caminho(_ARQUIVO_TRAVA), "a") as trava:
+            fcntl.flock(trava, operacao)
+            try:
+                yield
+            finally:
+                fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def carregar(self):
+        """Abre (ou cria) os arquivos do índice."""
+        with self._trava_memoria:
+            if self._carregado:
+                return
+            os.makedirs(self.diretorio, exist_ok=True)
+
+            with self._travar():
+                self._abrir_matriz(max(self._linhas_em_disco(), self.capacidade_inicial))
+                self._ler_novas_linhas()
+            self._carregado = True
+            self._verificar_ivf()
+        logger.info(f"Índice de episódios carregado: {len(self)} vetores em {self.diretorio}")
+
+    async def acarregar(self):
+        await asyncio.to_thread(self.carregar)
+
+    def _linhas_em_disco(self) -> int:
+        caminho_vetores = self._caminho(_ARQUIVO_VETORES)
+        if not os.path.exists(caminho_vetores):
+            return 0
+        return os.path.getsize(caminho_vetores) // (self.dimensao * 4)
+
+    def _ler_novas_linhas(self):
+        """
+        Lê as linhas de metadados acrescentadas desde a última leitura (por
+        este ou por outro processo). Deve ser chamado com a trava.
+
+        O vetor é gravado antes da linha de metadados, então o JSONL define
+        quantos vetores são válidos (uma linha truncada é descartada).
+        """
+        caminho_meta = self._caminho(_ARQUIVO_METADADOS)
+        if not os.path.exists(caminho_meta) or os.path.getsize(caminho_meta) <= self._bytes_lidos:
+            return
+
+        # Outro processo pode ter aumentado a matriz
+        if self._linhas_em_disco() > self._vetores.shape[0]:
+            self._abrir_matriz(self._linhas_em_disco())
+
+        with open(caminho_meta, "rb") as f:
+            f.seek(self._bytes_lidos)
+            for bruta in f:
+                if not bruta.endswith(b"\n") or len(self) >= self._vetores.shape[0]:
+                    break
+                try:
+                    meta = json.loads(bruta)
+                except json.JSONDecodeError:
+                    logger.warning("Linha inválida no índice de episódios descartada")
+                    break
+                self._bytes_lidos += len(bruta)
+                self._registrar(meta)
+
+    def _registrar(self, meta: Dict[str, Any]):
+        """Inclui a próxima linha nas estruturas em memória."""
+        linha = len(self)
+        self._metadados.append(meta)
+        self._linhas_por_telefone.setdefault(meta["phone_number"], []).append(linha)
+        if self._centroides is not None:
+            lista = int(np.argmax(self._centroides @ self._vetores[linha]))
+            self._listas[lista] = np.append(self._listas[lista], linha)
+
+    def _sincronizar(self):
+        """
+        Traz as linhas gravadas por outros processos, se o JSONL cresceu.
+        Deve ser chamado com o lock de memória.
+        """
+        caminho_meta = self._caminho(_ARQUIVO_METADADOS)
+        if os.path.exists(caminho_meta) and os.path.getsize(caminho_meta) > self._bytes_lidos:
+            with self._travar(fcntl.LOCK_SH):
+                self._ler_novas_linhas()
+            self._verificar_ivf()
+
+    def _verificar_ivf(self):
+        """Dispara o (re)treino do IVF em segundo plano quando o índice cresce o bastante."""
+        if self._treinando:
+            return
+        if self._centroides is not None:
+            precisa = len(self) >= 2 * self._treinado_com
+        else:
+            precisa = len(self) >= self.limiar_ivf
+        if precisa:
+            self._treinando = True
+            threading.Thread(target=self._treinar_ivf, name="episode-index-ivf", daemon=True).start()
+
+    def _abrir_matriz(self, capacidade: int):
+        caminho = self._caminho(_ARQUIVO_VETORES)
+        modo = "r+" if os.path.exists(caminho) else "w+"
+        if modo == "r+" and os.path.getsize(caminho) < capacidade * self.dimensao * 4:
+            with open(caminho, "r+b") as f:
+                f.truncate(capacidade * self.dimensao * 4)
+        if self._vetores is not None:
+            self._vetores.flush()
+            del self._vetores
+        self._vetores = np.memmap(
+            caminho, dtype=np.float32, mode=modo, shape=(capacidade, self.dimensao)
+        )
+
+    def __len__(self) -> int:
+        return len(self._metadados)
+
+    # ---- Inserção ----
+
+    def adicionar(self, phone_number: str, texto: str, metadados: Optional[Dict[str, Any]] = None) -> int:
+        """Indexa um episódio e retorna a linha ocupada."""
+        return self.adicionar_lote([(phone_number, texto, metadados)])[0]
+
+    def adicionar_lote(self, itens: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> List[int]:
+        """Indexa vários episódios (telefone, texto, metadados) sob uma única trava."""
+        self.carregar()
+        novos = []
+        for phone_number, texto, metadados in itens:
+            meta = {"phone_number": phone_number, "texto": texto, "criado_em": time.time()}
+            meta.update(metadados or {})
+            novos.append((self.embed_fn(texto).astype(np.float32, copy=False), meta))
+
+        linhas = []
+        with self._trava_memoria, self._travar():
+            # A próxima linha livre é a do arquivo, não a desta cópia em memória
+            self._ler_novas_linhas()
+            for vetor, meta in novos:
+                linha = len(self) + len(linhas)
+                if linha >= self._vetores.shape[0]:
+                    self._abrir_matriz(self._vetores.shape[0] * 2)
+                self._vetores[linha] = vetor
+                linhas.append(linha)
+            self._vetores.flush()
+            with open(self._caminho(_ARQUIVO_METADADOS), "a", encoding="utf-8") as f:
+                f.writelines(
+                    json.dumps(meta, ensure_ascii=False, default=str) + "\n" for _, meta in novos
+                )
+            self._ler_novas_linhas()
+            self._verificar_ivf()
+        return linhas
+
+    async def aadicionar_lote(self, itens: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> List[int]:
+        return await asyncio.to_thread(self.adicionar_lote, itens)
+
+    # ---- Busca ----
+
+    def buscar(self, consulta: str, k: int = 3, phone_number: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Retorna até `k` episódios mais similares à consulta, com o score.
+
+        Args:
+            consulta: Texto da consulta (ex.: mensagem atual do cliente).
+            k: Quantidade de resultados.
+            phone_number: Restringe aos episódios deste telefone.
+        """
+        self.carregar()
+        vetor = self.embed_fn(consulta).astype(np.float32, copy=False)
+        with self._trava_memoria:
+            self._sincronizar()
+            return self._buscar_vetor(vetor, k, phone_number)
+
+    async def abuscar(self, consulta: str, k: int = 3, phone_number: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.buscar, consulta, k, phone_number)
+
+    def _buscar_vetor(self, vetor: np.ndarray, k: int, phone_number: Optional[str]) -> List[Dict[str, Any]]:
+        if not len(self):
+            return []
+
+        inicio = time.perf_counter()
+        if phone_number is not None:
+            estrategia = "phone"
+            candidatos = np.asarray(self._linhas_por_telefone.get(phone_number, []), dtype=np.int64)
+        elif self._centroides is not None:
+            estrategia = "ivf"
+            sondas = np.argsort(self._centroides @ vetor)[::-1][: self.n_sondas]
+            candidatos = np.concatenate([self._listas[i] for i in sondas])
+        else:
+            estrategia = "brute_force"
+            candidatos = None
+
+        if candidatos is None:
+            scores = self._vetores[: len(self)] @ vetor
+            linhas = np.arange(len(self))
+        elif candidatos.size:
+            scores = self._vetores[candidatos] @ vetor
+            linhas = candidatos
+        else:
+            episode_index_search_seconds.observe(time.perf_counter() - inicio, strategy=estrategia)
+            return []
+
+        k = min(k, len(scores))
+        melhores = np.argpartition(-scores, k - 1)[:k]
+        melhores = melhores[np.argsort(-scores[melhores])]
+        resultados = [
+            {**self._metadados[int(linhas[i])], "score": float(scores[i])} for i in melhores
+        ]
+        episode_index_search_seconds.observe(time.perf_counter() - inicio, strategy=estrategia)
+        return resultados
+
+    # ---- IVF ----
+
+    def _treinar_ivf(self, iteracoes: int = 10):
+        """
+        k-means esférico sobre os vetores atuais (centroides normalizados).
+
+        Roda fora do lock de memória: as linhas já gravadas não mudam, e a
+        visão da matriz mantém o mapeamento vivo mesmo se ela for reaberta.
+        Ao terminar, troca centroides e listas e distribui as linhas que
+        chegaram durante o treino.
+        """
+        try:
+            with self._trava_memoria:
+                n = len(self)
+                dados = self._vetores[:n]
+            self._treinar_ivf_com(dados, n, iteracoes)
+        except Exception as e:
+            logger.error(f"Erro ao treinar o quantizador IVF: {e}")
+        finally:
+            self._treinando = False
+
+    def _treinar_ivf_com(self, dados: np.ndarray, n: int, iteracoes: int):
+        n_listas = min(self.n_listas, n)
+        rng = np.random.default_rng(0)
+        centroides = dados[rng.choice(n, n_listas, replace=False)].copy()
+
+        for _ in range(iteracoes):
+            atribuicao = np.argmax(dados @ centroides.T, axis=1)
+            for c in range(n_listas):
+                membros = dados[atribuicao == c]
+                if len(membros):
+                    soma = membros.sum(axis=0)
+                    norma = np.linalg.norm(soma)
+                    if norma:
+                        centroides[c] = soma / norma
+
+        atribuicao = np.argmax(dados @ centroides.T, axis=1)
+        listas = [np.flatnonzero(atribuicao == c) for c in range(n_listas)]
+
+        with self._trava_memoria:
+            total = len(self)
+            if total > n:
+                novas = np.argmax(self._vetores[n:total] @ centroides.T, axis=1)
+                for c in range(n_listas):
+                    listas[c] = np.concatenate([listas[c], n + np.flatnonzero(novas == c)])
+            self._centroides = centroides
+            self._listas = listas
+            self._treinado_com = n
+        logger.info(f"Quantizador IVF treinado: {n} vetores em {n_listas} listas")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "vectors": len(self),
+            "capacity": int(self._vetores.shape[0]) if self._vetores is not None else 0,
+            "phones": len(self._linhas_por_telefone),
+            "ivf_lists": len(self._listas),
+            "ivf_trained_with": self._treinado_com,
+        }
+
+
+episode_index = EpisodeVectorIndex(diretorio=settings.EPISODE_INDEX_DIR)
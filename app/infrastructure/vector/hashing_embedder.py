@@ -0,0 +1,56 @@
+# app/infrastructure/vector/hashing_embedder.py
+import zlib
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from app.utils.normalize_text import normalize_text
+
+
+class HashingEmbedder:
+    """
+    Embedding local e barato: n-gramas de caracteres projetados por hash em
+    um vetor de dimensão fixa e normalizados (norma L2 = 1).
+
+    Não exige modelo nem chamada de rede. O produto escalar entre dois
+    vetores é a similaridade de cosseno, o que basta para detectar mensagens
+    quase idênticas ("quanto custa o sofá?" x "quanto custa o sofa").
+    """
+
+    def __init__(self, dimensao: int = 1024, ngramas: Tuple[int, int] = (3, 5)):
+        self.dimensao = dimensao
+        self.ngramas = ngramas
+
+    def _ngramas(self, texto: str) -> Iterable[str]:
+        texto = f" {' '.join(normalize_text(texto).split())} "
+        minimo, maximo = self.ngramas
+        for n in range(minimo, maximo + 1):
+            for i in range(len(texto) - n + 1):
+                yield texto[i:i + n]
+
+    def embed(self, texto: str) -> np.ndarray:
+        """Retorna o vetor normalizado (float32) do texto."""
+        vetor = np.zeros(self.dimensao, dtype=np.float32)
+        for ngrama in self._ngramas(texto):
+            h = zlib.crc32(ngrama.encode("utf-8"))
+            # O bit mais alto define o sinal e reduz o viés das colisões
+            vetor[h % self.dimensao] += 1.0 if h & 0x80000000 else -1.0
+        norma = np.linalg.norm(vetor)
+        return vetor / norma if norma else vetor
+
+    def embed_many(self, textos: Iterable[str]) -> np.ndarray:
+        """Retorna uma matriz (n, dimensao) com um vetor por texto."""
+        vetores = [self.embed(texto) for texto in textos]
+        if not vetores:
+            return np.zeros((0, self.dimensao), dtype=np.float32)
+        return np.stack(vetores)
+
+
+def cosine_similarity(matriz: np.ndarray, vetor: np.ndarray) -> np.ndarray:
+    """Similaridade de cosseno entre cada linha da matriz e o vetor (já normalizados)."""
+    if matriz.size == 0:
+        return np.zeros(0, dtype=np.float32)
+    return matriz @ vetor
+
+
+hashing_embedder = HashingEmbedder()
@@ -1,12 +1,24 @@
+import asyncio
+import json
 import logging
+from typing import List
 from pydantic import BaseModel
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
 from app.presentation.dto.message_request_payload import WebhookPayload
 from app.application.services.scheduling_service import (
     get_scheduling_service,
     SchedulingService,
 )
+from app.application.agent.scheduling_agent_cache import scheduling_agent_cache
+from app.application.agent.loaders.node_loader import NodeLoader
+from app.application.services.ingress_pipeline import ingress_pipeline
+from app.application.services.webhook_queue_worker import webhook_queue_worker
+from app.application.services.token_budget import token_budget
 from app.infrastructure.config.config import settings
+from app.infrastructure.services.llm.http_client_pool import llm_http_pool
+from app.infrastructure.pesistence.checkpoint_compactor import checkpoint_compactor
+from app.infrastructure.pesistence.token_usage_repository import token_usage_repository
 from psycopg_pool import AsyncConnectionPool
 from psycopg.rows import dict_row
 
@@ -26,12 +38,190 @@ async def receive_webhook(
     logger.info(f"Nova mensagem de '{payload.phone_number}' recebida.")
     logger.info(f"Conteúdo: '{payload.message}'")
 
-    result = await service.handle_incoming_message(
-        payload.phone_number, payload.message, payload.message_id
-    )
+    # Ecos, grupos e retentativas são descartados antes do agente
+    motivo = await ingress_pipeline.avaliar(payload)
+    if motivo is not None:
+        return {"status": "ignored", "reason": motivo}
+
+    # Modo assíncrono: a mensagem vai para a fila e a resposta sai pelo sender
+    if settings.WEBHOOK_ASYNC_MODE:
+        try:
+            queue_id = await webhook_queue_worker.enfileirar(
+                payload.message_id, payload.phone_number, payload.message
+            )
+        except Exception:
+            await ingress_pipeline.liberar(payload)
+            raise
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"status": "queued", "queue_id": queue_id},
+        )
+
+    try:
+        result = await service.handle_incoming_message(
+            payload.phone_number, payload.message, payload.message_id
+        )
+    except Exception:
+        await ingress_pipeline.liberar(payload)
+        raise
+    # Turno com erro: a retentativa do provedor deve ser processada (com o
+    # agrupador, cada requisição da rajada recebe o erro e libera o seu ID)
+    if result.get("status") == "error":
+        await ingress_pipeline.liberar(payload)
 
     return result
 
+@router.post("/batch", summary="Recebe várias mensagens do webhook em uma requisição")
+async def receive_webhook_batch(
+    payloads: List[WebhookPayload], service: SchedulingService = Depends(get_scheduling_service)
+):
+    if len(payloads) > settings.WEBHOOK_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lote com {len(payloads)} mensagens; máximo {settings.WEBHOOK_BATCH_MAX_SIZE}",
+        )
+    logger.info(f"Lote com {len(payloads)} mensagens recebido.")
+
+    resultados: List[dict] = [None] * len(payloads)
+    # Índices das mensagens aceitas, por telefone, na ordem do lote
+    conversas: dict = {}
+    for i, payload in enumerate(payloads):
+        motivo = await ingress_pipeline.avaliar(payload)
+        if motivo is not None:
+            resultados[i] = {"status": "ignored", "reason": motivo}
+        else:
+            conversas.setdefault(payload.phone_number, []).append(i)
+
+    if settings.WEBHOOK_ASYNC_MODE:
+        try:
+            for indices in conversas.values():
+                for i in indices:
+                    p = payloads[i]
+                    queue_id = await webhook_queue_worker.enfileirar(p.message_id, p.phone_number, p.message)
+                    resultados[i] = {"status": "queued", "queue_id": queue_id}
+        except Exception:
+            # As aceitas que não entraram na fila serão reenviadas pelo provedor
+            for indices in conversas.values():
+                for i in indices:
+                    if resultados[i] is None:
+                        await ingress_pipeline.liberar(payloads[i])
+            raise
+    else:
+        limite = asyncio.Semaphore(settings.WEBHOOK_BATCH_CONCURRENCY)
+
+        async def processar_conversa(phone_number: str, indices: List[int]):
+            async with limite:
+                try:
+                    saidas = await service.handle_incoming_burst(
+                        phone_number,
+                        [(payloads[i].message, payloads[i].message_id) for i in indices],
+                    )
+                except Exception as e:
+                    logger.error(f"Erro ao processar o lote de {phone_number}: {e}")
+                    saidas = [{"status": "error", "message": str(e)}] * len(indices)
+            for i, saida in zip(indices, saidas):
+                resultados[i] = saida
+
+        await asyncio.gather(
+            *(processar_conversa(phone, indices) for phone, indices in conversas.items())
+        )
+        for indices in conversas.values():
+            for i in indices:
+                if resultados[i].get("status") == "error":
+                    await ingress_pipeline.liberar(payloads[i])
+
+    return [
+        {"message_id": payload.message_id, "phone_number": payload.phone_number, **resultado}
+        for payload, resultado in zip(payloads, resultados)
+    ]
+
+@router.post("/stream", summary="Recebe mensagem e transmite a resposta via SSE")
+async def stream_webhook(
+    payload: WebhookPayload, service: SchedulingService = Depends(get_scheduling_service)
+):
+    logger.info(f"Nova mensagem (streaming) de '{payload.phone_number}' recebida.")
+
+    motivo = await ingress_pipeline.avaliar(payload)
+    if motivo is not None:
+        return {"status": "ignored", "reason": motivo}
+
+    async def eventos():
+        async for evento in service.stream_incoming_message(
+            payload.phone_number, payload.message, payload.message_id
+        ):
+            if evento["event"] == "error":
+                await ingress_pipeline.liberar(payload)
+            dados = json.dumps(evento["data"], ensure_ascii=False)
+            yield f"event: {evento['event']}\ndata: {dados}\n\n"
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/debug/rebuild-agent")
+async def rebuild_scheduling_agent():
+    """Recompila o agente em cache (usar após mudanças no registry)"""
+    try:
+        await scheduling_agent_cache.rebuild()
+        return {"status": "success", **scheduling_agent_cache.get_cache_info()}
+    except Exception as e:
+        logger.error(f"Erro ao recompilar o agente: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/debug/nodes")
+async def node_registry_info():
+    """Nós registrados, seus metadados e estatísticas de execução"""
+    loader = NodeLoader()
+    loader.load_nodes()
+    return loader.get_registry_info()
+
+@router.get("/debug/llm-pool")
+async def llm_pool_stats():
+    """Estatísticas de reuso de conexões do pool HTTP dos LLMs"""
+    return llm_http_pool.get_stats()
+
+@router.get("/debug/queue")
+async def webhook_queue_stats():
+    """Estado da fila de webhooks e dos workers"""
+    return webhook_queue_worker.get_stats()
+
+@router.get("/debug/token-usage")
+async def token_usage_report(limit: int = 50):
+    """Conversas com maior consumo de tokens e custo estimado"""
+    try:
+        await token_budget.flush()
+        return {
+            "budget": token_budget.get_stats(),
+            "threads": await token_usage_repository.listar(limit),
+        }
+    except Exception as e:
+        logger.error(f"Erro ao consultar o consumo de tokens: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/debug/token-usage/{thread_id}")
+async def thread_token_usage(thread_id: str):
+    """Consumo de tokens de uma conversa: tabela agregada e estado do agente"""
+    try:
+        relatorio = await token_budget.relatorio(thread_id)
+        agent = await scheduling_agent_cache.get_agent()
+        snapshot = await agent.aget_state({"configurable": {"thread_id": thread_id}})
+        relatorio["state_usage"] = snapshot.values.get("token_usage")
+        return relatorio
+    except Exception as e:
+        logger.error(f"Erro ao consultar o consumo de tokens de {thread_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/debug/compact-checkpoints")
+async def compact_checkpoints():
+    """Remove checkpoints antigos conforme a política de retenção"""
+    try:
+        return await checkpoint_compactor.compactar()
+    except Exception as e:
+        logger.error(f"Erro na compactação de checkpoints: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/debug/truncate-tables")
 async def truncate_langgraph_tables():
     """Limpa todas as tabelas do LangGraph"""
@@ -0,0 +1,21 @@
+import re
+import unicodedata
+
+_COMBINING_MARKS = re.compile(r"[\u0300-\u036f]")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza um texto para comparação: minúsculas e sem acentos.
+
+    Exemplo: "Não ficou BOM, técnico" -> "nao ficou bom, tecnico"
+
+    Args:
+        text (str): Texto original.
+
+    Returns:
+        str: Texto em minúsculas, sem marcas diacríticas.
+    """
+    if not text:
+        return ""
+    return _COMBINING_MARKS.sub("", unicodedata.normalize("NFD", text)).lower()
@@ -0,0 +1,35 @@
+from typing import Iterable
+from langchain_core.messages import BaseMessage
+
+# Aproximação usada para modelos da OpenAI em português: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+# Custo fixo de cada mensagem no formato de chat (papel, separadores)
+TOKENS_PER_MESSAGE = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estima o número de tokens de um texto sem depender de tokenizer.
+
+    Args:
+        text (str): Texto a ser estimado.
+
+    Returns:
+        int: Quantidade aproximada de tokens.
+    """
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def estimate_messages_tokens(messages: Iterable[BaseMessage]) -> int:
+    """
+    Estima os tokens de uma lista de mensagens de chat.
+
+    Args:
+        messages (Iterable[BaseMessage]): Mensagens do histórico.
+
+    Returns:
+        int: Quantidade aproximada de tokens, incluindo o custo por mensagem.
+    """
+    return sum(estimate_tokens(str(m.content)) + TOKENS_PER_MESSAGE for m in messages)
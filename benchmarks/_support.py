@@ -0,0 +1,172 @@
+"""
+Utilitários compartilhados pelos benchmarks.
+
+Os benchmarks rodam sem rede e sem Postgres: as configurações obrigatórias
+recebem valores fictícios, o checkpointer/store do LangGraph são substituídos
+por implementações em memória e o LLM por um serviço falso determinístico.
+"""
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+_DUMMY_ENV = {
+    "POSTGRES_USER": "benchmark",
+    "POSTGRES_PASSWORD": "benchmark",
+    "POSTGRES_DB": "benchmark",
+    "PGADMIN_DEFAULT_EMAIL": "benchmark@example.com",
+    "PGADMIN_DEFAULT_PASSWORD": "benchmark",
+    "OPENAI_API_KEY": "sk-benchmark",
+    "OPENAI_MODEL_NAME": "gpt-4o-mini",
+    "OPENAI_TEMPERATURE": "0.1",
+    "LANGSMITH_API_KEY": "benchmark",
+    "LANGSMITH_PROJECT": "benchmark",
+    # Sem Postgres: o lock por thread fica restrito ao processo
+    "THREAD_LOCK_BACKEND": "local",
+    "TOKEN_USAGE_PERSIST_ENABLED": "false",
+}
+
+for _key, _value in _DUMMY_ENV.items():
+    os.environ.setdefault(_key, _value)
+
+logging.basicConfig(level=logging.ERROR)
+
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+from langgraph.store.memory import InMemoryStore  # noqa: E402
+
+# Importa o pacote de nós antes da fábrica de LLM, na mesma ordem da aplicação
+# (main -> routers -> builder), evitando o import circular com openai_service.
+import app.application.agent.node.orchestrator  # noqa: E402, F401
+from app.infrastructure.interfaces.illm_service import ILLMService  # noqa: E402
+from app.infrastructure.pesistence.postgres_persistence import db_manager  # noqa: E402
+from app.infrastructure.services.llm.llm_factory import LLMFactory  # noqa: E402
+
+
+class FakeLLMService(ILLMService):
+    """
+    Serviço de LLM falso: respostas fixas e latência opcional simulada.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    async def extract_information(self, user_message: str) -> Dict[str, Any]:
+        await self._simular_latencia()
+        return {"item_mencionado": "sofá", "etapa_detectada": "identificacao_item"}
+
+    async def orchestrator_prompt_template(
+        self, user_query: str, chat_history=None, scheduling_data=None
+    ):
+        await self._simular_latencia()
+        return "Perfeito! Você tem uma foto do seu sofá pra mandar?"
+
+    async def extract_and_respond(
+        self, user_query: str, chat_history=None, scheduling_data=None
+    ) -> Dict[str, Any]:
+        await self._simular_latencia()
+        return {
+            "extracted_info": {
+                "item_mencionado": "sofá",
+                "etapa_detectada": "identificacao_item",
+            },
+            "resposta": "Perfeito! Você tem uma foto do seu sofá pra mandar?",
+        }
+
+    async def summarize_history(self, previous_summary, messages) -> str:
+        await self._simular_latencia()
+        partes = [previous_summary] if previous_summary else []
+        partes += [str(m.content)[:40] for m in messages]
+        return " / ".join(partes)[-600:]
+
+    async def _simular_latencia(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+def install_offline_environment(llm_service: ILLMService = None):
+    """
+    Troca a persistência por implementações em memória e o LLM pelo serviço falso.
+    """
+    db_manager._checkpointer = InMemorySaver()
+    db_manager._store = InMemoryStore()
+
+    service = llm_service or FakeLLMService()
+    LLMFactory.register_provider("openai", lambda: service)
+    return service
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Resume amostras (em segundos) em estatísticas em milissegundos."""
+    ordenadas = sorted(samples)
+    return {
+        "n": len(ordenadas),
+        "mean_ms": statistics.fmean(ordenadas) * 1000,
+        "p50_ms": ordenadas[len(ordenadas) // 2] * 1000,
+        "p99_ms": ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.99))] * 1000,
+    }
+
+
+def measure_sync(func: Callable, iterations: int) -> List[float]:
+    """Executa uma função `iterations` vezes e retorna as durações."""
+    samples = []
+    for i in range(iterations):
+        inicio = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - inicio)
+    return samples
+
+
+async def measure_async(func: Callable, iterations: int) -> List[float]:
+    """Executa uma corrotina `iterations` vezes e retorna as durações."""
+    samples = []
+    for i in range(iterations):
+        inicio = time.perf_counter()
+        await func(i)
+        samples.append(time.perf_counter() - inicio)
+    return samples
+
+
+def print_report(title: str, results: Dict[str, Dict[str, float]]):
+    """Imprime uma tabela simples com os resultados."""
+    print(f"\n{title}")
+    print(f"{'cenário':<28}{'n':>6}{'média(ms)':>12}{'p50(ms)':>12}{'p99(ms)':>12}")
+    for nome, r in results.items():
+        print(
+            f"{nome:<28}{r['n']:>6}{r['mean_ms']:>12.3f}"
+            f"{r['p50_ms']:>12.3f}{r['p99_ms']:>12.3f}"
+        )
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]]):
+    """Grava os resultados em JSON para comparações futuras."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare_baseline(path: str, results: Dict[str, Dict[str, float]], metric: str = "p50_ms"):
+    """
+    Imprime a variação de cada cenário em relação ao baseline gravado.
+
+    Returns:
+        Maior regressão percentual encontrada (0 se nada piorou).
+    """
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\nComparação com {path} ({metric})")
+    print(f"{'cenário':<28}{'baseline':>12}{'atual':>12}{'variação':>12}")
+    pior = 0.0
+    for nome, r in results.items():
+        anterior = baseline.get(nome, {}).get(metric)
+        if not anterior:
+            print(f"{nome:<28}{'-':>12}{r[metric]:>12.3f}{'novo':>12}")
+            continue
+        variacao = (r[metric] - anterior) / anterior * 100
+        pior = max(pior, variacao)
+        print(f"{nome:<28}{anterior:>12.3f}{r[metric]:>12.3f}{variacao:>+11.1f}%")
+    return pior
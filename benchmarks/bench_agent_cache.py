@@ -0,0 +1,66 @@
+"""
+Compara construir o agente a cada requisição com reutilizar o agente em cache.
+
+Uso:
+    python -m benchmarks.bench_agent_cache [--iterations 200]
+"""
+import argparse
+import asyncio
+
+from benchmarks._support import (
+    install_offline_environment,
+    measure_async,
+    print_report,
+    summarize,
+)
+from langchain_core.messages import HumanMessage
+
+from app.application.agent.scheduling_agent_builder import get_scheduling_agent
+from app.application.agent.scheduling_agent_cache import SchedulingAgentCache
+from app.domain.scheduling_data import SchedulingData
+
+
+def _initial_state(i: int) -> dict:
+    return {
+        "phone_number": f"5585999{i:06d}",
+        "message_id": f"msg-{i}",
+        "messages": [HumanMessage(content="Quero limpar um sofá de 3 lugares")],
+        "scheduling_data": SchedulingData(),
+    }
+
+
+async def main(iterations: int):
+    install_offline_environment()
+    cache = SchedulingAgentCache()
+    await cache.get_agent()  # aquecimento, como no lifespan
+
+    async def per_request_build(i: int):
+        agent = await get_scheduling_agent()
+        await agent.ainvoke(
+            _initial_state(i), config={"configurable": {"thread_id": f"build-{i}"}}
+        )
+
+    async def cached_invoke(i: int):
+        agent = await cache.get_agent()
+        await agent.ainvoke(
+            _initial_state(i), config={"configurable": {"thread_id": f"cache-{i}"}}
+        )
+
+    async def build_only(i: int):
+        await get_scheduling_agent()
+
+    results = {
+        "build por requisição": summarize(
+            await measure_async(per_request_build, iterations)
+        ),
+        "agente em cache": summarize(await measure_async(cached_invoke, iterations)),
+        "somente build+compile": summarize(await measure_async(build_only, iterations)),
+    }
+    print_report("Construção do agente: por requisição x cache", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
@@ -0,0 +1,139 @@
+"""
+Microbenchmark do ExceptionDetector: matcher pré-compilado x implementação anterior.
+
+A implementação anterior (instanciar o detector a cada mensagem e chamar
+re.search em cada padrão ".*") é reproduzida aqui apenas como referência.
+Ao final, o corpus de equivalência confere que os tipos detectados e a
+exceção principal escolhida por `_tratar_excecoes` são os mesmos nas duas
+implementações; havendo divergência, o script sai com código 1.
+
+Uso:
+    python -m benchmarks.bench_exception_detector [--iterations 200]
+"""
+import argparse
+import re
+import sys
+import time
+
+from benchmarks._support import print_report, summarize
+
+from app.domain.exception_handlers import _PADROES_EXCECAO, _REGRAS_EXCECAO, ExceptionDetector
+
+MENSAGENS_CURTAS = [
+    "oi",
+    "Boa tarde, quero limpar um sofá de 3 lugares",
+    "Quanto custa pra limpar um colchão queen?",
+    "Moro em Fortaleza, perto do shopping",
+    "sim, pode ser",
+    "João Silva, CPF 529.982.247-25, joao@email.com",
+    "Rua das Flores, 123, apto 45, Aldeota",
+    "(85)99999-9999",
+    "Vocês limpam banco de carro?",
+    "O técnico não veio ontem, quero reclamar",
+    "Quero cancelar o agendamento",
+    "Esse produto é tóxico para pet?",
+]
+
+# Termos curtos dentro de outras palavras ("já" em "jamais"/"janela", "não"
+# em "canão") e mensagens com mais de um tipo, em que a ordem e a prioridade
+# decidem a exceção principal.
+MENSAGENS_EQUIVALENCIA = MENSAGENS_CURTAS + [
+    "jamais disse isso",
+    "hoje a janela está aberta, ele disse",
+    "o canão da mangueira não chegou",
+    "A jaqueta veio suja, mas ninguém disse nada",
+    "Porque precisa do meu CPF?",
+    "Por que precisa do meu endereço?",
+    "Já disse que quero cancelar",
+    "O técnico não veio e eu já disse que quero cancelar",
+    "Quero cancelar, o produto é tóxico?",
+    "Vocês lavam roupa? O técnico não veio ontem",
+    "Tem como limpar o piso? Quero remarcar",
+    "Não vai dar, desmarcar por favor. Já disse que não precisa saber",
+    "não quero mais dar dados",
+    "Não quero mais, o técnico não veio e não quero passar meu CPF",
+]
+
+# Mensagem longa colada (ex.: conversa encaminhada), rica em termos-âncora
+# ("não", "que", "é", "esse") sem completar nenhum padrão.
+MENSAGEM_LONGA = (
+    "Então, é que eu estava vendo aqui e não sei se esse é o melhor momento, "
+    "mas que bom que vocês responderam, é importante pra mim porque não tenho "
+    "tempo e esse sofá é da minha avó, que sempre cuidou dele. "
+) * 60
+
+
+class LegacyExceptionDetector:
+    """Cópia fiel do comportamento anterior (apenas para comparação)."""
+
+    def __init__(self):
+        self.padroes = [
+            (tipo, list(padroes)) for tipo, padroes in _PADROES_EXCECAO.items()
+        ]
+
+    def detectar_excecoes(self, mensagem: str):
+        encontrados = []
+        mensagem_lower = mensagem.lower()
+        for tipo, padroes in self.padroes:
+            for padrao in padroes:
+                if re.search(padrao, mensagem_lower):
+                    encontrados.append(tipo)
+        return encontrados
+
+
+def _medir(func, corpus, iterations):
+    samples = []
+    for _ in range(iterations):
+        for mensagem in corpus:
+            inicio = time.perf_counter()
+            func(mensagem)
+            samples.append(time.perf_counter() - inicio)
+    return samples
+
+
+def main(iterations: int):
+    novo = ExceptionDetector()
+
+    def legado(mensagem):
+        return LegacyExceptionDetector().detectar_excecoes(mensagem)
+
+    results = {
+        "legado / curtas": summarize(_medir(legado, MENSAGENS_CURTAS, iterations)),
+        "compilado / curtas": summarize(
+            _medir(novo.detectar_excecoes, MENSAGENS_CURTAS, iterations)
+        ),
+        "legado / longa": summarize(_medir(legado, [MENSAGEM_LONGA], iterations // 10 or 1)),
+        "compilado / longa": summarize(
+            _medir(novo.detectar_excecoes, [MENSAGEM_LONGA], iterations // 10 or 1)
+        ),
+    }
+    print_report(f"ExceptionDetector ({len(MENSAGEM_LONGA)} chars na mensagem longa)", results)
+
+    print("\nTipos detectados e exceção principal (legado -> compilado):")
+    divergencias = 0
+    for mensagem in MENSAGENS_EQUIVALENCIA:
+        tipos_legado = legado(mensagem)
+        excecoes = novo.detectar_excecoes(mensagem)
+        antes = (sorted({t.value for t in tipos_legado}), _principal(tipos_legado))
+        depois = (sorted({e.tipo.value for e in excecoes}), _principal([e.tipo for e in excecoes]))
+        marca = " " if antes == depois else "!"
+        divergencias += antes != depois
+        print(f" {marca}{mensagem[:40]:<42}{antes} -> {depois}")
+
+    if divergencias:
+        print(f"\n{divergencias} mensagens com resultado diferente do legado")
+        sys.exit(1)
+
+
+def _principal(tipos):
+    """Tipo da exceção escolhida por `_tratar_excecoes` (max por prioridade)."""
+    if not tipos:
+        return None
+    return max(tipos, key=lambda tipo: _REGRAS_EXCECAO[tipo]["prioridade"]).value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    main(args.iterations)
@@ -0,0 +1,154 @@
+"""
+Replay de uma conversa gravada comparando o modo 'two_call' com o 'fused'.
+
+Os prompts são montados pelo próprio OpenAIService; apenas a chamada de rede
+é substituída por um modelo simulado que contabiliza tokens (aprox. 4
+caracteres por token, incluindo o schema JSON enviado nas chamadas
+estruturadas) e estima a latência a partir de:
+
+    rtt + tokens_prompt * prefill + tokens_resposta * decode
+
+Uso:
+    python -m benchmarks.bench_fused_mode [--rtt 0.35] [--decode-ms 12]
+"""
+import argparse
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import List
+
+from benchmarks._support import install_offline_environment  # noqa: F401
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.domain.scheduling_data import SchedulingData
+from app.infrastructure.services.llm.openai_service import (
+    ExtractedInfo,
+    ExtractedInfoWithResponse,
+    OpenAIService,
+)
+
+CONVERSA = [
+    ("Oi, boa tarde", "Boa tarde! Sou a Yasmin, da Doutor Sofá. Qual item deseja higienizar?"),
+    ("Quero limpar um sofá de 3 lugares", "Ótimo! Você tem uma foto do seu sofá pra mandar?"),
+    ("Mandei a foto agora", "Perfeito! Nossa Higienização Bactericida remove ácaros, fungos e bactérias."),
+    ("Quanto fica?", "Para um sofá de 3 lugares fica R$ 280 no PIX ou 2x no cartão."),
+    ("Moro em Fortaleza, perto do shopping", "Atendemos em Fortaleza sim! Posso seguir com o agendamento?"),
+    ("Sim, pode ser", "Ótimo! Preciso do seu nome completo, CPF, e-mail e endereço."),
+    ("João Silva, CPF 529.982.247-25", "Obrigada, João! Qual seu e-mail e endereço completo?"),
+    ("joao.silva@email.com", "Anotado! E o endereço completo com rua, número e bairro?"),
+    ("Rua das Flores, 123, Aldeota", "Perfeito! E um telefone para contato?"),
+    ("(85)99999-9999", "Perfeito! Agora vou conectar você com nossa equipe para finalizar o agendamento. Um momento!"),
+]
+
+
+def _tokens(texto: str) -> int:
+    return max(1, len(texto) // 4)
+
+
+@dataclass
+class Contador:
+    chamadas: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latencia: float = 0.0
+    latencias_turno: List[float] = field(default_factory=list)
+
+
+class ModeloSimulado:
+    """Substitui o runnable de rede: devolve uma saída fixa e contabiliza custo."""
+
+    def __init__(self, contador: Contador, rtt: float, prefill: float, decode: float, saida, schema=None):
+        self.contador = contador
+        self.rtt, self.prefill, self.decode = rtt, prefill, decode
+        self.saida = saida
+        self.schema_tokens = _tokens(json.dumps(schema.model_json_schema())) if schema else 0
+
+    async def ainvoke(self, messages, config=None):
+        prompt_tokens = self.schema_tokens + sum(_tokens(str(m.content)) for m in messages)
+        saida = self.saida()
+        texto_saida = saida.content if isinstance(saida, AIMessage) else saida.model_dump_json()
+        completion_tokens = _tokens(texto_saida)
+
+        self.contador.chamadas += 1
+        self.contador.prompt_tokens += prompt_tokens
+        self.contador.completion_tokens += completion_tokens
+        latencia = self.rtt + prompt_tokens * self.prefill + completion_tokens * self.decode
+        self.contador.latencia += latencia
+        self.contador.latencias_turno[-1] += latencia
+        return saida
+
+
+async def replay(modo: str, rtt: float, prefill: float, decode: float) -> Contador:
+    contador = Contador()
+    service = OpenAIService()
+    resposta_atual = {"texto": ""}
+    extracao = ExtractedInfo(item_mencionado="sofá", etapa_detectada="identificacao_item")
+
+    service.structured_llm = ModeloSimulado(
+        contador, rtt, prefill, decode, lambda: extracao, schema=ExtractedInfo
+    )
+    service.llm = ModeloSimulado(
+        contador, rtt, prefill, decode, lambda: AIMessage(content=resposta_atual["texto"])
+    )
+    service.fused_llm = ModeloSimulado(
+        contador,
+        rtt,
+        prefill,
+        decode,
+        lambda: ExtractedInfoWithResponse(
+            **extracao.model_dump(), resposta=resposta_atual["texto"]
+        ),
+        schema=ExtractedInfoWithResponse,
+    )
+
+    historico = []
+    scheduling_data = SchedulingData()
+    for mensagem, resposta in CONVERSA:
+        resposta_atual["texto"] = resposta
+        contador.latencias_turno.append(0.0)
+        if modo == "fused":
+            await service.extract_and_respond(mensagem, historico, scheduling_data)
+        else:
+            await service.extract_information(mensagem)
+            await service.orchestrator_prompt_template(mensagem, historico, scheduling_data)
+        historico += [HumanMessage(content=mensagem), AIMessage(content=resposta)]
+    return contador
+
+
+async def main(rtt: float, prefill_ms: float, decode_ms: float):
+    resultados = {}
+    for modo in ("two_call", "fused"):
+        resultados[modo] = await replay(modo, rtt, prefill_ms / 1000, decode_ms / 1000)
+
+    print(f"\nReplay de {len(CONVERSA)} turnos (latência simulada)")
+    print(
+        f"{'modo':<10}{'chamadas':>10}{'prompt tok':>12}{'resp tok':>10}"
+        f"{'lat/turno(ms)':>15}{'p50(ms)':>10}"
+    )
+    for modo, c in resultados.items():
+        p50 = sorted(c.latencias_turno)[len(c.latencias_turno) // 2]
+        print(
+            f"{modo:<10}{c.chamadas:>10}{c.prompt_tokens:>12}{c.completion_tokens:>10}"
+            f"{c.latencia / len(CONVERSA) * 1000:>15.1f}{p50 * 1000:>10.1f}"
+        )
+
+    base, fused = resultados["two_call"], resultados["fused"]
+    economia = {
+        "chamadas": 1 - fused.chamadas / base.chamadas,
+        "prompt_tokens": 1 - fused.prompt_tokens / base.prompt_tokens,
+        "tokens_totais": 1
+        - (fused.prompt_tokens + fused.completion_tokens)
+        / (base.prompt_tokens + base.completion_tokens),
+        "latencia": 1 - fused.latencia / base.latencia,
+    }
+    print("\nEconomia do modo fused:")
+    print(json.dumps({k: f"{v:.1%}" for k, v in economia.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rtt", type=float, default=0.35, help="latência fixa por chamada (s)")
+    parser.add_argument("--prefill-ms", type=float, default=0.05, help="ms por token de prompt")
+    parser.add_argument("--decode-ms", type=float, default=12.0, help="ms por token gerado")
+    args = parser.parse_args()
+    asyncio.run(main(args.rtt, args.prefill_ms, args.decode_ms))
@@ -0,0 +1,206 @@
+"""
+Microbenchmarks do caminho de cada turno, com baseline em JSON.
+
+Cobre as funções chamadas em todo turno (detecção de exceções, atualização
+do SchedulingData, escolha da etapa, montagem do contexto, serialização e
+formatação do prompt com históricos longos) e o turno completo pelo
+SchedulingService, com LLM falso e checkpointer em memória.
+
+O cenário de conversa longa envia `--turns` mensagens para a mesma thread
+e agrupa a latência por faixa de turnos, mostrando como o custo cresce
+com o histórico.
+
+Uso:
+    python -m benchmarks.bench_hot_path [--iterations 500] [--turns 240]
+        [--save-baseline] [--compare] [--baseline benchmarks/baselines/hot_path.json]
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+
+from benchmarks._support import (
+    FakeLLMService,
+    compare_baseline,
+    install_offline_environment,
+    measure_async,
+    measure_sync,
+    print_report,
+    save_baseline,
+    summarize,
+)
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.application.agent.scheduling_agent_cache import SchedulingAgentCache
+from app.application.agent.node.orchestrator.orchestrator_prompt import (
+    orchestrator_prompt_template,
+)
+from app.application.services.scheduling_service import SchedulingService
+from app.domain.exception_handlers import ExceptionDetector
+from app.domain.scheduling_data import SchedulingData, StatusFluxo, TipoItem
+from app.infrastructure.config.config import settings
+from app.infrastructure.services.llm.openai_service import OpenAIService
+
+# O pacote reexporta a função orchestrator_node com o mesmo nome do módulo
+orchestrator_module = importlib.import_module(
+    "app.application.agent.node.orchestrator.orchestrator_node"
+)
+
+BASELINE_PADRAO = os.path.join(os.path.dirname(__file__), "baselines", "hot_path.json")
+
+MENSAGENS = [
+    "Boa tarde, quero limpar um sofá de 3 lugares",
+    "Moro em Fortaleza, perto do shopping",
+    "João Silva, CPF 529.982.247-25, joao@email.com",
+    "Quero cancelar o agendamento",
+]
+
+EXTRACOES = [
+    {"item_mencionado": "sofá", "tamanho_item": "3 lugares", "etapa_detectada": "identificacao_item"},
+    {"cidade": "Fortaleza", "etapa_detectada": "captacao_localizacao"},
+    {
+        "nome_completo": "João Silva",
+        "cpf": "529.982.247-25",
+        "email": "joao@email.com",
+        "telefone": "(85) 99999-9999",
+        "etapa_detectada": "identificacao_cliente",
+    },
+    {"aceita_orcamento": True, "etapa_detectada": "confirmacao_orcamento"},
+]
+
+
+def _scheduling_data_preenchido() -> SchedulingData:
+    dados = SchedulingData(user_name="5585999990000", cidade="Fortaleza")
+    dados.atualizar_cliente(nome_completo="João Silva", email="joao@email.com")
+    dados.atualizar_servico(item_selecionado=TipoItem.SOFA, tamanho_item="3 lugares")
+    dados.avancar_etapa(StatusFluxo.ORCAMENTO)
+    return dados
+
+
+def _historico(tamanho: int) -> list:
+    mensagens = []
+    for i in range(tamanho):
+        if i % 2 == 0:
+            mensagens.append(HumanMessage(content=MENSAGENS[i // 2 % len(MENSAGENS)]))
+        else:
+            mensagens.append(
+                AIMessage(content="Perfeito! Você tem uma foto do seu sofá pra mandar?")
+            )
+    return mensagens
+
+
+def _funcoes(iterations: int) -> dict:
+    detector = ExceptionDetector()
+    dados = _scheduling_data_preenchido()
+    openai_service = OpenAIService.__new__(OpenAIService)  # sem cliente HTTP
+
+    results = {
+        "detectar_excecoes": summarize(
+            measure_sync(lambda i: detector.detectar_excecoes(MENSAGENS[i % len(MENSAGENS)]), iterations)
+        ),
+        "determinar_nova_etapa": summarize(
+            measure_sync(
+                lambda i: orchestrator_module._determinar_nova_etapa(
+                    dados.etapa_atual,
+                    EXTRACOES[i % len(EXTRACOES)]["etapa_detectada"],
+                    EXTRACOES[i % len(EXTRACOES)],
+                    dados,
+                ),
+                iterations,
+            )
+        ),
+        "build_intelligent_context": summarize(
+            measure_sync(lambda i: orchestrator_module._build_intelligent_context(dados), iterations)
+        ),
+        "OpenAIService._build_context": summarize(
+            measure_sync(lambda i: openai_service._build_context(dados), iterations)
+        ),
+        "SchedulingData.model_dump": summarize(
+            measure_sync(lambda i: dados.model_dump(), iterations)
+        ),
+    }
+
+    contexto = orchestrator_module._build_intelligent_context(dados)
+    for tamanho in (10, 50, 200):
+        historico = _historico(tamanho)
+        results[f"format_messages / {tamanho} msgs"] = summarize(
+            measure_sync(
+                lambda i: orchestrator_prompt_template.format_messages(
+                    chat_history=historico, user_query=MENSAGENS[0], context=contexto
+                ),
+                max(1, iterations // 10),
+            )
+        )
+    return results
+
+
+async def _update_scheduling_data(iterations: int) -> dict:
+    async def atualizar(i: int):
+        await orchestrator_module._update_scheduling_data(
+            SchedulingData(), EXTRACOES[i % len(EXTRACOES)]
+        )
+
+    return {"update_scheduling_data": summarize(await measure_async(atualizar, iterations))}
+
+
+async def _turnos(iterations: int, turns: int) -> dict:
+    agent = await SchedulingAgentCache().get_agent()
+    service = SchedulingService(agent)
+
+    async def turno_thread_nova(i: int):
+        await service.handle_incoming_message(
+            f"turno-{i}", MENSAGENS[i % len(MENSAGENS)], f"turno-{i}"
+        )
+
+    results = {
+        "turno completo / thread nova": summarize(
+            await measure_async(turno_thread_nova, max(1, iterations // 10))
+        )
+    }
+
+    async def turno_conversa_longa(i: int):
+        await service.handle_incoming_message(
+            "conversa-longa", MENSAGENS[i % len(MENSAGENS)], f"longa-{i}"
+        )
+
+    amostras = await measure_async(turno_conversa_longa, turns)
+    faixa = 50
+    for inicio in range(0, turns, faixa):
+        fim = min(turns, inicio + faixa)
+        results[f"conversa / turnos {inicio + 1}-{fim}"] = summarize(amostras[inicio:fim])
+    return results
+
+
+async def main(iterations: int, turns: int, baseline: str, salvar: bool, comparar: bool):
+    install_offline_environment(FakeLLMService())
+    # Cada mensagem vira um turno próprio, sem caches que encurtem o caminho
+    settings.MESSAGE_COALESCE_ENABLED = False
+    settings.EPISODIC_MEMORY_ENABLED = False
+    settings.RESPONSE_CACHE_ENABLED = False
+
+    results = _funcoes(iterations)
+    results.update(await _update_scheduling_data(iterations))
+    results.update(await _turnos(iterations, turns))
+    print_report(f"Caminho do turno ({iterations} iterações, conversa de {turns} turnos)", results)
+
+    if salvar:
+        save_baseline(baseline, results)
+        print(f"\nBaseline gravado em {baseline}")
+    elif comparar:
+        if not os.path.exists(baseline):
+            print(f"\nBaseline {baseline} não encontrado; rode com --save-baseline")
+            sys.exit(1)
+        pior = compare_baseline(baseline, results)
+        print(f"\nMaior regressão: {pior:+.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=240, help="turnos da conversa longa")
+    parser.add_argument("--baseline", default=BASELINE_PADRAO)
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados como baseline")
+    parser.add_argument("--compare", action="store_true", help="compara com o baseline gravado")
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.turns, args.baseline, args.save_baseline, args.compare))
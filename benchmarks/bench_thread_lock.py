@@ -0,0 +1,108 @@
+"""
+Turnos concorrentes na mesma thread_id, com e sem o lock por thread.
+
+Sem o lock, turnos simultâneos partem do mesmo checkpoint e o último a
+gravar descarta as respostas dos outros (atualizações perdidas). Com o lock, todos
+os turnos entram no histórico. Termina com código 1 se o modo com lock
+perder alguma atualização.
+
+Aqui só o lock local é exercitado; o advisory lock entre workers é coberto
+por tests/test_thread_lock_postgres.py, contra um Postgres real.
+
+Uso:
+    python -m benchmarks.bench_thread_lock [--threads 5] [--turns 8] [--latency 0.02]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from contextlib import asynccontextmanager
+
+from benchmarks._support import FakeLLMService, install_offline_environment
+
+from app.application.agent.scheduling_agent_cache import SchedulingAgentCache
+from app.application.services import scheduling_service as scheduling_service_module
+from app.application.services.scheduling_service import SchedulingService
+from app.infrastructure.config.config import settings
+from app.infrastructure.pesistence.thread_lock import (
+    ThreadLockManager,
+    thread_lock_wait_seconds,
+)
+
+
+class _SemLock:
+    @asynccontextmanager
+    async def travar(self, thread_id: str):
+        yield
+
+
+async def _rodada(agent, lock, prefixo: str, threads: int, turns: int) -> dict:
+    scheduling_service_module.thread_lock_manager = lock
+    service = SchedulingService(agent)
+
+    async def turno(thread: int, i: int):
+        return await service.handle_incoming_message(
+            f"{prefixo}-{thread}", f"mensagem {i}", f"{prefixo}-{thread}-{i}"
+        )
+
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(
+        *(turno(t, i) for t in range(threads) for i in range(turns))
+    )
+    duracao = time.perf_counter() - inicio
+
+    perdidas = 0
+    for t in range(threads):
+        estado = await agent.aget_state({"configurable": {"thread_id": f"{prefixo}-{t}"}})
+        # As entradas costumam chegar ao checkpoint; o que se perde é a saída
+        # do orquestrador (resposta e scheduling_data) dos turnos sobrepostos
+        respostas = sum(1 for m in estado.values.get("messages", []) if m.type == "ai")
+        perdidas += turns - respostas
+
+    return {
+        "turnos": threads * turns,
+        "erros": sum(1 for r in resultados if r.get("status") != "success"),
+        "atualizacoes_perdidas": perdidas,
+        "turnos/s": round(threads * turns / duracao, 1),
+    }
+
+
+async def main(threads: int, turns: int, latency: float):
+    install_offline_environment(FakeLLMService(latency=latency))
+    # O agrupador uniria as mensagens simultâneas em um turno; aqui cada
+    # mensagem precisa ser um turno próprio
+    settings.MESSAGE_COALESCE_ENABLED = False
+    settings.EPISODIC_MEMORY_ENABLED = False
+    settings.RESPONSE_CACHE_ENABLED = False
+
+    agent = await SchedulingAgentCache().get_agent()
+    sem_lock = await _rodada(agent, _SemLock(), "sem-lock", threads, turns)
+    com_lock = await _rodada(
+        agent, ThreadLockManager(usar_postgres=False), "com-lock", threads, turns
+    )
+
+    print(f"\nTurnos concorrentes: {threads} threads x {turns} mensagens simultâneas")
+    print(f"{'modo':<10}{'turnos':>8}{'erros':>8}{'perdidas':>10}{'turnos/s':>10}")
+    for nome, r in (("sem lock", sem_lock), ("com lock", com_lock)):
+        print(
+            f"{nome:<10}{r['turnos']:>8}{r['erros']:>8}"
+            f"{r['atualizacoes_perdidas']:>10}{r['turnos/s']:>10}"
+        )
+
+    esperas = thread_lock_wait_seconds.count(scope="local")
+    if esperas:
+        media_ms = thread_lock_wait_seconds.sum(scope="local") / esperas * 1000
+        print(f"\nEspera média pelo lock local: {media_ms:.1f} ms ({esperas} aquisições)")
+
+    if com_lock["atualizacoes_perdidas"] or com_lock["erros"]:
+        print("\nFALHA: o modo com lock perdeu atualizações ou teve erros")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="latência do LLM falso (s)")
+    args = parser.parse_args()
+    asyncio.run(main(args.threads, args.turns, args.latency))
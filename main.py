@@ -1,9 +1,27 @@
 import logging
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 
+# O pacote de nós deve ser importado antes da fábrica de LLM: openai_service
+# importa o prompt do orquestrador, e o nó orquestrador importa a fábrica
+import app.application.agent.node.orchestrator  # noqa: F401
 from app.infrastructure.pesistence.postgres_persistence import db_manager
+from app.infrastructure.pesistence.message_dedup_repository import message_dedup_repository
+from app.application.agent.scheduling_agent_cache import scheduling_agent_cache
+from app.application.agent.memory.episodic_memory_worker import episodic_memory_worker
+from app.application.services.webhook_queue_worker import webhook_queue_worker
+from app.application.services.token_budget import token_budget
+from app.infrastructure.pesistence.message_queue_repository import message_queue_repository
+from app.infrastructure.pesistence.checkpoint_compactor import checkpoint_compactor
+from app.infrastructure.pesistence.store_write_behind import store_write_behind
+from app.infrastructure.pesistence.token_usage_repository import token_usage_repository
+from app.infrastructure.pesistence.thread_lock import thread_lock_manager
+from app.infrastructure.config.config import settings
+from app.infrastructure.vector.episode_index import episode_index
+from app.infrastructure.services.llm.llm_factory import LLMFactory
+from app.infrastructure.metrics.metrics_registry import metrics_registry
 from app.presentation.scheduling_routers import router as message_routers
 
 load_dotenv()
@@ -24,9 +42,56 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Falha crítica durante a inicialização do banco de dados: {e}")
 
+    if settings.INGRESS_DEDUP_PERSISTENT:
+        try:
+            await message_dedup_repository.setup()
+        except Exception as e:
+            logger.error(f"Falha ao criar a tabela de deduplicação de mensagens: {e}")
+
+    try:
+        await scheduling_agent_cache.get_agent()
+    except Exception as e:
+        logger.error(f"Falha ao compilar o agente de agendamento: {e}")
+
+    if settings.EPISODIC_MEMORY_ENABLED:
+        try:
+            await episodic_memory_worker.setup()
+        except Exception as e:
+            logger.error(f"Falha ao criar as tabelas de memória episódica: {e}")
+        episodic_memory_worker.iniciar()
+
+    if settings.EPISODE_INDEX_ENABLED:
+        try:
+            await episode_index.acarregar()
+        except Exception as e:
+            logger.error(f"Falha ao carregar o índice de episódios: {e}")
+
+    if settings.WEBHOOK_ASYNC_MODE:
+        try:
+            await message_queue_repository.setup()
+            webhook_queue_worker.iniciar()
+        except Exception as e:
+            logger.error(f"Falha ao iniciar a fila de webhooks: {e}")
+
+    if settings.TOKEN_USAGE_PERSIST_ENABLED:
+        try:
+            await token_usage_repository.setup()
+        except Exception as e:
+            logger.error(f"Falha ao criar a tabela de consumo de tokens: {e}")
+
+    checkpoint_compactor.iniciar_agendamento(settings.CHECKPOINT_COMPACTION_INTERVAL_SECONDS)
+
     logger.info("Setup concluído.")
     yield
 
+    await checkpoint_compactor.parar()
+    await webhook_queue_worker.parar()
+    await episodic_memory_worker.parar()
+    await store_write_behind.parar()
+    await token_budget.parar()
+    await thread_lock_manager.fechar()
+    await LLMFactory.aclose()
+
 
 app = FastAPI(
     title="API de Atendimento",
@@ -47,3 +112,11 @@ async def root():
         "version": app.version,
         "docs": "/docs",
     }
+
+
+@app.get("/metrics", summary="Métricas no formato do Prometheus", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        metrics_registry.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )